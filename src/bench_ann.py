@@ -0,0 +1,94 @@
+# ==========================================
+# 🧭 BENCHMARK ANN: RECALL / LATENZA vs RICERCA ESATTA
+# ==========================================
+#
+#   python -m src.bench_ann --rows 100000
+#   python -m src.bench_ann --gallery data/gallery.bin
+#
+# Confronta GalleryMatcher esatto con lo stesso matcher agganciato a un
+# indice IVF, per diversi valori di nprobe. Recall@1 = frazione di query in
+# cui l'identità migliore coincide con quella della ricerca esatta.
+
+import argparse
+import time
+
+import numpy as np
+
+from src.utils.face_matcher import GalleryMatcher, l2_normalize
+from src.utils.ann_index import IVFIndex
+from src.utils.embedding_store import EmbeddingStore
+
+
+def synthetic_gallery(rows, dim, seed):
+    """Una riga per identità, embedding casuali normalizzati."""
+    rng = np.random.default_rng(seed)
+    matrix = l2_normalize(rng.standard_normal((rows, dim), dtype=np.float32))
+    names = [f"id_{i}" for i in range(rows)]
+    return names, matrix
+
+
+def make_queries(matrix, n_queries, noise, seed):
+    """Query = righe della galleria perturbate (stesso ordine di grandezza di un volto ripreso live)."""
+    rng = np.random.default_rng(seed + 1)
+    picks = rng.choice(len(matrix), n_queries, replace=False)
+    noisy = matrix[picks] + noise * rng.standard_normal((n_queries, matrix.shape[1]), dtype=np.float32)
+    return l2_normalize(noisy)
+
+
+def timed_match(matcher, queries, k):
+    t0 = time.perf_counter()
+    results = [matcher.match(q, k=k) for q in queries]
+    elapsed = time.perf_counter() - t0
+    return results, elapsed * 1000.0 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall/latenza dell'indice IVF rispetto alla ricerca esatta.")
+    parser.add_argument("--rows", type=int, default=100000, help="Identità sintetiche (ignorato con --gallery)")
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--gallery", help="Usa una galleria reale (gallery.bin)")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.03, help="Rumore gaussiano per componente")
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.gallery:
+        store = EmbeddingStore(args.gallery)
+        names, matrix, replaced = store.names, store.matrix(), store.replaced_rows()
+        print(f"📂 Galleria {args.gallery}: {len(names)} righe × {store.dim}")
+    else:
+        names, matrix = synthetic_gallery(args.rows, args.dim, args.seed)
+        replaced = []
+        print(f"🧪 Galleria sintetica: {args.rows} righe × {args.dim}")
+
+    queries = make_queries(matrix, min(args.queries, len(matrix)), args.noise, args.seed)
+    exact = GalleryMatcher(names, matrix, normalized=True, replaced=replaced)
+
+    t0 = time.perf_counter()
+    index = IVFIndex.train(exact.matrix, nlist=args.nlist)
+    print(f"🏋️ Training IVF: {index.nlist} liste in {time.perf_counter() - t0:.2f}s")
+
+    exact_results, exact_ms = timed_match(exact, queries, args.k)
+    # query senza risultati esatti (galleria vuota) escluse dalla recall
+    truth = [r.candidates[0][0] if r.candidates else None for r in exact_results]
+    scored = [i for i, t in enumerate(truth) if t is not None]
+
+    print(f"\n{'modalità':<14}{'ms/query':>10}{'speedup':>10}{'recall@1':>10}{'recall@k':>10}")
+    print(f"{'esatta':<14}{exact_ms:>10.3f}{1.0:>10.1f}{1.0:>10.3f}{1.0:>10.3f}")
+
+    for nprobe in args.nprobe:
+        index.nprobe = nprobe
+        ann = exact.with_index(index)
+        results, ms = timed_match(ann, queries, args.k)
+        hit1 = np.mean([bool(results[i].candidates) and results[i].candidates[0][0] == truth[i]
+                        for i in scored]) if scored else float("nan")
+        hitk = np.mean([truth[i] in [c[0] for c in results[i].candidates]
+                        for i in scored]) if scored else float("nan")
+        print(f"{'ivf/' + str(nprobe):<14}{ms:>10.3f}{exact_ms / ms:>10.1f}{hit1:>10.3f}{hitk:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# ==========================================
+# 📸 BENCHMARK DETECTION: FULL / DOWNSCALED / ROI
+# ==========================================
+#
+#   python -m src.bench_detection --video data/sample.mp4
+#   python -m src.bench_detection --images data/known_faces --frames 200
+#   python -m src.bench_detection --camera 0 --frames 300
+#
+# Per ogni frame esegue le tre modalità di DETECTION_MODE sullo stesso
+# input (640×480 RGB, come il main loop). Recall = frazione dei volti
+# trovati dal passaggio "full" ritrovati dalla modalità con IoU >= --iou.
+# Nella modalità "roi" le regioni sono le box "full" del frame precedente
+# (come farebbero i tracker), con una scansione completa ogni --full-every frame.
+
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from src.utils.face_models import pick_device, create_mtcnn, warm_up_mtcnn, run_detection, DETECTION_MODES
+
+FRAME_SIZE = (640, 480)
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def iter_frames(args):
+    """Frame BGR dalla sorgente scelta, al più args.frames."""
+    if args.images:
+        paths = []
+        for root, _, files in os.walk(args.images):
+            paths += [os.path.join(root, f) for f in sorted(files) if f.lower().endswith(IMAGE_EXTENSIONS)]
+        for path in paths[:args.frames]:
+            frame = cv2.imread(path)
+            if frame is not None:
+                yield frame
+        return
+
+    cap = cv2.VideoCapture(args.video if args.video else args.camera)
+    try:
+        for _ in range(args.frames):
+            ok, frame = cap.read()
+            if not ok:
+                break
+            yield frame
+    finally:
+        cap.release()
+
+
+def box_iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def count_found(reference, detections, min_iou):
+    """Quante box di riferimento hanno una detection con IoU >= min_iou."""
+    return sum(
+        1 for ref in reference
+        if any(box_iou(ref, d["box"]) >= min_iou for d in detections)
+    )
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - t0) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall/latenza delle modalità di detection rispetto al frame intero.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--video", help="File video")
+    source.add_argument("--images", help="Cartella di immagini (ricorsiva)")
+    source.add_argument("--camera", type=int, default=0, help="Indice webcam (default)")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--full-every", type=int, default=10, help="Scansione completa ogni N frame in modalità roi")
+    parser.add_argument("--iou", type=float, default=0.5)
+    args = parser.parse_args()
+
+    device = pick_device()
+    mtcnn = create_mtcnn(device)
+    warm_up_mtcnn(mtcnn)
+    print(f"✅ MTCNN pronta su {device}")
+
+    ms = {mode: [] for mode in DETECTION_MODES}
+    found = {mode: 0 for mode in DETECTION_MODES}
+    reference_total = 0
+    prev_boxes = []
+    rgb = np.empty((FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+
+    n_frames = 0
+    for n_frames, frame in enumerate(iter_frames(args), start=1):
+        cv2.cvtColor(cv2.resize(frame, FRAME_SIZE), cv2.COLOR_BGR2RGB, dst=rgb)
+
+        reference, elapsed = timed(run_detection, mtcnn, rgb, "full")
+        ms["full"].append(elapsed)
+        ref_boxes = [d["box"] for d in reference]
+        reference_total += len(ref_boxes)
+        found["full"] += len(ref_boxes)
+
+        detections, elapsed = timed(run_detection, mtcnn, rgb, "downscaled")
+        ms["downscaled"].append(elapsed)
+        found["downscaled"] += count_found(ref_boxes, detections, args.iou)
+
+        full_scan = n_frames % args.full_every == 1 or not prev_boxes
+        rois = None if full_scan else prev_boxes
+        detections, elapsed = timed(run_detection, mtcnn, rgb, "roi", rois)
+        ms["roi"].append(elapsed)
+        found["roi"] += count_found(ref_boxes, detections, args.iou)
+
+        prev_boxes = ref_boxes
+
+    if n_frames == 0:
+        print("❌ Nessun frame letto dalla sorgente.")
+        return
+
+    print(f"\n{n_frames} frame, {reference_total} volti nel passaggio full")
+    print(f"{'modalità':<12}{'ms/frame':>10}{'p95 ms':>10}{'speedup':>10}{'recall':>10}")
+    full_ms = np.mean(ms["full"])
+    for mode in DETECTION_MODES:
+        mean_ms = np.mean(ms[mode])
+        recall = found[mode] / reference_total if reference_total else float("nan")
+        print(f"{mode:<12}{mean_ms:>10.2f}{np.percentile(ms[mode], 95):>10.2f}"
+              f"{full_ms / mean_ms:>10.2f}{recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
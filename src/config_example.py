@@ -10,11 +10,20 @@ KNOWN_FACES_DIR = f"{DATA_DIR}/known_faces"
 CONVERSATIONS_DIR = f"{DATA_DIR}/conversations"
 PROFILES_DIR = f"{DATA_DIR}/profiles"
 EMBEDDINGS_PATH = f"{DATA_DIR}/embeddings.pkl"
+EMBEDDINGS_FILE = EMBEDDINGS_PATH              # vecchio pickle, migrato automaticamente
+GALLERY_FILE = f"{DATA_DIR}/gallery.bin"       # galleria binaria memory-mapped
+
+# --- Vision settings ---
+# 0 = webcam (indice), oppure percorso di un file video / cartella di immagini
+VIDEO_SOURCE = 0
+# "full": MTCNN sul frame intero | "downscaled": frame ridotto (volto minimo 80 px)
+# "roi": solo attorno ai tracker tra una scansione completa e l'altra
+DETECTION_MODE = "full"
 
 # --- Audio settings ---
 MIC_SAMPLE_RATE = 16000
-SILENCE_LIMIT = 3.2
-SILENCE_HANGOVER = 0.8
+SILENCE_LIMIT = 3.2       # secondi di attesa che l'utente inizi a parlare
+SILENCE_HANGOVER = 0.8    # silenzio che chiude un enunciato (VAD adattivo, utils/vad.py)
 SPEECH_MAX_DURATION = 20
 
 # --- Ollama API ---
@@ -0,0 +1,264 @@
+# ==========================================
+# 👥 REGISTRAZIONE MASSIVA DA KNOWN_FACES_DIR
+# ==========================================
+#
+#   python -m src.enroll_bulk                       # cartelle in KNOWN_FACES_DIR
+#   python -m src.enroll_bulk --dir foto/ --workers 8
+#
+# Struttura attesa: una cartella per persona, con quante immagini si vuole
+#   known_faces/Mario Rossi/001.jpg, 002.jpg, ...
+#
+# MTCNN + allineamento + ResNet (la stessa catena del riconoscimento live)
+# girano in più processi, a batch. Ogni immagine è identificata dall'hash
+# del contenuto: quelle già elaborate (manifest accanto alla galleria)
+# vengono saltate. Per persona si tengono al più MAX_PROTOTYPES embedding,
+# scelti per varietà; tutti i nuovi entrano in galleria con un solo commit.
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+from src.config import KNOWN_FACES_DIR, EMBEDDINGS_FILE
+from src.utils.embedding_store import open_store
+from src.utils.memory_manager import GALLERY_FILE
+from src.utils.face_matcher import l2_normalize, distance_to_similarity
+from src.utils.gallery import MAX_PROTOTYPES, PROTOTYPE_MIN_DIST
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+MANIFEST_VERSION = 1
+CHUNK_IMAGES = 32          # immagini per task inviato a un worker
+MAX_SIDE = 1280            # lato massimo prima della detection (foto da fotocamera)
+
+# stato per processo worker (modelli caricati una volta in _init_worker)
+_mtcnn = None
+_embedder = None
+
+
+def manifest_path(gallery_path):
+    return f"{gallery_path}.manifest.json"
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {"version": MANIFEST_VERSION, "images": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(path, manifest):
+    """Scrittura atomica: file temporaneo + os.replace."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def file_hash(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def scan_people(root):
+    """[(nome, percorso immagine)] da una cartella per persona."""
+    items = []
+    for name in sorted(os.listdir(root)):
+        person_dir = os.path.join(root, name)
+        if not os.path.isdir(person_dir):
+            continue
+        for dirpath, _, files in os.walk(person_dir):
+            for f in sorted(files):
+                if f.lower().endswith(IMAGE_EXTENSIONS):
+                    items.append((name.strip(), os.path.join(dirpath, f)))
+    return items
+
+
+# ==========================================================
+# 👷 WORKER (processi separati)
+# ==========================================================
+
+def _init_worker(torch_threads, max_batch):
+    global _mtcnn, _embedder
+    import torch
+    from src.utils.face_models import pick_device, create_mtcnn, FaceEmbedder
+
+    torch.set_num_threads(torch_threads)
+    device = pick_device()
+    _mtcnn = create_mtcnn(device)
+    _embedder = FaceEmbedder(device, max_batch)
+
+
+def _embed_chunk(paths):
+    """
+    Per ogni immagine: volto più grande, allineato, poi un solo embedding a
+    batch per tutto il chunk. Ritorna [(path, embedding | None, esito)].
+    """
+    from src.utils.face_models import detect_faces, largest_detection
+
+    faces, owners, results = [], [], {}
+    for path in paths:
+        image = cv2.imread(path)
+        if image is None:
+            results[path] = (None, "error")
+            continue
+        scale = MAX_SIDE / max(image.shape[:2])
+        if scale < 1.0:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+        largest = largest_detection(detect_faces(_mtcnn, rgb))
+        if largest is None:
+            results[path] = (None, "no_face")
+            continue
+        faces.append(largest["face"])
+        owners.append(path)
+
+    if faces:
+        embs = l2_normalize(_embedder.embed(faces))
+        for path, emb in zip(owners, embs):
+            results[path] = (emb, "ok")
+    return [(path, *results[path]) for path in paths]
+
+
+# ==========================================================
+# 🧩 SCELTA DEI PROTOTIPI
+# ==========================================================
+
+def select_prototypes(candidates, existing, limit=MAX_PROTOTYPES, min_dist=PROTOTYPE_MIN_DIST):
+    """
+    Indici dei candidati da aggiungere a `existing` (embedding normalizzati
+    già in galleria per la stessa persona) senza superare `limit`: ogni
+    volta il candidato più lontano da quelli già scelti, scartando i quasi
+    duplicati. Senza prototipi esistenti si parte dal più "tipico".
+    """
+    if len(candidates) == 0:
+        return []
+    max_sim = distance_to_similarity(min_dist)
+    basis = [e for e in existing]
+    remaining = list(range(len(candidates)))
+    chosen = []
+
+    while remaining and len(basis) < limit:
+        cand = candidates[remaining]
+        if basis:
+            closest = (cand @ np.asarray(basis).T).max(axis=1)
+            pick = int(np.argmin(closest))
+            if closest[pick] > max_sim:
+                break  # tutti i rimanenti sono duplicati di qualcosa già scelto
+        else:
+            pick = int(np.argmax((cand @ cand.T).mean(axis=1)))
+        idx = remaining.pop(pick)
+        chosen.append(idx)
+        basis.append(candidates[idx])
+    return chosen
+
+
+# ==========================================================
+# 🚀 MAIN
+# ==========================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Registrazione massiva dei volti da una cartella per persona.")
+    parser.add_argument("--dir", default=KNOWN_FACES_DIR, help="Cartella radice (default KNOWN_FACES_DIR)")
+    parser.add_argument("--gallery", default=GALLERY_FILE)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--batch", type=int, default=16, help="Volti per forward ResNet")
+    parser.add_argument("--all", action="store_true", help=f"Tieni tutti gli embedding (niente limite di {MAX_PROTOTYPES} per persona)")
+    parser.add_argument("--dry-run", action="store_true", help="Elabora ma non scrive galleria e manifest")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    mpath = manifest_path(args.gallery)
+    manifest = load_manifest(mpath)
+    seen = manifest["images"]
+
+    todo = {}   # hash → (nome, percorso); stesso contenuto in più file = una volta sola
+    skipped = 0
+    for name, path in scan_people(args.dir):
+        digest = file_hash(path)
+        entry = seen.get(digest)
+        if (entry is not None and entry["name"] == name) or digest in todo:
+            skipped += 1
+            continue
+        todo[digest] = (name, path)
+
+    print(f"📂 {len(todo)} immagini nuove o modificate, {skipped} invariate (manifest {os.path.basename(mpath)})")
+    if not todo:
+        return
+
+    by_path = {path: (digest, name) for digest, (name, path) in todo.items()}
+    paths = list(by_path)
+    chunks = [paths[i:i + CHUNK_IMAGES] for i in range(0, len(paths), CHUNK_IMAGES)]
+    threads = max(1, (os.cpu_count() or 2) // args.workers)
+
+    embeddings = {}     # nome → [(hash, embedding)]
+    outcome = {}        # hash → esito
+    done = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(threads, args.batch)) as pool:
+        futures = [pool.submit(_embed_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            for path, emb, status in future.result():
+                digest, name = by_path[path]
+                outcome[digest] = status
+                if emb is not None:
+                    embeddings.setdefault(name, []).append((digest, emb))
+            done += 1
+            print(f"  ⏳ {done}/{len(chunks)} blocchi", end="\r")
+    print()
+
+    # prototipi per persona, tenendo conto di quelli già in galleria
+    store = open_store(args.gallery, legacy_pickle=EMBEDDINGS_FILE)
+    matrix = store.matrix() if len(store) else None
+    rows_by_name = {}
+    replaced = set(store.replaced_rows())
+    for row, name in enumerate(store.names):
+        if row not in replaced:
+            rows_by_name.setdefault(name, []).append(row)
+
+    items = []
+    for name, entries in sorted(embeddings.items()):
+        cands = np.stack([emb for _, emb in entries])
+        if args.all:
+            chosen = list(range(len(entries)))
+        else:
+            existing = np.asarray(matrix[rows_by_name[name]]) if name in rows_by_name else []
+            chosen = select_prototypes(cands, existing)
+        for i, (digest, _) in enumerate(entries):
+            outcome[digest] = "enrolled" if i in chosen else "redundant"
+        items += [(name, cands[i]) for i in chosen]
+
+    counts = {}
+    for status in outcome.values():
+        counts[status] = counts.get(status, 0) + 1
+    print("🧬 Esiti: " + ", ".join(f"{k} {v}" for k, v in sorted(counts.items())))
+
+    if args.dry_run:
+        print(f"🔍 Dry run: {len(items)} embedding per {len(embeddings)} persone non scritti.")
+        return
+
+    # un solo commit dell'header per tutti i nuovi prototipi, poi il manifest
+    store.append_many(items)
+    for digest, status in outcome.items():
+        if status == "error":
+            continue  # immagini illeggibili: riprovate alla prossima esecuzione
+        name, path = todo[digest]
+        seen[digest] = {"name": name, "path": os.path.relpath(path, args.dir), "status": status}
+    save_manifest(mpath, manifest)
+
+    print(f"✅ {len(items)} embedding aggiunti per {len(embeddings)} persone "
+          f"in {time.perf_counter() - t0:.1f}s (galleria: {len(store)} righe)")
+
+
+if __name__ == "__main__":
+    main()
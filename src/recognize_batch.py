@@ -0,0 +1,216 @@
+# ==========================================
+# 🗃️ RICONOSCIMENTO BATCH (HEADLESS) SU VIDEO E CARTELLE
+# ==========================================
+#
+#   python -m src.recognize_batch data/clip.mp4 --out clip.jsonl
+#   python -m src.recognize_batch data/frames/ --detection-mode downscaled --tracker kalman
+#
+# Stessa catena del riconoscimento live (detection MTCNN, tracker,
+# associazione, scelta del volto migliore, embedding ResNet, matching sulla
+# galleria) ma senza finestra, audio né tastiera, e alla massima velocità:
+# ogni frame della sorgente viene elaborato. Per ogni frame scrive una riga
+# JSONL con i tracker visibili e la loro identità; alla fine riporta i
+# frame/s di ogni stadio. Il tempo "video" (frame / fps) sostituisce
+# l'orologio, quindi due esecuzioni sulla stessa sorgente danno lo stesso output.
+#
+# Non importa recognize_live (msvcrt, TTS, Ollama): gira su Linux senza webcam.
+
+import argparse
+import json
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from src.utils.capture import open_source, ThreadedCapture
+from src.utils.face_models import (
+    pick_device, create_mtcnn, warm_up_mtcnn, run_detection, FaceEmbedder, DETECTION_MODES,
+)
+from src.utils.trackers import TrackerSet, TRACKER_BACKENDS
+from src.utils.association import associate, IOU_THRESHOLD
+from src.utils.identity_cache import IdentityCache
+from src.utils.face_quality import BestFaceSelector
+from src.utils.embedding_store import EmbeddingStore
+from src.utils.gallery import LiveGallery
+from src.utils.face_matcher import MatchResult, UNKNOWN_NAME
+
+FRAME_SIZE = (640, 480)
+DEFAULT_FPS = 30.0
+STAGES = ("capture", "preprocess", "detect", "track", "embed", "match", "output")
+
+
+def default_gallery():
+    """Stessa galleria del riconoscimento live (None solo senza config.py)."""
+    try:
+        from src.utils.memory_manager import GALLERY_FILE
+    except ImportError:
+        return None
+    return GALLERY_FILE
+
+
+class StageTimer:
+    """Tempo cumulato per stadio della pipeline."""
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        self._t = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.seconds[stage] += now - self._t
+        self._t = now
+
+    def report(self, frames, wall):
+        print(f"\n{'stadio':<12}{'ms/frame':>10}{'frame/s':>10}{'quota':>8}", file=sys.stderr)
+        total = sum(self.seconds.values()) or 1.0
+        for stage, sec in self.seconds.items():
+            ms = sec * 1000.0 / max(frames, 1)
+            fps = frames / sec if sec > 0 else float("inf")
+            print(f"{stage:<12}{ms:>10.2f}{fps:>10.1f}{sec / total:>8.0%}", file=sys.stderr)
+        print(f"{'totale':<12}{wall * 1000.0 / max(frames, 1):>10.2f}{frames / wall:>10.1f}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Riconoscimento volti headless su video o cartelle di immagini (output JSONL).")
+    parser.add_argument("source", help="File/URL video, cartella di immagini o indice webcam")
+    parser.add_argument("--out", help="File JSONL di uscita (default: stdout)")
+    parser.add_argument("--gallery", default=default_gallery(), help="Galleria (gallery.bin); default quella del riconoscimento live")
+    parser.add_argument("--detection-mode", choices=DETECTION_MODES, default="full")
+    parser.add_argument("--tracker", choices=TRACKER_BACKENDS, default="csrt")
+    parser.add_argument("--detect-every", type=int, default=1, help="Detection ogni N frame (tracker in mezzo)")
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--fps", type=float, default=None, help="Cadenza della sorgente se non dichiarata dal file")
+    args = parser.parse_args()
+
+    source = open_source(args.source)
+    if not source.is_opened():
+        parser.error(f"impossibile aprire la sorgente {args.source!r}")
+    fps = args.fps or source.fps or DEFAULT_FPS
+
+    device = pick_device()
+    print(f"⚙️ Caricamento modelli su {device}...", file=sys.stderr)
+    mtcnn = create_mtcnn(device)
+    warm_up_mtcnn(mtcnn)
+    embedder = FaceEmbedder(device)
+    embedder.warm_up()
+
+    if args.gallery:
+        gallery = LiveGallery(EmbeddingStore(args.gallery))
+        print(f"📂 Galleria {args.gallery}: {len(gallery)} embedding", file=sys.stderr)
+        if not len(gallery):
+            print("⚠️ Galleria vuota o inesistente: tutti i volti risulteranno sconosciuti.", file=sys.stderr)
+    else:
+        gallery = None
+        print("⚠️ Nessuna galleria: tutti i volti risulteranno sconosciuti.", file=sys.stderr)
+
+    tracks = TrackerSet(args.tracker)
+    identities = IdentityCache()
+    face_selector = BestFaceSelector()
+    rgb = np.empty((FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+    bgr = np.empty_like(rgb)
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    cap = ThreadedCapture(source, live=False).start()  # decodifica in parallelo, nessun frame perso
+    timer = StageTimer()
+    t_start = time.perf_counter()
+    frame_id = 0
+    n_faces = 0
+
+    try:
+        while args.max_frames is None or frame_id < args.max_frames:
+            ok, raw = cap.read(timeout=10.0)
+            if not ok:
+                break
+            frame_id += 1
+            now = frame_id / fps
+            timer.lap("capture")
+
+            cv2.resize(raw, FRAME_SIZE, dst=bgr)
+            cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=rgb)
+            timer.lap("preprocess")
+
+            detections = None
+            if (frame_id - 1) % args.detect_every == 0:
+                rois = None
+                if args.detection_mode == "roi" and (frame_id - 1) % (args.detect_every * 10) != 0:
+                    rois = [(x, y, x + w, y + h) for x, y, w, h in tracks.boxes.values()] or None
+                detections = run_detection(mtcnn, rgb, args.detection_mode, rois)
+            timer.lap("detect")
+
+            for tid in tracks.update(frame_id, bgr):
+                identities.drop(tid)
+                face_selector.drop(tid)
+            det_for_track = {}
+            if detections is not None:
+                track_ids = list(tracks.boxes)
+                track_xyxy = [(x, y, x + w, y + h) for x, y, w, h in tracks.boxes.values()]
+                assoc = associate(track_xyxy, [d["box"] for d in detections], IOU_THRESHOLD)
+                for ti, di in assoc.matches:
+                    x1, y1, x2, y2 = map(int, detections[di]["box"])
+                    tracks.correct(track_ids[ti], bgr, (x1, y1, x2 - x1, y2 - y1))
+                    det_for_track[track_ids[ti]] = detections[di]
+                for di in assoc.new_detections:
+                    x1, y1, x2, y2 = map(int, detections[di]["box"])
+                    det_for_track[tracks.add(bgr, (x1, y1, x2 - x1, y2 - y1))] = detections[di]
+                for ti in assoc.lost_tracks:
+                    if tracks.miss(track_ids[ti]):
+                        identities.drop(track_ids[ti])
+                        face_selector.drop(track_ids[ti])
+            for tid in tracks.tracks:
+                if tracks.lost[tid] or tracks.missed[tid]:
+                    identities.mark_occluded(tid)
+            timer.lap("track")
+
+            for tid, det in det_for_track.items():
+                if det["face"] is not None and identities.wants_embedding(tid, now):
+                    face_selector.offer(tid, det, now)
+            ready = face_selector.pop_ready(now)
+            embs = None
+            if ready:
+                embs = embedder.embed([det["face"] for _, det in ready])
+                for tid, _ in ready:
+                    identities.embedding_requested(tid, now)
+                n_faces += len(ready)
+            timer.lap("embed")
+
+            if ready:
+                if gallery is not None and len(gallery):
+                    results = gallery.match_batch(embs)
+                else:
+                    results = [MatchResult(None, float("inf"), 0.0)] * len(ready)
+                for (tid, _), result in zip(ready, results):
+                    identities.observe(tid, result)
+            timer.lap("match")
+
+            record = {"frame": frame_id, "time": round(now, 3), "tracks": []}
+            for tid, (x, y, w, h) in tracks.visible():
+                ident = identities.get(tid)
+                distance = ident.mean_distance()
+                record["tracks"].append({
+                    "id": tid,
+                    "box": [x, y, w, h],
+                    "name": ident.name if ident.name is not None else UNKNOWN_NAME,
+                    "state": ident.state,
+                    "confidence": round(ident.confidence, 3),
+                    "distance": round(distance, 4) if np.isfinite(distance) else None,
+                    "detected": tid in det_for_track,
+                })
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            timer.lap("output")
+    finally:
+        cap.release()
+        if out is not sys.stdout:
+            out.close()
+
+    wall = time.perf_counter() - t_start
+    if frame_id == 0:
+        print("❌ Nessun frame letto dalla sorgente.", file=sys.stderr)
+        return
+    print(f"\n✅ {frame_id} frame in {wall:.1f}s ({frame_id / wall:.1f} frame/s), "
+          f"{n_faces} volti embeddati", file=sys.stderr)
+    timer.report(frame_id, wall)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,8 @@
 # 🎥 FACE RECOGNITION LIVE (ASYNCHRONOUS)
 # ==========================================
 
-import os
 import cv2
-import pickle
+import numpy as np
 import time
 import threading
 import msvcrt
@@ -13,20 +12,31 @@ import traceback
 
 # === UTILS ===
 
-from src.config import EMBEDDINGS_FILE
-from src.utils.facenet_utils import compare_embeddings
-from src.utils.speech_utils import speak, transcribe_audio, extract_name_from_text
+from src import config
+from src.utils.speech_utils import speak, extract_name_from_text, get_speech_engine
+from src.utils.speech_service import listen, start_speech_service, stop_speech_service, speech_stats
+from src.utils.mic_stream import get_mic_stream, close_mic_stream
 from src.utils.dialog_manager import ask_ollama_with_context, summarize_conversation
 from src.utils.text_post import clean_llm_reply
 from src.utils.profile_manager import load_recent_history
-from src.utils.memory_manager import log_full_conversation, save_new_face
+from src.utils.capture import open_source, ThreadedCapture
+from src.utils.motion import MotionMeter
+from src.utils.idle import IdleMonitor
+from src.utils.detect_scheduler import DetectScheduler
+from src.utils.trackers import TrackerSet
+from src.utils.association import associate
+from src.utils.identity_cache import IdentityCache, CONFIRMED
+from src.utils.face_quality import BestFaceSelector
+from src.utils.face_matcher import UNKNOWN_NAME
+from src.utils.memory_manager import log_full_conversation, save_new_face, get_live_gallery
 from src.utils.async_core import (
     detect_request_q, detect_result_q,
     embed_request_q, embed_result_q,
-    start_workers, exit_event,
-    speak_async, shutdown_executors,
+    start_workers, exit_event, get_frame_ring, DETECTION_MODE,
+    speak_async, shutdown_executors, stop_workers,
     worker_ready_event, ask_ollama_async,
-    embedding_ready_event
+    embedding_ready_event, get_embed_stats,
+    crop_face_for_embedding
 )
 
 # ==========================================
@@ -37,33 +47,13 @@ from src.utils.async_core import (
 
 # 🔧 Configurazione ottimizzata
 TRACKER_MAX_LOST = 15  # 🔧 Aumentato da 8 (più tollerante)
-EMBED_INTERVAL = 20.0   # 🔧 Secondi tra embedding dello stesso tracker
+TRACKER_MAX_MISSED = 2  # 🔧 Detection consecutive senza conferma prima di rimuovere un tracker
+TRACKER_BACKEND = "csrt"  # 🔧 "csrt" | "kcf" | "mosse" | "kalman" (solo detection, quasi gratuito)
 RESEEN_THRESHOLD = 30  # 🔧 Secondi prima di ri-salutare
+PERCEPTION_MODE = "thread"  # 🔧 "process": MTCNN e ResNet in processi separati (macchine multi-core)
+SPEECH_MODE = "thread"      # 🔧 "process": microfono, VAD e Vosk in un processo separato
 IOU_THRESHOLD = 0.3    # 🔧 Soglia IoU per matching
-
-# ==========================================
-# 🧮 UTILITY FUNCTIONS
-# ==========================================
-
-def iou(box1, box2):
-    """
-    Calcola Intersection over Union tra due box.
-    box format: (x, y, w, h)
-    """
-    x1, y1, w1, h1 = box1
-    x2, y2, w2, h2 = box2
-    
-    xi1 = max(x1, x2)
-    yi1 = max(y1, y2)
-    xi2 = min(x1 + w1, x2 + w2)
-    yi2 = min(y1 + h1, y2 + h2)
-    
-    inter_area = max(0, xi2 - xi1) * max(0, yi2 - yi1)
-    box1_area = w1 * h1
-    box2_area = w2 * h2
-    union_area = box1_area + box2_area - inter_area
-    
-    return inter_area / union_area if union_area > 0 else 0
+VIDEO_SOURCE = getattr(config, "VIDEO_SOURCE", 0)  # 🔧 Webcam (indice) o URL/file; config.py può ridefinirla
 
 # ==========================================
 # ⌨️ ASCOLTO TASTO 'Q'
@@ -93,7 +83,7 @@ def handle_interaction(name: str, embedding=None):
             speak_async(speak, "Ciao! Non credo di averti mai conosciuto prima, come ti chiami?").result()
             time.sleep(1.2)
 
-            user_name = transcribe_audio(
+            user_name = listen(
                 duration=12,
                 stop_on_silence=True,
                 silence_limit=3.5
@@ -154,7 +144,7 @@ def handle_interaction(name: str, embedding=None):
 
         while not exit_event.is_set():
             # 🎤 ascolta utente
-            user_text = transcribe_audio(
+            user_text = listen(
                 duration=20,
                 stop_on_silence=True,
                 silence_limit=3.2
@@ -333,15 +323,13 @@ def handle_interaction_threadsafe(name, embedding=None):
 # ==========================================
 
 def load_known_faces():
-    """Carica il database di embedding noti."""
-    if os.path.exists(EMBEDDINGS_FILE):
-        with open(EMBEDDINGS_FILE, "rb") as f:
-            known = pickle.load(f)
-        print(f"✅ Caricati {len(known)} volti noti.")
-        return known
+    """Apre la galleria live (memory-mapped, aggiornata dalle nuove registrazioni)."""
+    gallery = get_live_gallery()
+    if len(gallery):
+        print(f"✅ Caricati {len(gallery)} volti noti.")
     else:
         print("⚠️ Nessun volto registrato. Avvio in modalità rilevazione.")
-        return {}
+    return gallery
 
 # ==========================================
 # 🧠 MAIN LOOP
@@ -349,38 +337,51 @@ def load_known_faces():
 
 def main():
     # === AVVIO WORKER E TRACKER ===
-    start_workers(speak_func=speak)
+    # il modello Vosk si carica in background mentre MTCNN/ResNet fanno warm-up
+    if SPEECH_MODE == "process":
+        start_speech_service()
+    else:
+        get_speech_engine().preload()
+    start_workers(speak_func=speak, mode=PERCEPTION_MODE)
 
     print("🔊 Warm-up TTS...")
     speak(" ")
     print("✅ TTS pronto.")
 
+    # microfono aperto una volta sola: i turni di ascolto leggono dal suo ring buffer
+    if SPEECH_MODE != "process" and get_mic_stream() is None:
+        print("⚠️ Nessun microfono disponibile: le conversazioni non potranno ascoltare.")
+
     print("🕐 Attendo che i worker completino il warm-up...")
     worker_ready_event.wait()
     embedding_ready_event.wait()
     print("✅ Tutti i worker pronti. Avvio webcam.")
 
     # Carica database
-    known_faces = load_known_faces()
+    gallery = load_known_faces()
 
-    # Avvia webcam
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
-        print("❌ Errore: impossibile aprire la webcam.")
+    # Avvia sorgente video (webcam, file o cartella di immagini) in un thread dedicato
+    source = open_source(VIDEO_SOURCE)
+    if not source.is_opened():
+        print(f"❌ Errore: impossibile aprire la sorgente video {VIDEO_SOURCE!r}.")
         return
+    cap = ThreadedCapture(source, live=True).start()
 
     print("\n🎬 Avvio riconoscimento live...")
     print("Premi 'q' per uscire.\n")
 
     # 🔧 FIX: seen_names ora è un dict con timestamp
-    seen_names = {}  # name -> timestamp ultimo saluto
+    seen_names = {}  # nome (o id tracker se sconosciuto) -> timestamp ultimo saluto
     active_interactions = {}  # name/id -> thread attiva
     
-    trackers = {}            # id → tracker
-    track_lost = {}          # id → contatore frame persi
-    tracker_boxes = {}       # id → (x, y, w, h) ultima box nota
-    last_embed_time = {}     # id → timestamp ultimo embedding
-    next_face_id = 0
+    frame_ring = get_frame_ring()  # slot preallocati condivisi con il detection worker
+    motion_meter = MotionMeter()
+    idle = IdleMonitor()     # niente volti per un po' → solo differenza tra frame a bassa cadenza
+    detect_scheduler = DetectScheduler()  # cadenze in utils/detect_scheduler.py
+    tracks = TrackerSet(TRACKER_BACKEND, TRACKER_MAX_LOST, TRACKER_MAX_MISSED)  # id → tracker, box, frame persi
+    identities = IdentityCache()  # id → identità votata (decide quando ri-embeddare)
+    face_selector = BestFaceSelector()  # id → miglior volto della finestra corrente
+    greeting_waits = set()   # tracker in attesa della fine della conversazione corrente
     frame_id = 0
 
     # Avvia thread per ascolto tasto 'q'
@@ -389,199 +390,242 @@ def main():
     print("\n🎬 Sistema pronto. Avvio stream video...\n")
 
     while not exit_event.is_set():
-        ret, frame = cap.read()
+        ret, raw_frame = cap.read()
         if not ret:
-            print("❌ Frame non letto correttamente.")
-            break
+            if cap.eof:
+                print("❌ Sorgente video terminata o frame non letto correttamente.")
+                break
+            continue  # nessun frame nuovo entro il timeout: si riprova
+
+        # --- 💤 In idle: solo movimento, a IDLE_FPS, finché qualcosa non si muove
+        if idle.active:
+            loop_start = time.time()
+            if not idle.should_wake(loop_start, motion_meter.update(raw_frame)):
+                if cv2.waitKey(1) & 0xFF == ord("q"):
+                    exit_event.set()
+                    break
+                time.sleep(max(0.0, idle.period - (time.time() - loop_start)))
+                continue
+            detect_scheduler.request_full_scan()
 
-        frame = cv2.resize(frame, (640, 480))
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         frame_id += 1
+
+        # --- 🔹 Scrive il frame una sola volta in uno slot del ring condiviso
+        slot = frame_ring.acquire_write(frame_id)
+        if slot is None:
+            continue  # tutti gli slot ancora in uso: salta questo frame
+        cv2.resize(raw_frame, (640, 480), dst=slot.bgr)
+        cv2.cvtColor(slot.bgr, cv2.COLOR_BGR2RGB, dst=slot.rgb)
+        frame, rgb = slot.bgr, slot.rgb
         current_time = time.time()
 
-        # --- 🔹 Invia frame al detection worker (max 1 alla volta)
-        if detect_request_q.qsize() < 1:
+        # --- 🔹 Integra volti registrati da altri processi (controllo leggero dell'header)
+        gallery.poll_external(current_time)
+
+        # --- 🔹 Invia frame al detection worker (max 1 alla volta, cadenza adattiva)
+        motion = motion_meter.update(frame)
+        if detect_request_q.qsize() < 1 and detect_scheduler.should_detect(
+                current_time, len(tracks), tracks.lost.values(), motion,
+                motion_meter.scene_change):
+            rois = None
+            if DETECTION_MODE == "roi" and detect_scheduler.reason == "rate":
+                # tra le scansioni complete basta riesaminare le zone dei tracker
+                rois = [(x, y, x + w, y + h) for x, y, w, h in tracks.boxes.values()] or None
             try:
-                detect_request_q.put_nowait((frame_id, rgb.copy()))
+                # il worker legge lo slot senza copiarlo e lo rilascia a fine detection
+                detect_request_q.put_nowait((frame_id, slot.retain(), rois))
+                detect_scheduler.mark_submitted(current_time)
             except queue.Full:
-                pass
+                slot.release()
 
         # --- 🔹 Recupera eventuali risultati del detection worker
-        boxes = None
+        detections = None
         try:
             while not detect_result_q.empty():
                 det_fid, result = detect_result_q.get_nowait()
                 detect_result_q.task_done()
-                boxes = result
+                detections = result
         except queue.Empty:
             pass
 
-        # --- 🔹 Se nessuna detection, aggiorna tracker esistenti
-        if boxes is None and trackers:
-            boxes = []
-            for tid, tr in list(trackers.items()):
-                ok, box = tr.update(frame)
-                if ok:
-                    x, y, w, h = map(int, box)
-                    boxes.append([x, y, x + w, y + h])
-                    track_lost[tid] = 0
-                    tracker_boxes[tid] = (x, y, w, h)
-                else:
-                    track_lost[tid] += 1
-                    # 🔧 FIX: Più tollerante prima di rimuovere
-                    if track_lost[tid] > TRACKER_MAX_LOST:
-                        print(f"❌ Tracker {tid} perso definitivamente")
-                        del trackers[tid]
-                        del track_lost[tid]
-                        tracker_boxes.pop(tid, None)
-                        last_embed_time.pop(tid, None)
-
-        # --- 🔹 Gestione dei tracker (crea nuovi, aggiorna, rimuove persi)
-        if boxes is not None:
-            boxes = [b for b in boxes if b is not None]
-
-            updated_trackers = {}
-            matched_ids = set()
-
-            for b in boxes:
-                x1, y1, x2, y2 = map(int, b)
-                w, h = x2 - x1, y2 - y1
-                new_box = (x1, y1, w, h)
-
-                # 🔧 FIX: Matching basato su IoU
-                best_iou = IOU_THRESHOLD
-                matched_id = None
-                
-                for tid in list(trackers.keys()):
-                    if tid in matched_ids:
-                        continue
-                    
-                    if tid in tracker_boxes:
-                        current_iou = iou(new_box, tracker_boxes[tid])
-                        if current_iou > best_iou:
-                            best_iou = current_iou
-                            matched_id = tid
-
-                # 🔹 Se trovato match, re-inizializza tracker
-                if matched_id is not None:
-                    trackers[matched_id].init(frame, new_box)
-                    updated_trackers[matched_id] = trackers[matched_id]
-                    tracker_boxes[matched_id] = new_box
-                    track_lost[matched_id] = 0
-                    matched_ids.add(matched_id)
-                else:
-                    # 🔹 Crea nuovo tracker
-                    tracker = (
-                        cv2.legacy.TrackerCSRT_create()
-                        if hasattr(cv2.legacy, "TrackerCSRT_create")
-                        else cv2.TrackerCSRT_create()
-                    )
-                    tid = f"t{next_face_id}"
-                    tracker.init(frame, new_box)
-                    updated_trackers[tid] = tracker
-                    tracker_boxes[tid] = new_box
-                    track_lost[tid] = 0
-                    print(f"🆕 Nuovo tracker {tid} creato {new_box}")
-                    next_face_id += 1
-                    matched_ids.add(tid)
-
-            trackers = updated_trackers
-
-        # --- 🔹 Disegna box e invia embedding request (con rate limiting)
-        for tid, tr in list(trackers.items()):
-            ok, box = tr.update(frame)
-            
-            if not ok or box is None:
-                track_lost[tid] += 1
-                if track_lost[tid] > TRACKER_MAX_LOST:
-                    print(f"❌ Tracker {tid} perso, rimosso")
-                    trackers.pop(tid, None)
-                    track_lost.pop(tid, None)
-                    tracker_boxes.pop(tid, None)
-                    last_embed_time.pop(tid, None)
-                continue
-            
-            x, y, w, h = map(int, box)
-            
-            if w <= 0 or h <= 0:
-                track_lost[tid] += 1
-                continue
-            
-            track_lost[tid] = 0
-            tracker_boxes[tid] = (x, y, w, h)
+        # --- 🔹 Aggiorna ogni tracker una sola volta per questo frame
+        for tid in tracks.update(frame_id, frame):
+            print(f"❌ Tracker {tid} perso, rimosso")
+            identities.drop(tid)
+            face_selector.drop(tid)
+
+        # --- 🔹 Gestione dei tracker (crea nuovi, riaggancia, rimuove non più rilevati)
+        det_for_track = {}  # id → detection MTCNN di questo frame (con volto allineato)
+        if detections is not None:
+            detections = [d for d in detections if d["box"] is not None]
+            track_ids = list(tracks.boxes)
+            track_xyxy = [(x, y, x + w, y + h) for x, y, w, h in tracks.boxes.values()]
+
+            # 🔧 Assegnamento ottimo su tutta la matrice IoU tracker × detection
+            assoc = associate(track_xyxy, [d["box"] for d in detections], IOU_THRESHOLD)
+
+            # 🔹 Match: riaggancia il tracker alla detection
+            for ti, di in assoc.matches:
+                tid = track_ids[ti]
+                x1, y1, x2, y2 = map(int, detections[di]["box"])
+                tracks.correct(tid, frame, (x1, y1, x2 - x1, y2 - y1))
+                det_for_track[tid] = detections[di]
+
+            # 🔹 Detection senza tracker: nuovo tracker
+            for di in assoc.new_detections:
+                x1, y1, x2, y2 = map(int, detections[di]["box"])
+                new_box = (x1, y1, x2 - x1, y2 - y1)
+                tid = tracks.add(frame, new_box)
+                print(f"🆕 Nuovo tracker {tid} creato {new_box}")
+                det_for_track[tid] = detections[di]
+
+            # 🔹 Tracker non confermati: tollerati per qualche detection, poi rimossi
+            for ti in assoc.lost_tracks:
+                tid = track_ids[ti]
+                if tracks.miss(tid):
+                    print(f"❌ Tracker {tid} non più rilevato, rimosso")
+                    identities.drop(tid)
+                    face_selector.drop(tid)
+
+        # --- 🔹 Tracker persi o non confermati per qualche frame: identità da riverificare
+        for tid in tracks.tracks:
+            if tracks.lost[tid] or tracks.missed[tid]:
+                identities.mark_occluded(tid)
+        identities.on_gallery_change(gallery.generation)
+
+        # --- 🔹 Disegna box e candida i volti dei tracker con identità incerta
+        for tid, (x, y, w, h) in tracks.visible():
             cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
 
-            # 🔧 FIX: Rate limiting embedding request
-            if tid not in last_embed_time or current_time - last_embed_time[tid] > EMBED_INTERVAL:
-                if not embed_request_q.full():
-                    try:
-                        embed_request_q.put_nowait((tid, rgb.copy(), (x, y, x + w, y + h)))
-                        last_embed_time[tid] = current_time
-                    except queue.Full:
-                        pass
+            # Solo sui frame con detection MTCNN: volto già allineato dai landmark
+            det = det_for_track.get(tid)
+            if det is not None and identities.wants_embedding(tid, current_time):
+                face_selector.offer(tid, det, current_time)
+
+        # --- 🔹 Invia a ResNet solo il volto migliore di ogni finestra (quanti ne entrano in coda)
+        free_slots = embed_request_q.maxsize - embed_request_q.qsize()
+        for tid, det in face_selector.pop_ready(current_time, limit=free_slots):
+            face = det["face"]
+            if face is None:
+                # crop grezzo solo se l'allineamento è fallito
+                face = crop_face_for_embedding(rgb, det["box"])
+            if face is not None:
+                try:
+                    embed_request_q.put_nowait((tid, face))
+                    identities.embedding_requested(tid, current_time)
+                except queue.Full:
+                    pass
 
         # --- 🔹 Legge eventuali embedding pronti
+        ready = []
         try:
             while not embed_result_q.empty():
-                emb_fid, embedding = embed_result_q.get_nowait()
+                ready.append(embed_result_q.get_nowait())
                 embed_result_q.task_done()
+        except queue.Empty:
+            pass
 
-                name = "Volto rilevato"
-
-                # 🔍 Confronto con database volti noti
-                if known_faces:
-                    for person, emb_db in known_faces.items():
-                        match, dist = compare_embeddings(embedding, emb_db)
-                        if match:
-                            name = person
-                            break
-
-                # === 🔧 FIX: evita doppie interazioni ===
-                current_time = time.time()
-                # se sconosciuto → usa id tracker come chiave unica
-                display_key = name if name != "Volto rilevato" else emb_fid
-
-                # Controlla se è già attiva un’interazione per questo volto
-                existing = active_interactions.get(display_key)
-                if existing and getattr(existing, "is_alive", lambda: False)():
-                    # già in conversazione, aggiorna solo timestamp e salta
-                    seen_names[name] = current_time
-                    continue
+        if ready:
+            # 🔍 Confronto con database volti noti (un solo prodotto matriciale per tutto il batch)
+            results = gallery.match_batch(np.concatenate([emb.reshape(1, -1) for _, emb in ready]))
+
+            for (emb_fid, embedding), result in zip(ready, results):
+                if result.name is not None:
+                    # match molto sicuro → nuovo prototipo per questa persona (in background)
+                    gallery.learn(result.name, embedding, result)
+
+                # voto per l'identità del tracker: si interagisce solo quando è confermata
+                identities.observe(emb_fid, result, embedding)
+
+        # --- 🔹 Saluto dei tracker confermati e non ancora salutati (ricontrollati a ogni
+        #        frame: chi arriva durante una conversazione viene salutato quando finisce)
+        for tid, ident in identities.awaiting_greeting():
+            name = ident.name if ident.name is not None else UNKNOWN_NAME
+            # se sconosciuto → usa id tracker come chiave unica
+            display_key = name if name != UNKNOWN_NAME else tid
+
+            # === 🔧 FIX: evita doppie interazioni ===
+            existing = active_interactions.get(display_key)
+            if existing is not None and existing.is_alive():
+                # già in conversazione con questa persona: niente saluto
+                seen_names[display_key] = current_time
+                identities.mark_greeted(tid)
+                continue
 
-                # Controlla cooldown per ri-saluto
-                if name not in seen_names or current_time - seen_names[name] > RESEEN_THRESHOLD:
-                    if conversation_lock.locked():
-                        print(f"⏳ Attesa fine conversazione corrente prima di interagire con {name}.")
-                    else:
-                        seen_names[name] = current_time
-                        print(f"👁️  Nuovo volto rilevato: {name}")
+            # un'interazione alla volta: il tracker resta in attesa e si riprova ai frame successivi
+            if conversation_lock.locked() or any(t.is_alive() for t in active_interactions.values()):
+                if tid not in greeting_waits:
+                    greeting_waits.add(tid)
+                    print(f"⏳ Attesa fine conversazione corrente prima di interagire con {name}.")
+                continue
 
-                        # Avvia nuova interazione in thread dedicato
-                        th = threading.Thread(target=handle_interaction_threadsafe, args=(name, embedding), daemon=True)
-                        active_interactions[display_key] = th
-                        th.start()
+            # Cooldown per ri-saluto (per gli sconosciuti vale solo per lo stesso tracker)
+            if display_key in seen_names and current_time - seen_names[display_key] <= RESEEN_THRESHOLD:
+                greeting_waits.discard(tid)
+                identities.mark_greeted(tid)
+                continue
 
-                    # Thread watcher che rimuove la entry a fine interazione
-                    def _cleanup_thread(t, key):
-                        t.join()
-                        active_interactions.pop(key, None)
+            greeting_waits.discard(tid)
+            identities.mark_greeted(tid)
+            seen_names[display_key] = current_time
+            print(f"👁️  Nuovo volto rilevato: {name}")
 
-                    threading.Thread(target=_cleanup_thread, args=(th, display_key), daemon=True).start()
+            # Avvia nuova interazione in thread dedicato
+            th = threading.Thread(target=handle_interaction_threadsafe, args=(name, ident.embedding), daemon=True)
+            active_interactions[display_key] = th
+            th.start()
 
-        except queue.Empty:
-            pass
+            # Thread watcher che rimuove la entry a fine interazione
+            def _cleanup_thread(t, key):
+                t.join()
+                active_interactions.pop(key, None)
+
+            threading.Thread(target=_cleanup_thread, args=(th, display_key), daemon=True).start()
 
         # --- 🔹 Mostra frame
         cv2.imshow("Face Recognition Live", frame)
+        slot.release()
+
+        # --- 💤 Nessun volto da IDLE_AFTER secondi e nessuna conversazione: idle
+        if detections or len(tracks):
+            idle.saw_faces(current_time)
+        idle.should_enter(current_time, busy=conversation_lock.locked())
         if cv2.waitKey(1) & 0xFF == ord("q"):
             exit_event.set()
             break
 
     # --- 🔹 Cleanup finale
+    sched = detect_scheduler.stats()
+    print(f"⏱️ Detection: {sched['submitted']} eseguite, {sched['skipped']} risparmiate "
+          f"({sched['skip_ratio']:.0%}; cambi scena {sched['reason_scene']}, "
+          f"scansioni periodiche {sched['reason_full_scan']})")
+    tstats = tracks.stats()
+    print(f"🎯 Tracker {tstats['backend']}: {tstats['updates']} update, "
+          f"{tstats['avg_ms_per_update']:.2f} ms/tracker, {tstats['avg_ms_per_frame']:.2f} ms/frame "
+          f"(max {tstats['max_ms_per_frame']:.1f})")
+    stats = get_embed_stats()
+    print(f"🧬 Embedding: {stats['faces']} volti in {stats['batches']} batch "
+          f"(media {stats['avg_batch']:.1f} volti, {stats['avg_ms']:.1f} ms/batch, "
+          f"{stats['avg_ms_per_face']:.1f} ms/volto; {identities.requested} richiesti, "
+          f"{identities.skipped} evitati per identità già confermata)")
+    istats = idle.stats()
+    print(f"💤 Idle: {istats['entries']} volte, {istats['idle_seconds']:.0f}s in totale")
+    cstats = cap.stats()
+    print(f"📷 Acquisizione: {cstats['read']} frame letti, {cstats['delivered']} elaborati, "
+          f"{cstats['dropped']} scartati per restare sul frame più recente")
+    print(f"🔎 Qualità: {face_selector.selected} volti scelti su {face_selector.offered} candidati, "
+          f"{face_selector.rejected} finestre scartate")
+    sstats = speech_stats()
+    if sstats and sstats["loaded"]:
+        mem = f", +{sstats['load_mb']:.0f} MB" if sstats["load_mb"] is not None else ""
+        print(f"🗣️ Vosk: modello caricato in {sstats['load_seconds']:.1f}s{mem}; "
+              f"{sstats['created']} recognizer creati, {sstats['reused']} riusati")
     shutdown_executors()
     cap.release()
     cv2.destroyAllWindows()
-    exit_event.set()
+    stop_speech_service()
+    close_mic_stream()
+    stop_workers()
     print("\n✅ Chiusura completata.")
 
 
@@ -1,10 +1,16 @@
 import os
-import pickle
-from utils.facenet_utils import get_face_embedding
+import sys
 
-DATA_PATH = "../data"
+# avviabile sia da src/ (`python register_face.py`) sia come `python -m src.register_face`
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from src.utils.facenet_utils import get_face_embedding  # noqa: E402 (dopo sys.path)
+from src.utils.memory_manager import save_new_face  # noqa: E402
+
+DATA_PATH = os.path.join(ROOT, "data")
 KNOWN_FACES = os.path.join(DATA_PATH, "known_faces")
-EMB_FILE = os.path.join(DATA_PATH, "embeddings.pkl")
 
 os.makedirs(KNOWN_FACES, exist_ok=True)
 
@@ -14,17 +20,8 @@ img_path = input("Percorso immagine (es. mario.jpg): ").strip()
 embedding = get_face_embedding(img_path)
 
 if embedding is not None:
-    if os.path.exists(EMB_FILE):
-        with open(EMB_FILE, 'rb') as f:
-            database = pickle.load(f)
-    else:
-        database = {}
-
-    database[name] = embedding
-
-    with open(EMB_FILE, 'wb') as f:
-        pickle.dump(database, f)
-
-    print(f"✅ Persona '{name}' registrata con successo!")
+    # stessa galleria del riconoscimento live: al più MAX_PROTOTYPES per persona, duplicati scartati
+    if save_new_face(name, embedding):
+        print(f"✅ Persona '{name}' registrata con successo!")
 else:
     print("❌ Nessun volto rilevato nell'immagine.")
@@ -0,0 +1,177 @@
+# src/utils/ann_index.py
+# ==========================================
+# 🧭 INDICE ANN (IVF) PER GALLERIE GRANDI
+# ==========================================
+#
+# Quantizzatore grossolano stile IVF: k-means sferico sugli embedding
+# normalizzati, ogni riga della galleria finisce nella lista del centroide
+# più vicino. Una query confronta solo i `nprobe` centroidi più vicini e
+# le righe delle relative liste, invece dell'intera matrice.
+#
+# Persistenza accanto alla galleria:
+#   <path>.ivf.npy     centroidi (nlist × dim, float32)
+#   <path>.ivf.assign  lista di ogni riga (int32, append-only come la galleria)
+
+import os
+
+import numpy as np
+
+DEFAULT_NPROBE = 8
+KMEANS_ITERS = 12
+KMEANS_SAMPLES_PER_LIST = 64
+ASSIGN_CHUNK = 8192
+
+
+def default_nlist(n_rows):
+    """Numero di liste consigliato: ~4·√N, almeno 1."""
+    return max(1, int(4 * np.sqrt(max(n_rows, 1))))
+
+
+class IVFIndex:
+    """
+    Indice IVF immutabile: `with_rows` restituisce un indice nuovo che
+    condivide i centroidi e le liste non toccate, così gli snapshot della
+    galleria già pubblicati restano validi senza lock.
+    """
+
+    def __init__(self, centroids, assign, nprobe=DEFAULT_NPROBE):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.assign = np.asarray(assign, dtype=np.int32)
+        self.nprobe = nprobe
+        self.lists = _build_lists(self.assign, len(self.centroids))
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    def __len__(self):
+        return len(self.assign)
+
+    # ------------------------------------------
+    # 🏋️ TRAINING
+    # ------------------------------------------
+
+    @classmethod
+    def train(cls, matrix, nlist=None, iters=KMEANS_ITERS, nprobe=DEFAULT_NPROBE, seed=0):
+        """K-means sferico su un campione della galleria (righe già normalizzate)."""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        n = len(matrix)
+        nlist = min(nlist or default_nlist(n), n)
+        rng = np.random.default_rng(seed)
+
+        sample_size = min(n, nlist * KMEANS_SAMPLES_PER_LIST)
+        sample = matrix[np.sort(rng.choice(n, sample_size, replace=False))]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(iters):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(labels, kind="stable")
+            present, first = np.unique(labels[order], return_index=True)
+            sums = np.zeros_like(centroids)
+            sums[present] = np.add.reduceat(sample[order], first, axis=0)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # liste vuote: si riparte da un punto a caso del campione
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            norms[empty] = 1.0
+            centroids = sums / norms
+
+        index = cls(centroids, np.empty(0, dtype=np.int32), nprobe=nprobe)
+        return index.with_rows(matrix)
+
+    def assign_rows(self, vectors):
+        """Lista di appartenenza per ciascuna riga (vettori normalizzati)."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        out = np.empty(len(vectors), dtype=np.int32)
+        # a blocchi: la matrice di similarità completa (N × nlist) non serve
+        for start in range(0, len(vectors), ASSIGN_CHUNK):
+            block = vectors[start:start + ASSIGN_CHUNK]
+            out[start:start + len(block)] = np.argmax(block @ self.centroids.T, axis=1)
+        return out
+
+    def with_rows(self, vectors):
+        """Nuovo indice con `vectors` aggiunti in coda (id = len(self), len(self)+1, ...)."""
+        new_assign = self.assign_rows(vectors)
+        new = object.__new__(type(self))
+        new.centroids = self.centroids
+        new.nprobe = self.nprobe
+        new.assign = np.concatenate([self.assign, new_assign])
+        new.lists = list(self.lists)
+        start = len(self.assign)
+        order = np.argsort(new_assign, kind="stable")
+        touched, first = np.unique(new_assign[order], return_index=True)
+        for lst, rows in zip(touched, np.split(start + order, first[1:])):
+            new.lists[lst] = np.concatenate([self.lists[lst], rows])
+        return new
+
+    # ------------------------------------------
+    # 🔍 RICERCA
+    # ------------------------------------------
+
+    def candidates(self, query, nprobe=None):
+        """Righe candidate per una query normalizzata (liste dei nprobe centroidi più vicini)."""
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        sims = self.centroids @ query
+        if nprobe < self.nlist:
+            probe = np.argpartition(-sims, nprobe - 1)[:nprobe]
+        else:
+            probe = np.arange(self.nlist)
+        return np.concatenate([self.lists[i] for i in probe])
+
+    def search(self, query, matrix, nprobe=None):
+        """Ritorna (righe candidate, similarità coseno) per una query normalizzata."""
+        rows = self.candidates(query, nprobe)
+        # uno snapshot più vecchio può avere meno righe dell'indice
+        rows = rows[rows < len(matrix)]
+        if len(rows) == 0:
+            return rows, np.empty(0, dtype=np.float32)
+        return rows, matrix[rows] @ query
+
+    # ------------------------------------------
+    # 💾 PERSISTENZA
+    # ------------------------------------------
+
+    def save(self, path):
+        """Salva centroidi (scrittura atomica) e assegnazioni complete."""
+        tmp = path + ".ivf.tmp.npy"
+        np.save(tmp, self.centroids)
+        os.replace(tmp, path + ".ivf.npy")
+        with open(path + ".ivf.assign", "wb") as f:
+            f.write(self.assign.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append_saved(self, path, start):
+        """Accoda su disco le assegnazioni delle righe da `start` in poi (append O(1))."""
+        with open(path + ".ivf.assign", "r+b") as f:
+            f.seek(start * self.assign.itemsize)
+            f.write(self.assign[start:].tobytes())
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+
+    @classmethod
+    def load(cls, path, matrix, nprobe=DEFAULT_NPROBE):
+        """
+        Carica l'indice salvato accanto alla galleria. Le righe aggiunte alla
+        galleria dopo l'ultimo salvataggio vengono assegnate e accodate.
+        Ritorna None se l'indice manca o non è coerente con la galleria.
+        """
+        if not (os.path.exists(path + ".ivf.npy") and os.path.exists(path + ".ivf.assign")):
+            return None
+        centroids = np.load(path + ".ivf.npy")
+        if centroids.ndim != 2 or centroids.shape[1] != matrix.shape[1]:
+            return None
+        assign = np.fromfile(path + ".ivf.assign", dtype=np.int32)
+        saved = min(len(assign), len(matrix))
+        index = cls(centroids, assign[:saved], nprobe=nprobe)
+        if saved < len(matrix):
+            index = index.with_rows(matrix[saved:])
+            index.append_saved(path, saved)
+        return index
+
+
+def _build_lists(assign, nlist):
+    order = np.argsort(assign, kind="stable")
+    bounds = np.searchsorted(assign[order], np.arange(nlist + 1))
+    return [order[bounds[i]:bounds[i + 1]].astype(np.int64) for i in range(nlist)]
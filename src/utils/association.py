@@ -0,0 +1,140 @@
+# src/utils/association.py
+# ==========================================
+# 🔗 ASSOCIAZIONE DETECTION ↔ TRACKER
+# ==========================================
+# Matrice IoU calcolata in un colpo solo con NumPy e assegnamento ottimo
+# (algoritmo ungherese) invece del greedy detection per detection: il
+# risultato non dipende più dall'ordine dei tracker e, con più volti vicini,
+# gli scambi di id sono più rari.
+from dataclasses import dataclass, field
+
+import numpy as np
+
+IOU_THRESHOLD = 0.3        # IoU minima perché una coppia sia ammessa
+APPEARANCE_WEIGHT = 0.5    # peso del costo di aspetto (es. distanza embedding) se fornito
+_FORBIDDEN = 1e6           # costo delle coppie sotto soglia
+
+
+@dataclass
+class Association:
+    """Esito di `associate`: indici nelle liste di tracker e detection."""
+    matches: list = field(default_factory=list)         # [(indice tracker, indice detection), ...]
+    new_detections: list = field(default_factory=list)  # detection senza tracker → nuovi tracker
+    lost_tracks: list = field(default_factory=list)     # tracker senza detection in questo passaggio
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """
+    IoU tra tutte le coppie di box (x1, y1, x2, y2): matrice (len(a), len(b)).
+    """
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def linear_assignment(cost):
+    """
+    Assegnamento a costo minimo (algoritmo ungherese con potenziali,
+    O(n²·m), aggiornamenti vettorializzati sulle colonne) per matrici
+    anche rettangolari. Ritorna (righe, colonne) delle coppie scelte; ogni
+    riga e colonna compare al più una volta.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.size == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape  # n <= m: ogni riga riceve una colonna
+
+    # indici 1-based come nella formulazione classica; colonna 0 fittizia
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    row_of = np.zeros(m + 1, dtype=np.intp)   # riga assegnata a ogni colonna (0 = libera)
+    way = np.zeros(m + 1, dtype=np.intp)
+
+    for i in range(1, n + 1):
+        row_of[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = row_of[j0]
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+
+            u[row_of[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+
+            j0 = j1
+            if row_of[j0] == 0:
+                break
+
+        # percorso aumentante all'indietro
+        while j0:
+            j1 = way[j0]
+            row_of[j0] = row_of[j1]
+            j0 = j1
+
+    cols = np.nonzero(row_of[1:])[0]
+    rows = row_of[1:][cols] - 1
+    order = np.argsort(rows)
+    rows, cols = rows[order], cols[order]
+    if transposed:
+        rows, cols = cols, rows
+        order = np.argsort(rows)
+        rows, cols = rows[order], cols[order]
+    return rows, cols
+
+
+def associate(track_boxes, det_boxes, iou_threshold=IOU_THRESHOLD,
+              appearance=None, appearance_weight=APPEARANCE_WEIGHT):
+    """
+    Associa i tracker (box x1, y1, x2, y2) alle detection del frame.
+    Costo = 1 - IoU, più `appearance_weight` × `appearance` se viene passata
+    una matrice di costo di aspetto (tracker × detection, es. distanze tra
+    embedding; NaN = non disponibile). Le coppie con IoU sotto soglia non
+    sono mai ammesse.
+    """
+    n_tracks, n_dets = len(track_boxes), len(det_boxes)
+    if n_tracks == 0 or n_dets == 0:
+        return Association(new_detections=list(range(n_dets)), lost_tracks=list(range(n_tracks)))
+
+    ious = iou_matrix(track_boxes, det_boxes)
+    cost = 1.0 - ious
+    if appearance is not None:
+        cost = cost + appearance_weight * np.nan_to_num(np.asarray(appearance, dtype=np.float64))
+    allowed = ious >= iou_threshold
+    cost[~allowed] = _FORBIDDEN
+
+    rows, cols = linear_assignment(cost)
+    keep = allowed[rows, cols]
+    matches = list(zip(rows[keep].tolist(), cols[keep].tolist()))
+
+    matched_tracks = set(rows[keep].tolist())
+    matched_dets = set(cols[keep].tolist())
+    return Association(
+        matches=matches,
+        new_detections=[j for j in range(n_dets) if j not in matched_dets],
+        lost_tracks=[i for i in range(n_tracks) if i not in matched_tracks],
+    )
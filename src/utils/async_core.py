@@ -1,12 +1,23 @@
 # src/utils/async_core.py
 import threading
 import queue
+import cv2
 import torch
-import numpy as np
 from concurrent.futures import ThreadPoolExecutor
-from facenet_pytorch import MTCNN, InceptionResnetV1
 
-DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+from src.utils.face_align import FACE_SIZE
+from src.utils.face_models import (
+    pick_device, create_mtcnn, warm_up_mtcnn, run_detection,
+    FaceEmbedder, collect_batch, summarize_embed_stats, empty_embed_stats,
+    MIN_FACE_PX, MIN_FACE_PROB, DETECTION_MODES,
+)
+from src.utils.frame_ring import FrameRing
+from src import config
+
+# 🔧 "full" | "downscaled" | "roi" (config.py può non averla: default "full")
+DETECTION_MODE = getattr(config, "DETECTION_MODE", "full")
+
+DEVICE = pick_device()
 torch.set_num_threads(2)
 print(f"✅ async_core: using device {DEVICE}")
 
@@ -14,13 +25,16 @@ print(f"✅ async_core: using device {DEVICE}")
 # 🧠 MODELLI GLOBALI (UNICA ISTANZA)
 # ==========================================================
 
-# 🔧 FIX: Un solo ResNet condiviso tra tutti i worker
-resnet = InceptionResnetV1(pretrained='vggface2').eval().to(DEVICE)
+# 🔧 FIX: Un solo ResNet condiviso (creato nel worker embedding con warm-up)
+_embedder = None
 
 # 🔧 FIX: MTCNN globale per detection (creata nel worker con warm-up)
 mtcnn_global = None
 
-print("⚙️ Caricamento modelli in corso...")
+# 🔧 Modalità di percezione: "thread" (default) o "process" (MTCNN e ResNet in
+# processi separati, vedi perception_procs)
+PERCEPTION_MODES = ("thread", "process")
+_perception = None       # ProcessPerception attivo in modalità "process"
 
 # ==========================================================
 # 🎧 EXECUTOR PER TTS E OLLAMA
@@ -32,25 +46,12 @@ _ollama_executor = None
 # Queues
 detect_request_q = queue.Queue(maxsize=2)
 detect_result_q  = queue.Queue(maxsize=4)
-embed_request_q  = queue.Queue(maxsize=4)
-embed_result_q   = queue.Queue(maxsize=8)
+embed_request_q  = queue.Queue(maxsize=16)
+embed_result_q   = queue.Queue(maxsize=32)
 tts_q            = queue.Queue(maxsize=8)
 exit_event       = threading.Event()
 embed_semaphore  = threading.Semaphore(1)
 
-# ==========================================================
-# 🔥 WARM-UP COMPLETO GPU
-# ==========================================================
-
-print("🔥 GPU warm-up in corso...")
-
-# 🔧 FIX: Warm-up ResNet con tensore realistico
-with torch.no_grad():
-    dummy_tensor = torch.randn((1, 3, 160, 160), device=DEVICE)  # Random invece di zeros
-    _ = resnet(dummy_tensor)
-
-print(f"✅ ResNet warm-up completato su {DEVICE}")
-
 # ==========================================================
 # 🧩 EVENTI DI SINCRONIZZAZIONE
 # ==========================================================
@@ -68,122 +69,125 @@ def detection_worker():
     
     print("📸 Detection worker avviato...")
     
-    # 🔧 FIX: MTCNN con parametri ottimizzati
-    mtcnn_global = MTCNN(
-        keep_all=True,
-        device=DEVICE,
-        min_face_size=60,  # 🔧 Aumentato da 40 (meno falsi positivi)
-        thresholds=[0.6, 0.7, 0.8],  # 🔧 Più restrittivo (era [0.5, 0.6, 0.7])
-        post_process=True  # Allineamento automatico
-    )
+    mtcnn_global = create_mtcnn(DEVICE)
     
     # 🔧 FIX: Warm-up MTCNN completo con più passaggi
     print("🔥 MTCNN warm-up (3 passaggi)...")
-    dummy_frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
-    
-    for i in range(3):
-        _ = mtcnn_global.detect(dummy_frame)
+    warm_up_mtcnn(mtcnn_global)
     
     print("✅ MTCNN warm-up completato (worker ready).")
     worker_ready_event.set()
     
     while not exit_event.is_set():
         try:
-            fid, frame_rgb = detect_request_q.get(timeout=0.1)
+            fid, slot, rois = detect_request_q.get(timeout=0.1)
         except queue.Empty:
             continue
         
-        # Copia per sicurezza
-        frame_rgb = np.ascontiguousarray(frame_rgb.copy())
+        # Lettura diretta dallo slot condiviso (niente copie): il main loop
+        # non lo riscrive finché non lo rilasciamo
+        frame_rgb = slot.rgb
         
         try:
-            boxes, probs = mtcnn_global.detect(frame_rgb)
-            
-            # 🔧 FIX: Filtra box troppo piccole o con bassa confidence
-            if boxes is not None and probs is not None:
-                filtered_boxes = []
-                for box, prob in zip(boxes, probs):
-                    x1, y1, x2, y2 = box
-                    w, h = x2 - x1, y2 - y1
-                    
-                    # Filtra: min 80x80px e confidence > 0.9
-                    if w >= 80 and h >= 80 and prob > 0.9:
-                        filtered_boxes.append(box)
-                
-                boxes = filtered_boxes if filtered_boxes else None
-        
+            # i volti allineati vengono estratti qui, finché lo slot è valido
+            # rois: box note da riesaminare (modalità "roi"), None = frame intero
+            detections = run_detection(mtcnn_global, frame_rgb, DETECTION_MODE, rois) or None
         except Exception as e:
             print(f"[DETECT] Errore su frame {fid}: {e}")
-            boxes = None
+            detections = None
+        finally:
+            slot.release()
         
-        detect_result_q.put((fid, boxes))
+        detect_result_q.put((fid, detections))
         detect_request_q.task_done()
 
 # ==========================================================
-# 🧬 EMBEDDING WORKER (ResNet)
+# 🧬 EMBEDDING WORKER (ResNet, micro-batch)
 # ==========================================================
 
+# 🔧 Micro-batching: più volti in vista → un solo forward di ResNet
+EMBED_MAX_BATCH = 8      # volti massimi per forward
+EMBED_MAX_WAIT = 0.015   # secondi massimi di attesa per riempire il batch
+
+
+def get_embed_stats():
+    """Copia delle statistiche del worker embedding, con medie derivate."""
+    if _perception is not None:
+        stats = _perception.embed_stats()
+    elif _embedder is not None:
+        stats = _embedder.raw_stats()
+    else:
+        stats = None
+    return summarize_embed_stats(stats or empty_embed_stats())
+
+
+def embed_faces(faces):
+    """
+    Embedding di una lista di crop RGB uint8 (qualsiasi dimensione) con
+    forward a batch di al più EMBED_MAX_BATCH volti. Ritorna (N, 512).
+    """
+    global _embedder
+    with embed_semaphore:
+        if _embedder is None:
+            _embedder = FaceEmbedder(DEVICE, EMBED_MAX_BATCH)
+        return _embedder.embed(faces)
+
+
+def crop_face_for_embedding(frame_rgb, box, margin=10):
+    """
+    Ritaglia il box (x1, y1, x2, y2) con un margine fisso e lo ridimensiona a
+    FACE_SIZE×FACE_SIZE. Il risultato è un array nuovo e piccolo (~77 KB),
+    indipendente dal frame. Di norma su embed_request_q viaggia il volto
+    allineato da detect_faces; questo crop grezzo è il fallback.
+    Ritorna None se il box è vuoto.
+    """
+    x1, y1, x2, y2 = [int(v) for v in box]
+    h, w, _ = frame_rgb.shape
+    x1 = max(0, x1 - margin)
+    y1 = max(0, y1 - margin)
+    x2 = min(w, x2 + margin)
+    y2 = min(h, y2 + margin)
+    face = frame_rgb[y1:y2, x1:x2]
+    if face.size == 0:
+        return None
+    return cv2.resize(face, (FACE_SIZE, FACE_SIZE), interpolation=cv2.INTER_LINEAR)
+
+
 def embedding_worker():
-    """Worker per generazione embedding con preprocessing corretto."""
+    """Worker per generazione embedding: raccoglie i crop pendenti e fa un forward a batch."""
     print("🧬 Embedding worker avviato...")
-    
-    # 🔧 FIX: Warm-up embedding worker
+
+    # 🔧 FIX: Warm-up embedding worker (batch pieno, stesse forme del loop)
     print("🔥 Embedding worker warm-up...")
-    dummy_face = np.random.randint(0, 255, (160, 160, 3), dtype=np.uint8)
-    dummy_tensor = torch.tensor(dummy_face).permute(2, 0, 1).unsqueeze(0).float() / 255.0
-    dummy_tensor = dummy_tensor.to(DEVICE)
-    
-    with torch.no_grad():
-        _ = resnet(dummy_tensor)
-    
+    global _embedder
+    with embed_semaphore:
+        if _embedder is None:
+            _embedder = FaceEmbedder(DEVICE, EMBED_MAX_BATCH)
+        _embedder.warm_up()
+
     print("✅ Embedding worker pronto.")
     embedding_ready_event.set()
-    
+
     while not exit_event.is_set():
         try:
-            face_id, frame_rgb, box = embed_request_q.get(timeout=0.5)
+            requests = collect_batch(embed_request_q, EMBED_MAX_BATCH, EMBED_MAX_WAIT)
         except queue.Empty:
             continue
-        
-        with embed_semaphore:
-            try:
-                x1, y1, x2, y2 = [int(v) for v in box]
-                
-                # 🔧 FIX: Aggiungi margine per migliorare allineamento
-                h, w, _ = frame_rgb.shape
-                margin = 10
-                x1 = max(0, x1 - margin)
-                y1 = max(0, y1 - margin)
-                x2 = min(w, x2 + margin)
-                y2 = min(h, y2 + margin)
-                
-                face = frame_rgb[y1:y2, x1:x2]
-                
-                if face.size == 0:
-                    continue
-                
-                # 🔧 FIX: Preprocessing migliorato (simile a MTCNN)
-                face_tensor = torch.tensor(face).permute(2, 0, 1).unsqueeze(0).float() / 255.0
-                face_tensor = torch.nn.functional.interpolate(
-                    face_tensor, 
-                    size=(160, 160), 
-                    mode='bilinear',  # 🔧 Migliorato da default
-                    align_corners=False
-                ).to(DEVICE)
-                
-                # 🔧 FIX: Normalizzazione come FaceNet
-                mean = torch.tensor([0.5, 0.5, 0.5]).view(1, 3, 1, 1).to(DEVICE)
-                std = torch.tensor([0.5, 0.5, 0.5]).view(1, 3, 1, 1).to(DEVICE)
-                face_tensor = (face_tensor - mean) / std
-                
-                with torch.no_grad():
-                    emb = resnet(face_tensor).cpu().numpy()
-                
-                embed_result_q.put((face_id, emb))
-                
-            except Exception as e:
-                print(f"[EMBED] Errore: {e}")
-            finally:
+
+        # ogni richiesta porta già il crop FACE_SIZE×FACE_SIZE, non il frame intero
+        face_ids = [face_id for face_id, _ in requests]
+        faces = [face for _, face in requests]
+
+        try:
+            if faces:
+                embs = embed_faces(faces)
+                # risultati instradati al tracker di origine, uno per richiesta
+                for i, face_id in enumerate(face_ids):
+                    embed_result_q.put((face_id, embs[i:i + 1]))
+        except Exception as e:
+            print(f"[EMBED] Errore: {e}")
+        finally:
+            for _ in requests:
                 embed_request_q.task_done()
 
 # ==========================================================
@@ -246,15 +250,46 @@ def ask_ollama_async(func, *args, **kwargs):
 # 🚀 START WORKERS
 # ==========================================================
 
-def start_workers(speak_func=None):
+def start_workers(speak_func=None, mode="thread"):
     """
-    Avvia tutti i thread asincroni e gli executor necessari:
+    Avvia tutti i worker asincroni e gli executor necessari:
       - detection_worker (MTCNN)
       - embedding_worker (ResNet)
       - executor TTS e Ollama
+    Con mode="process" detection ed embedding girano in processi separati
+    (frame in memoria condivisa): il main loop deve scrivere i frame negli
+    slot di get_frame_ring(). Eventi di warm-up e code restano gli stessi.
     """
-    threading.Thread(target=detection_worker, daemon=True).start()
-    threading.Thread(target=embedding_worker, daemon=True).start()
+    global _perception
+    if mode not in PERCEPTION_MODES:
+        raise ValueError(f"Modalità di percezione sconosciuta: {mode!r} (attese: {PERCEPTION_MODES})")
+    if DETECTION_MODE not in DETECTION_MODES:
+        raise ValueError(f"DETECTION_MODE sconosciuta: {DETECTION_MODE!r} (attese: {DETECTION_MODES})")
+
+    if mode == "process":
+        from src.utils.perception_procs import ProcessPerception
+        _perception = ProcessPerception(EMBED_MAX_BATCH, EMBED_MAX_WAIT, DETECTION_MODE)
+        _perception.start(
+            detect_request_q, detect_result_q, embed_request_q, embed_result_q,
+            worker_ready_event, embedding_ready_event, exit_event,
+        )
+    else:
+        threading.Thread(target=detection_worker, daemon=True).start()
+        threading.Thread(target=embedding_worker, daemon=True).start()
     start_executors()
     
-    print("✅ Tutti i worker avviati")
\ No newline at end of file
+    print(f"✅ Tutti i worker avviati (percezione: {mode})")
+
+
+def get_frame_ring():
+    """Ring di frame da usare nel main loop (in memoria condivisa in modalità process)."""
+    if _perception is not None:
+        return _perception.frame_ring
+    return FrameRing()
+
+
+def stop_workers():
+    """Ferma i worker: i thread escono con exit_event, i processi vanno chiusi esplicitamente."""
+    exit_event.set()
+    if _perception is not None:
+        _perception.stop()
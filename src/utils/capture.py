@@ -0,0 +1,175 @@
+# src/utils/capture.py
+# ==========================================
+# 📷 ACQUISIZIONE FRAME IN UN THREAD DEDICATO
+# ==========================================
+# La lettura dalla sorgente (webcam, file video, cartella di immagini) gira
+# in un thread proprio. In modalità "live" il loop riceve sempre il frame
+# più recente: se è più lento della sorgente i frame intermedi vengono
+# scartati (e contati) invece di accumulare latenza nel buffer del driver.
+# In modalità lossless (replay per benchmark) ogni frame viene consegnato.
+import os
+import threading
+import time
+
+import cv2
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+IMAGE_SEQUENCE_FPS = 30.0     # cadenza simulata di una cartella di immagini in modalità live
+
+
+class VideoSource:
+    """Webcam (indice) o file/stream video tramite cv2.VideoCapture."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.is_camera = isinstance(spec, int)
+        self._cap = cv2.VideoCapture(spec)
+        fps = self._cap.get(cv2.CAP_PROP_FPS) if self._cap.isOpened() else 0.0
+        self.fps = fps if fps and fps > 0 else None
+
+    def is_opened(self):
+        return self._cap.isOpened()
+
+    def read(self):
+        return self._cap.read()
+
+    def release(self):
+        self._cap.release()
+
+
+class ImageDirSource:
+    """Cartella di immagini lette in ordine alfabetico (ricorsivamente)."""
+
+    is_camera = False
+
+    def __init__(self, path, fps=IMAGE_SEQUENCE_FPS):
+        self.spec = path
+        self.fps = fps
+        self._paths = []
+        for root, _, files in os.walk(path):
+            self._paths += [os.path.join(root, f) for f in sorted(files)
+                            if f.lower().endswith(IMAGE_EXTENSIONS)]
+        self._paths.sort()
+        self._next = 0
+
+    def is_opened(self):
+        return bool(self._paths)
+
+    def read(self):
+        while self._next < len(self._paths):
+            frame = cv2.imread(self._paths[self._next])
+            self._next += 1
+            if frame is not None:
+                return True, frame
+        return False, None
+
+    def release(self):
+        self._next = len(self._paths)
+
+
+def open_source(spec):
+    """
+    Sorgente da una specifica di configurazione: intero (o stringa
+    numerica) = indice webcam, cartella = sequenza di immagini, altrimenti
+    file o URL video.
+    """
+    if isinstance(spec, str) and spec.strip().isdigit():
+        spec = int(spec)
+    if isinstance(spec, str) and os.path.isdir(spec):
+        return ImageDirSource(spec)
+    return VideoSource(spec)
+
+
+class ThreadedCapture:
+    """
+    Legge `source` in un thread. `read(timeout)` ritorna (True, frame) con
+    il frame più nuovo non ancora consegnato, (False, None) a fine sorgente.
+
+    - live=True: ultimo frame vince; `dropped` conta i frame mai consegnati.
+      Le sorgenti registrate vengono riprodotte alla loro cadenza (fps),
+      come farebbe una webcam.
+    - live=False: nessun frame perso, il thread attende che il loop consumi
+      (replay alla massima velocità del loop).
+    """
+
+    def __init__(self, source, live=True):
+        self.source = source
+        self.live = live
+        self.frames_read = 0        # frame letti dalla sorgente
+        self.frames_delivered = 0   # frame consegnati al loop
+        self.dropped = 0            # frame sovrascritti prima di essere consegnati
+        self.eof = False
+        self._frame = None
+        self._fresh = False
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="capture", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        pace = None
+        if self.live and not self.source.is_camera and self.source.fps:
+            pace = 1.0 / self.source.fps
+        next_due = time.perf_counter()
+
+        while not self._stop.is_set():
+            ok, frame = self.source.read()
+            if not ok:
+                break
+            self.frames_read += 1
+
+            with self._cond:
+                if not self.live:
+                    # lossless: attende che il frame precedente sia stato consegnato
+                    while self._fresh and not self._stop.is_set():
+                        self._cond.wait(0.1)
+                elif self._fresh:
+                    self.dropped += 1
+                self._frame = frame
+                self._fresh = True
+                self._cond.notify_all()
+
+            if pace is not None:
+                next_due += pace
+                delay = next_due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_due = time.perf_counter()
+
+        with self._cond:
+            self.eof = True
+            self._cond.notify_all()
+
+    def read(self, timeout=1.0):
+        """Frame più nuovo (attende al più `timeout` secondi che ne arrivi uno)."""
+        deadline = time.perf_counter() + timeout
+        with self._cond:
+            while not self._fresh:
+                remaining = deadline - time.perf_counter()
+                if self.eof or remaining <= 0:
+                    return False, None
+                self._cond.wait(remaining)
+            frame = self._frame
+            self._frame = None
+            self._fresh = False
+            self.frames_delivered += 1
+            self._cond.notify_all()
+            return True, frame
+
+    def release(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join(timeout=2.0)
+        self.source.release()
+
+    def stats(self):
+        return {
+            "read": self.frames_read,
+            "delivered": self.frames_delivered,
+            "dropped": self.dropped,
+        }
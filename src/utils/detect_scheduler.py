@@ -0,0 +1,90 @@
+# src/utils/detect_scheduler.py
+# ==========================================
+# ⏱️ CADENZA ADATTIVA DELLA DETECTION (MTCNN)
+# ==========================================
+# MTCNN è lo stadio più costoso: quando tutti i volti sono già agganciati
+# dai tracker e la scena è ferma basta ri-detectare di rado. La frequenza
+# sale con il movimento, con i tracker in difficoltà o senza tracker attivi;
+# un cambio di scena o la scadenza della scansione periodica forzano
+# comunque una detection completa.
+
+DETECT_MIN_HZ = 1.0          # frequenza minima (volti noti, scena ferma)
+DETECT_MAX_HZ = 15.0         # frequenza massima (nessun tracker / tracker persi)
+FULL_SCAN_INTERVAL = 2.0     # secondi massimi tra due detection complete
+MOTION_FULL_RATE = 0.08      # movimento (frazione di pixel) che porta a DETECT_MAX_HZ
+EMPTY_MOTION_MIN = 0.005     # senza tracker, sotto questo movimento si resta al minimo
+
+
+class DetectScheduler:
+    """
+    Decide frame per frame se inviare una detection. Il chiamante passa lo
+    stato dei tracker e il movimento misurato; `skipped` conta le detection
+    risparmiate, `reasons` il motivo di quelle eseguite.
+    """
+
+    def __init__(self, min_hz=DETECT_MIN_HZ, max_hz=DETECT_MAX_HZ,
+                 full_scan_interval=FULL_SCAN_INTERVAL, motion_full_rate=MOTION_FULL_RATE):
+        if not 0 < min_hz <= max_hz:
+            raise ValueError(f"Frequenze di detection non valide: min={min_hz}, max={max_hz}")
+        self.min_hz = min_hz
+        self.max_hz = max_hz
+        self.full_scan_interval = full_scan_interval
+        self.motion_full_rate = motion_full_rate
+        self.last_detect = float("-inf")
+        self.rate = max_hz           # frequenza scelta all'ultima decisione
+        self.skipped = 0
+        self.submitted = 0
+        self.reasons = {"scene": 0, "full_scan": 0, "rate": 0}
+        self.reason = "rate"           # motivo dell'ultima detection decisa
+
+    def target_rate(self, n_trackers, lost_counts, motion):
+        """Frequenza desiderata (Hz) dato lo stato corrente."""
+        if any(lost > 0 for lost in lost_counts):
+            return self.max_hz  # un tracker sta perdendo il volto: ri-agganciarlo subito
+        if n_trackers == 0:
+            # niente da seguire: i volti nuovi arrivano con il movimento
+            return self.max_hz if motion >= EMPTY_MOTION_MIN else self.min_hz
+        level = min(motion / self.motion_full_rate, 1.0)
+        return self.min_hz + (self.max_hz - self.min_hz) * level
+
+    def should_detect(self, now, n_trackers, lost_counts, motion, scene_change=False):
+        """
+        True se in questo frame va inviata una detection, con il motivo in
+        `reason` ("scene" e "full_scan" chiedono una scansione completa).
+        Il chiamante chiama `mark_submitted(now)` solo se la richiesta è
+        stata davvero accodata.
+        """
+        elapsed = now - self.last_detect
+        self.rate = self.target_rate(n_trackers, lost_counts, motion)
+
+        if scene_change:
+            reason = "scene"
+        elif elapsed >= self.full_scan_interval:
+            reason = "full_scan"
+        elif elapsed >= 1.0 / self.rate:
+            reason = "rate"
+        else:
+            self.skipped += 1
+            return False
+
+        self.reason = reason
+        return True
+
+    def request_full_scan(self):
+        """La prossima decisione sarà una scansione completa (es. al risveglio dall'idle)."""
+        self.last_detect = float("-inf")
+
+    def mark_submitted(self, now):
+        self.last_detect = now
+        self.submitted += 1
+        self.reasons[self.reason] += 1
+
+    def stats(self):
+        total = self.submitted + self.skipped
+        return {
+            "submitted": self.submitted,
+            "skipped": self.skipped,
+            "skip_ratio": self.skipped / total if total else 0.0,
+            "rate": self.rate,
+            **{f"reason_{k}": v for k, v in self.reasons.items()},
+        }
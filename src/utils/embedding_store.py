@@ -0,0 +1,294 @@
+# src/utils/embedding_store.py
+# ==========================================
+# 💾 GALLERIA BINARIA APPEND-ONLY (MEMORY-MAPPED)
+# ==========================================
+#
+# Formato su disco (sostituisce embeddings.pkl):
+#
+#   <path>         header (64 byte) + matrice float32 (count × dim), righe L2-normalizzate
+#   <path>.names   tabella id/nomi, una riga JSON per embedding: {"id": 0, "name": "Lorenzo"}
+#                  (una riga che sostituisce un prototipo ha anche "replaces": <id>)
+#
+# Header: magic, versione, dim, count, byte validi di .names, generazione.
+# L'header è il punto di commit: una nuova riga viene scritta in coda alla
+# matrice e alla tabella nomi, poi l'header (64 byte, una sola scrittura)
+# viene aggiornato. Un crash a metà lascia solo byte in coda non committati,
+# che vengono ignorati e sovrascritti al prossimo append.
+# Le righe committate non cambiano mai: gli snapshot del matcher leggono la
+# matrice mappata senza lock. Sostituire un prototipo accoda la riga nuova
+# e segna quella vecchia come sostituita, che resta su disco ma esce dalla
+# galleria.
+
+import os
+import json
+import time
+import struct
+import pickle
+import threading
+
+import numpy as np
+
+MAGIC = b"SMILEGAL"
+VERSION = 1
+HEADER_FMT = "<8sIIQQQ24s"
+HEADER_SIZE = struct.calcsize(HEADER_FMT)   # 64
+DTYPE = np.float32
+
+LOCK_TIMEOUT = 10.0     # secondi di attesa massima sul lock di scrittura
+LOCK_STALE = 30.0       # un lock più vecchio di così è considerato orfano
+
+
+def _normalize_rows(vectors):
+    arr = np.asarray(vectors, dtype=DTYPE)
+    if arr.ndim == 1:
+        arr = arr[None, :]
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(arr / norms, dtype=DTYPE)
+
+
+class _FileLock:
+    """Lock di scrittura tra processi basato su file creato in modo esclusivo."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        start = time.time()
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode())
+                os.close(fd)
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > LOCK_STALE:
+                        os.remove(self.path)
+                        continue
+                except OSError:
+                    pass
+                if time.time() - start > LOCK_TIMEOUT:
+                    raise TimeoutError(f"Lock galleria occupato: {self.path}")
+                time.sleep(0.01)
+
+    def __exit__(self, *exc):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class EmbeddingStore:
+    """
+    Galleria di embedding su disco. La matrice viene mappata in memoria
+    (np.memmap, zero copy) e un nuovo volto costa un append O(1) più
+    l'aggiornamento atomico dell'header.
+    """
+
+    def __init__(self, path, dim=None):
+        self.path = path
+        self.names_path = path + ".names"
+        self.lock_path = path + ".lock"
+        self._lock = threading.Lock()
+
+        self.dim = dim
+        self.count = 0
+        self.names_bytes = 0
+        self.generation = 0
+        self.names = []
+        self.ids = []
+        self.replaces = []      # per riga: id della riga che sostituisce, o None
+
+        if os.path.exists(self.path):
+            self._read_header()
+            self._load_names()
+
+    # ------------------------------------------
+    # 📖 LETTURA
+    # ------------------------------------------
+
+    def _read_header(self):
+        with open(self.path, "rb") as f:
+            raw = f.read(HEADER_SIZE)
+        if len(raw) < HEADER_SIZE:
+            raise ValueError(f"Header galleria troncato: {self.path}")
+        magic, version, dim, count, names_bytes, generation, _ = struct.unpack(HEADER_FMT, raw)
+        if magic != MAGIC:
+            raise ValueError(f"File galleria non valido: {self.path}")
+        if version != VERSION:
+            raise ValueError(f"Versione galleria non supportata: {version}")
+        self.dim, self.count, self.names_bytes, self.generation = dim, count, names_bytes, generation
+
+    def _load_names(self, start_row=0, start_byte=0):
+        """Legge la tabella nomi fino ai byte committati (da start_byte in poi)."""
+        if self.count == 0:
+            self.names, self.ids, self.replaces = [], [], []
+            return
+        with open(self.names_path, "rb") as f:
+            f.seek(start_byte)
+            data = f.read(self.names_bytes - start_byte)
+        names, ids = self.names[:start_row], self.ids[:start_row]
+        replaces = self.replaces[:start_row]
+        for line in data.splitlines():
+            if line.strip():
+                rec = json.loads(line)
+                ids.append(rec["id"])
+                names.append(rec["name"])
+                replaces.append(rec.get("replaces"))
+        if len(names) != self.count:
+            raise ValueError(f"Tabella nomi incoerente: {len(names)} nomi per {self.count} righe")
+        self.names, self.ids, self.replaces = names, ids, replaces
+
+    def replaced_rows(self, start=0):
+        """Righe uscite dalla galleria perché sostituite da una riga con id >= `start`."""
+        return [r for r in self.replaces[start:] if r is not None]
+
+    def refresh(self):
+        """
+        Rilegge l'header per intercettare scrittori esterni (altri processi).
+        Se la galleria è solo cresciuta legge solo i nomi nuovi.
+        Ritorna True se la generazione è cambiata.
+        """
+        if not os.path.exists(self.path):
+            return False
+        with self._lock:
+            old_gen, old_count, old_bytes = self.generation, self.count, self.names_bytes
+            self._read_header()
+            if self.generation == old_gen:
+                return False
+            if self.count >= old_count and self.names_bytes >= old_bytes:
+                self._load_names(old_count, old_bytes)
+            else:
+                self.names, self.ids, self.replaces = [], [], []
+                self._load_names()
+            return True
+
+    def matrix(self):
+        """Matrice (count × dim) mappata in memoria, sola lettura, senza copie."""
+        if self.count == 0 or not self.dim:
+            return np.empty((0, self.dim or 0), dtype=DTYPE)
+        return np.memmap(self.path, dtype=DTYPE, mode="r",
+                         offset=HEADER_SIZE, shape=(self.count, self.dim))
+
+    def __len__(self):
+        return self.count
+
+    # ------------------------------------------
+    # ✍️ SCRITTURA
+    # ------------------------------------------
+
+    def _write_header(self, f, count, names_bytes, generation):
+        f.seek(0)
+        f.write(struct.pack(HEADER_FMT, MAGIC, VERSION, self.dim, count,
+                            names_bytes, generation, b""))
+        f.flush()
+        os.fsync(f.fileno())
+
+    def _create(self, dim):
+        self.dim = dim
+        with open(self.path, "wb") as f:
+            self._write_header(f, 0, 0, 0)
+        with open(self.names_path, "wb"):
+            pass
+
+    def append(self, name, embedding):
+        """Aggiunge un embedding per `name`. Ritorna l'id della nuova riga."""
+        return self.append_many([(name, embedding)])[0]
+
+    def append_many(self, items):
+        """
+        Aggiunge più embedding con un unico commit dell'header:
+        o entrano tutti o nessuno. Ritorna gli id assegnati.
+        """
+        return self._append(list(items))
+
+    def replace(self, row_id, embedding):
+        """
+        Sostituisce il prototipo `row_id` (stesso nome) con `embedding`. La
+        riga nuova viene accodata e quella vecchia resta su disco, esclusa
+        dalla galleria: così nessuno snapshot già pubblicato cambia sotto chi
+        lo sta leggendo. Serve a tenere limitato il numero di prototipi per
+        persona. Ritorna l'id della nuova riga.
+        """
+        return self._append([(None, embedding)], replaces=row_id)[0]
+
+    def _append(self, items, replaces=None):
+        if not items:
+            return []
+        rows = _normalize_rows([np.asarray(e, dtype=DTYPE).reshape(-1) for _, e in items])
+
+        with self._lock, _FileLock(self.lock_path):
+            if not os.path.exists(self.path):
+                self._create(rows.shape[1])
+            # un altro processo può aver scritto nel frattempo: i nomi vanno
+            # riletti da dove questa istanza si era fermata
+            known_rows, known_bytes = self.count, self.names_bytes
+            self._read_header()
+            self._load_names(known_rows, known_bytes)
+            if rows.shape[1] != self.dim:
+                raise ValueError(f"Dimensione embedding {rows.shape[1]} diversa da {self.dim}")
+
+            start_row, start_byte = self.count, self.names_bytes
+            new_ids = list(range(start_row, start_row + len(rows)))
+            extra = {}
+            if replaces is not None:
+                if not 0 <= replaces < self.count or replaces in self.replaced_rows():
+                    raise IndexError(f"Riga {replaces} non presente in galleria ({self.count} righe)")
+                items = [(self.names[replaces], items[0][1])]
+                extra = {"replaces": int(replaces)}
+            table = b"".join(
+                json.dumps({"id": i, "name": name, **extra}, ensure_ascii=False).encode("utf-8") + b"\n"
+                for i, (name, _) in zip(new_ids, items)
+            )
+
+            # 1) righe in coda alla matrice
+            with open(self.path, "r+b") as f:
+                f.seek(HEADER_SIZE + start_row * self.dim * rows.itemsize)
+                f.write(rows.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            # 2) nomi in coda alla tabella (eventuali byte orfani vengono sovrascritti)
+            with open(self.names_path, "r+b") as f:
+                f.seek(start_byte)
+                f.write(table)
+                f.truncate()
+                f.flush()
+                os.fsync(f.fileno())
+
+            # 3) commit: header aggiornato in un'unica scrittura
+            with open(self.path, "r+b") as f:
+                self._write_header(f, start_row + len(rows), start_byte + len(table),
+                                   self.generation + 1)
+
+            self._read_header()
+            self._load_names(start_row, start_byte)
+        return new_ids
+
+    # ------------------------------------------
+    # 🔁 MIGRAZIONE DA embeddings.pkl
+    # ------------------------------------------
+
+    def import_pickle(self, pkl_path):
+        """Importa il vecchio dizionario {nome: embedding} se la galleria è vuota."""
+        if self.count > 0 or not os.path.exists(pkl_path):
+            return 0
+        with open(pkl_path, "rb") as f:
+            known = pickle.load(f)
+        if not known:
+            return 0
+        self.append_many(known.items())
+        print(f"🔁 Migrati {len(known)} volti da {os.path.basename(pkl_path)} a {os.path.basename(self.path)}")
+        # il pickle veniva da crop MTCNN non allineati: geometria diversa da quella del live
+        print("⚠️ Gli embedding migrati non usano l'allineamento sui landmark: per distanze "
+              "stabili registrare di nuovo le foto con `python -m src.enroll_bulk`.")
+        return len(known)
+
+
+def open_store(path, legacy_pickle=None):
+    """Apre (o crea al primo append) la galleria, migrando il vecchio pickle se presente."""
+    store = EmbeddingStore(path)
+    if legacy_pickle:
+        store.import_pickle(legacy_pickle)
+    return store
@@ -0,0 +1,41 @@
+# src/utils/face_align.py
+# ==========================================
+# 📐 ALLINEAMENTO VOLTI DAI LANDMARK MTCNN
+# ==========================================
+import cv2
+import numpy as np
+
+FACE_SIZE = 160
+
+# Posizioni di riferimento dei 5 landmark MTCNN (occhio sx, occhio dx, naso,
+# bocca sx, bocca dx) nel template 112×112 comunemente usato per il
+# riconoscimento, riportate a FACE_SIZE con un po' di margine attorno al
+# volto (FaceNet è addestrato su crop MTCNN non troppo stretti).
+_TEMPLATE_112 = np.array([
+    [38.2946, 51.6963],
+    [73.5318, 51.5014],
+    [56.0252, 71.7366],
+    [41.5493, 92.3655],
+    [70.7299, 92.2041],
+], dtype=np.float32)
+_TEMPLATE_MARGIN = 0.85
+REFERENCE_LANDMARKS = (
+    (_TEMPLATE_112 - 56.0) * (FACE_SIZE / 112.0) * _TEMPLATE_MARGIN + FACE_SIZE / 2.0
+).astype(np.float32)
+
+
+def align_face(frame_rgb, landmarks, size=FACE_SIZE):
+    """
+    Volto allineato size×size (uint8 RGB) tramite trasformazione di
+    similarità (rotazione + scala + traslazione) dai 5 landmark al
+    template. Ritorna None se la stima della trasformazione fallisce.
+    """
+    if landmarks is None:
+        return None
+    src = np.asarray(landmarks, dtype=np.float32).reshape(5, 2)
+    dst = REFERENCE_LANDMARKS * (size / FACE_SIZE)
+    matrix, _ = cv2.estimateAffinePartial2D(src, dst, method=cv2.LMEDS)
+    if matrix is None:
+        return None
+    return cv2.warpAffine(frame_rgb, matrix, (size, size),
+                          flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
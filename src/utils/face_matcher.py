@@ -0,0 +1,299 @@
+# src/utils/face_matcher.py
+# ==========================================
+# 🔍 MATCHING VETTORIALE CONTRO LA GALLERIA
+# ==========================================
+from dataclasses import dataclass, field
+
+import numpy as np
+
+MATCH_THRESHOLD = 1.0   # stessa soglia di facenet_utils.compare_embeddings
+UNKNOWN_NAME = "Volto rilevato"
+
+# 🔧 Rivalutazione sui prototipi (solo per risultati borderline sui centroidi)
+RESCORE_BAND = 0.15     # |distanza - soglia| sotto cui il risultato è incerto
+RESCORE_MARGIN = 0.10   # margine migliore-vs-secondo sotto cui il risultato è incerto
+RESCORE_TOP = 5         # identità rivalutate sui rispettivi prototipi
+
+_REPLACED = np.iinfo(np.int64).max   # etichetta delle righe sostituite (ordinate in coda)
+
+
+def l2_normalize(vectors):
+    """Normalizza L2 le righe di una matrice (o un singolo vettore) in float32."""
+    arr = np.asarray(vectors, dtype=np.float32)
+    if arr.ndim == 1:
+        arr = arr[None, :]
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return arr / norms
+
+
+def distance_to_similarity(distance):
+    """Similarità coseno equivalente a una distanza euclidea tra vettori normalizzati."""
+    return 1.0 - distance ** 2 / 2.0
+
+
+@dataclass
+class MatchResult:
+    """Esito del matching di una singola query."""
+    name: str | None            # identità migliore, None se sopra soglia
+    distance: float             # distanza euclidea dalla migliore identità
+    margin: float               # distanza seconda identità - distanza migliore
+    candidates: list = field(default_factory=list)  # [(nome, distanza), ...] top-k
+
+    @property
+    def label(self) -> str:
+        return self.name if self.name is not None else UNKNOWN_NAME
+
+
+class GalleryMatcher:
+    """
+    Galleria di embedding impilati in un'unica matrice float32 contigua,
+    normalizzata L2. Una query (o un batch) viene confrontata con tutta la
+    galleria con un solo prodotto matriciale: per vettori normalizzati
+    ||q - g||² = 2 - 2·q·g, quindi le distanze restano confrontabili con
+    la soglia storica di compare_embeddings.
+
+    Più righe (prototipi) possono appartenere alla stessa identità. In quel
+    caso si confronta prima la query con il centroide di ogni identità e,
+    solo se il risultato è borderline, si rivalutano i prototipi delle
+    identità migliori (distanza minima tra le loro righe).
+    Con un indice ANN (`index`) si confrontano solo le righe candidate.
+    Le righe in `replaced` (prototipi sostituiti) restano nella matrice ma
+    non appartengono a nessuna identità.
+    """
+
+    def __init__(self, names, embeddings, threshold=MATCH_THRESHOLD, normalized=False, index=None,
+                 replaced=()):
+        names = list(names)
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.size == 0:
+            matrix = np.empty((0, matrix.shape[-1] if matrix.ndim == 2 else 0), dtype=np.float32)
+        elif matrix.ndim == 1:
+            matrix = matrix[None, :]
+        if len(names) != matrix.shape[0]:
+            raise ValueError(f"{len(names)} nomi per {matrix.shape[0]} embedding")
+
+        gone = set(int(r) for r in replaced)
+        identities = list(dict.fromkeys(n for i, n in enumerate(names) if i not in gone))
+        label_of = {n: i for i, n in enumerate(identities)}
+        row_labels = np.fromiter((_REPLACED if i in gone else label_of[n] for i, n in enumerate(names)),
+                                 dtype=np.int64, count=len(names))
+        if not normalized and matrix.size:
+            matrix = l2_normalize(matrix)
+        self._setup(matrix, identities, row_labels, threshold, index)
+
+    def _setup(self, matrix, identities, row_labels, threshold, index=None, base=None, touched=()):
+        self.threshold = threshold
+        self.index = index   # indice ANN opzionale (ann_index.IVFIndex)
+        self.identities = identities
+        self._label_of = {n: i for i, n in enumerate(identities)}
+        # la matrice resta nell'ordine originale (nessuna copia se già float32
+        # contigua, es. memmap della galleria); si riordinano solo le similarità
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.row_labels = row_labels
+
+        # Righe raggruppate per identità: il minimo per identità diventa un reduceat
+        order = np.argsort(row_labels, kind="stable")
+        self._rows_sorted = order
+        self._order = None if np.array_equal(order, np.arange(len(order))) else order
+        labels = row_labels[order]
+        self._starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]]) \
+            if len(labels) else np.empty(0, dtype=np.int64)
+        self._ends = np.r_[self._starts[1:], len(labels)].astype(np.int64)
+        self._setup_centroids(base, touched)
+
+    def _setup_centroids(self, base, touched):
+        """
+        Centroidi per identità, solo se qualcuno ha più prototipi e non c'è
+        un indice ANN. Gli snapshot pubblicati sono immutabili (il main loop
+        li legge senza lock): il nuovo snapshot copia i centroidi del
+        precedente e ricalcola solo le identità toccate o nuove.
+        """
+        n_ids = len(self.identities)
+        multi = n_ids < np.count_nonzero(self.row_labels != _REPLACED)
+        if not multi or self.index is not None:
+            self.centroids = None
+            return
+
+        old = base.centroids if base is not None else None
+        if old is None:
+            self.centroids = self._centroid_rows(np.arange(n_ids))
+            return
+        # copia su scrittura: mai modificare righe che uno snapshot vecchio può leggere
+        centroids = np.empty((n_ids, self.matrix.shape[1]), dtype=np.float32)
+        centroids[:len(old)] = old
+        touched = np.asarray(sorted(set(touched) | set(range(len(old), n_ids))), dtype=np.int64)
+        if len(touched):
+            centroids[touched] = self._centroid_rows(touched)
+        self.centroids = centroids
+
+    def _centroid_rows(self, labels):
+        sums = np.stack([self.matrix[self._label_rows(l)].sum(axis=0) for l in labels])
+        return l2_normalize(sums)
+
+    def _label_rows(self, label):
+        return self._rows_sorted[self._starts[label]:self._ends[label]]
+
+    def rows_of(self, name):
+        """Righe della galleria (prototipi) che appartengono a `name`."""
+        label = self._label_of.get(name)
+        if label is None:
+            return np.empty(0, dtype=np.int64)
+        return self._label_rows(label)
+
+    # ------------------------------------------
+    # 🔁 SNAPSHOT SUCCESSIVI
+    # ------------------------------------------
+
+    def extended(self, new_names, matrix, replaced=()):
+        """
+        Nuovo matcher con `new_names` aggiunti in coda: `matrix` è la galleria
+        completa e già normalizzata (righe vecchie + nuove). Le etichette
+        esistenti vengono riusate, si calcolano solo quelle delle righe nuove;
+        le righe `replaced` (prototipi sostituiti dalle nuove) escono dalle
+        rispettive identità.
+        """
+        new_names = list(new_names)
+        identities = list(self.identities)
+        label_of = dict(self._label_of)
+        for n in new_names:
+            if n not in label_of:
+                label_of[n] = len(identities)
+                identities.append(n)
+        new_labels = _labels_for(new_names, label_of)
+        row_labels = np.concatenate([self.row_labels, new_labels])
+        replaced = np.asarray(replaced, dtype=np.int64)
+        touched = np.concatenate([new_labels, self.row_labels[replaced]])
+        row_labels[replaced] = _REPLACED
+        ann = self.index.with_rows(matrix[len(self.row_labels):]) if self.index is not None else None
+
+        new = object.__new__(type(self))
+        new._setup(matrix, identities, row_labels, self.threshold, ann, base=self,
+                   touched=touched[touched != _REPLACED])
+        return new
+
+    def with_index(self, index):
+        """Stesso matcher con un indice ANN diverso (None = ricerca esatta)."""
+        new = object.__new__(type(self))
+        new._setup(self.matrix, self.identities, self.row_labels, self.threshold, index)
+        return new
+
+    @classmethod
+    def from_dict(cls, known: dict, threshold=MATCH_THRESHOLD):
+        """Costruisce il matcher dal vecchio formato {nome: embedding}."""
+        names = list(known.keys())
+        vectors = [np.asarray(v, dtype=np.float32).reshape(-1) for v in known.values()]
+        return cls(names, np.stack(vectors) if vectors else [], threshold=threshold)
+
+    def __len__(self):
+        return len(self.identities)
+
+    # ------------------------------------------
+    # 📏 DISTANZE
+    # ------------------------------------------
+
+    def identity_distances(self, queries):
+        """Distanze (B, n_identità): per ogni query, distanza minima da ogni identità."""
+        q = l2_normalize(queries)
+        sims = q @ self.matrix.T
+        if self._order is not None:
+            sims = sims[:, self._order]
+        # per ogni identità la riga più vicina è quella con similarità massima
+        if len(self._starts) == sims.shape[1]:
+            best_sims = sims    # una riga per identità: niente da ridurre
+        else:
+            best_sims = np.maximum.reduceat(sims, self._starts, axis=1)
+        # i prototipi sostituiti formano l'ultimo gruppo: non sono un'identità
+        best_sims = best_sims[:, :len(self.identities)]
+        return np.sqrt(np.clip(2.0 - 2.0 * best_sims, 0.0, None))
+
+    # ------------------------------------------
+    # 🎯 MATCHING
+    # ------------------------------------------
+
+    def match_batch(self, queries, k=3):
+        """Matching di un batch di query (B, D). Ritorna una lista di MatchResult."""
+        queries = np.asarray(queries, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        if not self.identities:
+            return [MatchResult(None, float("inf"), 0.0) for _ in range(len(queries))]
+
+        if self.index is not None:
+            return [self._match_ann(q, k) for q in l2_normalize(queries)]
+
+        everyone = np.arange(len(self.identities))
+        if self.centroids is None:
+            dists = self.identity_distances(queries)
+            return [self._result(everyone, row, k) for row in dists]
+
+        # 1) centroidi (una riga per identità), 2) prototipi solo se borderline
+        q = l2_normalize(queries)
+        dists = np.sqrt(np.clip(2.0 - 2.0 * (q @ self.centroids.T), 0.0, None))
+        return [self._result(everyone, self._rescore_if_borderline(qi, row), k)
+                for qi, row in zip(q, dists)]
+
+    def match(self, query, k=3):
+        """Matching di una singola query."""
+        return self.match_batch(np.asarray(query, dtype=np.float32).reshape(1, -1), k=k)[0]
+
+    def _rescore_if_borderline(self, q, row):
+        """Sostituisce le distanze dai centroidi delle identità migliori con quelle dai prototipi."""
+        n_top = min(RESCORE_TOP, len(row))
+        top = np.argpartition(row, n_top - 1)[:n_top] if n_top < len(row) else np.arange(len(row))
+        top = top[np.argsort(row[top])]
+        best = row[top[0]]
+        second = row[top[1]] if len(top) > 1 else float("inf")
+        if abs(best - self.threshold) > RESCORE_BAND and second - best >= RESCORE_MARGIN:
+            return row
+
+        rows = np.concatenate([self._label_rows(l) for l in top])
+        sims = self.matrix[rows] @ q
+        order = np.argsort(-sims)
+        labels, first = np.unique(self.row_labels[rows[order]], return_index=True)
+        row = row.copy()
+        row[labels] = np.sqrt(np.clip(2.0 - 2.0 * sims[order[first]], 0.0, None))
+        return row
+
+    def _match_ann(self, q, k):
+        """Matching approssimato: solo le righe candidate dell'indice IVF."""
+        rows, sims = self.index.search(q, self.matrix)
+        live = self.row_labels[rows] != _REPLACED
+        rows, sims = rows[live], sims[live]
+        if len(rows) == 0:
+            return MatchResult(None, float("inf"), 0.0)
+        # migliore riga per identità: ordina per similarità e tiene la prima di ogni etichetta
+        order = np.argsort(-sims)
+        labels, first = np.unique(self.row_labels[rows[order]], return_index=True)
+        best_sims = sims[order[first]]
+        dists = np.sqrt(np.clip(2.0 - 2.0 * best_sims, 0.0, None))
+        return self._result(labels, dists, k)
+
+    def _result(self, identity_ids, dists, k):
+        """MatchResult da distanze per identità (identity_ids[i] ↔ dists[i])."""
+        n = dists.shape[0]
+        k = max(1, min(k, n))
+        if k < n:
+            top = np.argpartition(dists, k - 1)[:k]
+            top = top[np.argsort(dists[top])]
+        else:
+            top = np.argsort(dists)
+        candidates = [(self.identities[identity_ids[i]], float(dists[i])) for i in top]
+
+        best_name, best_dist = candidates[0]
+        second = float(dists[top[1]]) if len(top) > 1 else _second_distance(dists, top[0])
+        margin = second - best_dist
+        name = best_name if best_dist < self.threshold else None
+        return MatchResult(name, best_dist, margin, candidates)
+
+
+def _labels_for(names, label_of):
+    return np.fromiter((label_of[n] for n in names), dtype=np.int64, count=len(names))
+
+
+def _second_distance(row, best_idx):
+    """Seconda distanza più piccola (anche quando k=1)."""
+    if row.shape[0] < 2:
+        return float("inf")
+    rest = np.delete(row, best_idx)
+    return float(rest.min())
@@ -0,0 +1,282 @@
+# src/utils/face_models.py
+# ==========================================
+# 🧠 MODELLI DI PERCEZIONE (MTCNN + RESNET)
+# ==========================================
+# Nessuno stato globale: gli stessi oggetti sono usati dai worker thread di
+# async_core e dai worker process di perception_procs.
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+import torch
+from facenet_pytorch import MTCNN, InceptionResnetV1
+
+from src.utils.face_align import align_face, FACE_SIZE
+from src.utils.face_quality import face_quality
+
+MIN_FACE_PX = 80        # lato minimo del box accettato
+MIN_FACE_PROB = 0.9     # confidence minima MTCNN
+DETECTION_MODES = ("full", "downscaled", "roi")
+ROI_EXPAND = 0.6        # margine attorno alle box note, in frazioni della box
+EMBED_DIM = 512
+
+
+def pick_device():
+    return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+
+# ==========================================================
+# 📸 DETECTION (MTCNN)
+# ==========================================================
+
+def create_mtcnn(device):
+    """MTCNN per detection con parametri ottimizzati."""
+    return MTCNN(
+        keep_all=True,
+        device=device,
+        min_face_size=60,  # 🔧 Aumentato da 40 (meno falsi positivi)
+        thresholds=[0.6, 0.7, 0.8],  # 🔧 Più restrittivo (era [0.5, 0.6, 0.7])
+        post_process=True  # Allineamento automatico
+    )
+
+
+def warm_up_mtcnn(mtcnn, shape=(480, 640, 3), passes=3):
+    """Warm-up completo con più passaggi sullo stesso formato del loop."""
+    dummy_frame = np.random.randint(0, 255, shape, dtype=np.uint8)
+    for _ in range(passes):
+        mtcnn.detect(dummy_frame, landmarks=True)
+
+
+def detect_faces(mtcnn, frame_rgb, scale=1.0):
+    """
+    Un solo passaggio MTCNN sul frame: box, confidence e landmark di tutti i
+    volti, più il volto già allineato 160×160 (uint8 RGB) ottenuto dai
+    landmark. Ritorna una lista di dict (vuota se nessun volto valido):
+        {"box": [x1, y1, x2, y2], "prob": float, "landmarks": (5, 2),
+         "face": array | None, "quality": float 0..1}
+    Con scale < 1 MTCNN gira su una copia ridotta del frame; box e landmark
+    sono riportati alle coordinate originali e l'allineamento usa il frame pieno.
+    """
+    if scale == 1.0:
+        boxes, probs, landmarks = mtcnn.detect(frame_rgb, landmarks=True)
+    else:
+        h, w = frame_rgb.shape[:2]
+        small = cv2.resize(frame_rgb, (round(w * scale), round(h * scale)),
+                           interpolation=cv2.INTER_AREA)
+        boxes, probs, landmarks = mtcnn.detect(small, landmarks=True)
+        if boxes is not None:
+            boxes = boxes / scale
+            landmarks = landmarks / scale
+    return _accept_detections(frame_rgb, boxes, probs, landmarks)
+
+
+def largest_detection(detections):
+    """Detection con il box più grande tra quelle con volto allineato (None se nessuna)."""
+    detections = [d for d in detections or () if d["face"] is not None]
+    if not detections:
+        return None
+    return max(detections, key=lambda d: (d["box"][2] - d["box"][0]) * (d["box"][3] - d["box"][1]))
+
+
+def downscale_for_min_face(mtcnn, min_face_px=MIN_FACE_PX):
+    """
+    Fattore di riduzione per cui un volto di `min_face_px` (il minimo che
+    teniamo comunque) diventa il volto più piccolo cercato da MTCNN: i
+    livelli della piramide sotto quella soglia non vengono calcolati.
+    """
+    return min(1.0, mtcnn.min_face_size / float(min_face_px))
+
+
+def detect_faces_in_rois(mtcnn, frame_rgb, rois, expand=ROI_EXPAND):
+    """
+    MTCNN solo attorno alle box note (x1, y1, x2, y2), allargate di `expand`
+    volte la loro dimensione per lato e fuse se si sovrappongono. Stesso
+    formato di uscita di detect_faces, in coordinate del frame.
+    """
+    h, w = frame_rgb.shape[:2]
+    detections = []
+    for x1, y1, x2, y2 in expand_rois(rois, w, h, expand):
+        crop = np.ascontiguousarray(frame_rgb[y1:y2, x1:x2])
+        boxes, probs, landmarks = mtcnn.detect(crop, landmarks=True)
+        if boxes is None:
+            continue
+        offset = np.array([x1, y1], dtype=np.float32)
+        boxes = boxes + np.tile(offset, 2)
+        landmarks = landmarks + offset
+        detections.extend(_accept_detections(frame_rgb, boxes, probs, landmarks))
+    return detections
+
+
+def expand_rois(rois, width, height, expand=ROI_EXPAND):
+    """Box allargate, ritagliate al frame e fuse finché nessuna si sovrappone."""
+    regions = []
+    for x1, y1, x2, y2 in rois:
+        bw, bh = x2 - x1, y2 - y1
+        regions.append([
+            max(0, int(x1 - expand * bw)), max(0, int(y1 - expand * bh)),
+            min(width, int(x2 + expand * bw)), min(height, int(y2 + expand * bh)),
+        ])
+
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(regions)):
+            for j in range(i + 1, len(regions)):
+                a, b = regions[i], regions[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    regions[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del regions[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return [r for r in regions if r[2] - r[0] >= MIN_FACE_PX and r[3] - r[1] >= MIN_FACE_PX]
+
+
+def run_detection(mtcnn, frame_rgb, mode="full", rois=None):
+    """
+    Detection secondo DETECTION_MODES:
+      - "full": frame intero a piena risoluzione;
+      - "downscaled": frame ridotto in modo che 80 px diventino il volto minimo di MTCNN;
+      - "roi": solo attorno a `rois` (se ci sono), altrimenti frame intero.
+    """
+    if mode == "roi" and rois:
+        return detect_faces_in_rois(mtcnn, frame_rgb, rois)
+    if mode == "downscaled":
+        return detect_faces(mtcnn, frame_rgb, downscale_for_min_face(mtcnn))
+    return detect_faces(mtcnn, frame_rgb)
+
+
+def _accept_detections(frame_rgb, boxes, probs, landmarks):
+    """Filtra per dimensione e confidence, allinea i volti rimasti e ne stima la qualità."""
+    if boxes is None or probs is None:
+        return []
+
+    detections = []
+    for box, prob, lm in zip(boxes, probs, landmarks):
+        x1, y1, x2, y2 = box
+        w, h = x2 - x1, y2 - y1
+
+        # 🔧 FIX: Filtra: min 80x80px e confidence > 0.9
+        if w >= MIN_FACE_PX and h >= MIN_FACE_PX and prob > MIN_FACE_PROB:
+            face = align_face(frame_rgb, lm)
+            detections.append({
+                "box": box,
+                "prob": float(prob),
+                "landmarks": lm,
+                "face": face,
+                "quality": face_quality(face, box, float(prob), lm),
+            })
+    return detections
+
+
+# ==========================================================
+# 🧬 EMBEDDING (ResNet, micro-batch)
+# ==========================================================
+
+def collect_batch(q, max_items, max_wait, timeout=0.5):
+    """
+    Attende un elemento da `q` (queue.Empty dopo `timeout`), poi raccoglie
+    gli altri fino a `max_items` o `max_wait` secondi. Vale sia per
+    queue.Queue sia per multiprocessing.Queue.
+    """
+    items = [q.get(timeout=timeout)]
+    deadline = time.perf_counter() + max_wait
+    while len(items) < max_items:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        try:
+            items.append(q.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return items
+
+
+def summarize_embed_stats(stats):
+    """Statistiche grezze di FaceEmbedder con le medie derivate."""
+    stats = dict(stats)
+    batches = max(stats["batches"], 1)
+    stats["avg_batch"] = stats["faces"] / batches
+    stats["avg_ms"] = stats["total_ms"] / batches
+    stats["avg_ms_per_face"] = stats["total_ms"] / max(stats["faces"], 1)
+    return stats
+
+
+def empty_embed_stats():
+    return {
+        "batches": 0,        # forward eseguiti
+        "faces": 0,          # volti processati
+        "max_batch": 0,      # batch più grande visto
+        "total_ms": 0.0,     # tempo totale di preprocessing + forward
+        "last_ms": 0.0,      # durata dell'ultimo batch
+    }
+
+
+class FaceEmbedder:
+    """
+    ResNet (vggface2) con forward a batch di al più `max_batch` volti e
+    buffer di preprocessing riusati a ogni batch (niente allocazioni nel loop).
+    """
+
+    def __init__(self, device, max_batch=8):
+        self.device = device
+        self.max_batch = max_batch
+        self.resnet = InceptionResnetV1(pretrained='vggface2').eval().to(device)
+        self._host = np.empty((max_batch, FACE_SIZE, FACE_SIZE, 3), dtype=np.uint8)
+        self._input = torch.empty((max_batch, 3, FACE_SIZE, FACE_SIZE), device=device)
+        self._stats = empty_embed_stats()
+        self._stats_lock = threading.Lock()
+
+    def warm_up(self):
+        """Batch pieno con le stesse forme del loop; le statistiche ripartono da zero."""
+        dummy_faces = [np.random.randint(0, 255, (FACE_SIZE, FACE_SIZE, 3), dtype=np.uint8)
+                       for _ in range(self.max_batch)]
+        self.embed(dummy_faces)
+        with self._stats_lock:
+            self._stats = empty_embed_stats()
+
+    def raw_stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def embed(self, faces):
+        """
+        Embedding di una lista di crop RGB uint8 (qualsiasi dimensione).
+        Ritorna un array (N, 512).
+        """
+        out = []
+        for start in range(0, len(faces), self.max_batch):
+            chunk = faces[start:start + self.max_batch]
+            n = len(chunk)
+            t0 = time.perf_counter()
+
+            # resize bilineare direttamente nel buffer host riusato
+            for i, face in enumerate(chunk):
+                if face.shape[:2] == (FACE_SIZE, FACE_SIZE):
+                    self._host[i] = face
+                else:
+                    cv2.resize(face, (FACE_SIZE, FACE_SIZE), dst=self._host[i],
+                               interpolation=cv2.INTER_LINEAR)
+
+            # copia nel tensore di input preallocato + normalizzazione FaceNet in-place:
+            # (x/255 - 0.5) / 0.5 == x * 2/255 - 1
+            batch = self._input[:n]
+            batch.copy_(torch.from_numpy(self._host[:n]).permute(0, 3, 1, 2))
+            batch.mul_(2.0 / 255.0).sub_(1.0)
+
+            with torch.no_grad():
+                out.append(self.resnet(batch).cpu().numpy())
+
+            elapsed_ms = (time.perf_counter() - t0) * 1000.0
+            with self._stats_lock:
+                self._stats["batches"] += 1
+                self._stats["faces"] += n
+                self._stats["max_batch"] = max(self._stats["max_batch"], n)
+                self._stats["total_ms"] += elapsed_ms
+                self._stats["last_ms"] = elapsed_ms
+        if not out:
+            return np.empty((0, EMBED_DIM), dtype=np.float32)
+        return np.concatenate(out)
@@ -0,0 +1,121 @@
+# src/utils/face_quality.py
+# ==========================================
+# 🔎 QUALITÀ DEL VOLTO E SCELTA DEL CROP MIGLIORE
+# ==========================================
+# Punteggio 0..1 economico (pochi decimi di ms) da nitidezza, dimensione,
+# confidence MTCNN e frontalità stimata dai landmark. Per ogni tracker si
+# tiene il crop migliore su una breve finestra e solo quello va a ResNet:
+# meno forward e meno falsi "sconosciuto" da volti mossi o di profilo.
+import cv2
+import numpy as np
+
+SHARPNESS_REF = 120.0     # varianza del Laplaciano considerata "nitida"
+SIZE_REF = 160.0          # lato del box (px) considerato pieno
+PROB_FLOOR = 0.9          # confidence MTCNN minima accettata (→ punteggio 0)
+MAX_YAW = 0.35            # scostamento naso/occhi (in distanze interoculari) = profilo
+MAX_PITCH = 0.25          # scostamento verticale del naso dalla sua posizione tipica
+
+QUALITY_WEIGHTS = {"sharpness": 0.35, "size": 0.2, "prob": 0.15, "frontal": 0.3}
+
+QUALITY_WINDOW = 0.6      # secondi in cui raccogliere i candidati di un tracker
+MIN_QUALITY = 0.35        # sotto questa soglia il migliore della finestra viene scartato
+EXCELLENT_QUALITY = 0.85  # un crop così buono parte subito, senza attendere la finestra
+
+
+def sharpness(face_rgb):
+    """Varianza del Laplaciano sul volto in scala di grigi."""
+    gray = cv2.cvtColor(face_rgb, cv2.COLOR_RGB2GRAY)
+    return float(cv2.Laplacian(gray, cv2.CV_32F).var())
+
+
+def frontalness(landmarks):
+    """
+    1 = volto frontale, 0 = di profilo o molto inclinato. Dai 5 landmark
+    MTCNN: posizione del naso rispetto al punto medio degli occhi (yaw) e
+    tra occhi e bocca (pitch), normalizzate sulla distanza interoculare.
+    """
+    if landmarks is None:
+        return 0.0
+    lm = np.asarray(landmarks, dtype=np.float32).reshape(5, 2)
+    left_eye, right_eye, nose, mouth_l, mouth_r = lm
+    eye_mid = (left_eye + right_eye) / 2.0
+    mouth_mid = (mouth_l + mouth_r) / 2.0
+    eye_dist = float(np.linalg.norm(right_eye - left_eye))
+    if eye_dist < 1.0:
+        return 0.0
+
+    # asse occhi→bocca: il naso frontale cade sulla mediana, circa a metà altezza
+    axis = mouth_mid - eye_mid
+    axis_len = float(np.linalg.norm(axis))
+    if axis_len < 1.0:
+        return 0.0
+    axis /= axis_len
+    rel = nose - eye_mid
+    yaw = abs(float(rel[0] * axis[1] - rel[1] * axis[0])) / eye_dist
+    pitch = abs(float(rel @ axis) / axis_len - 0.5)
+
+    yaw_score = max(0.0, 1.0 - yaw / MAX_YAW)
+    pitch_score = max(0.0, 1.0 - pitch / MAX_PITCH)
+    return yaw_score * pitch_score
+
+
+def face_quality(face_rgb, box, prob, landmarks):
+    """Punteggio complessivo 0..1 di un volto rilevato (crop allineato o grezzo)."""
+    x1, y1, x2, y2 = box
+    parts = {
+        "sharpness": min(sharpness(face_rgb) / SHARPNESS_REF, 1.0) if face_rgb is not None else 0.0,
+        "size": min(min(x2 - x1, y2 - y1) / SIZE_REF, 1.0),
+        "prob": min(max((prob - PROB_FLOOR) / (1.0 - PROB_FLOOR), 0.0), 1.0),
+        "frontal": frontalness(landmarks),
+    }
+    return float(sum(QUALITY_WEIGHTS[k] * v for k, v in parts.items()))
+
+
+class BestFaceSelector:
+    """
+    Finestra per tracker: `offer` propone una detection (dict con "quality"),
+    `pop_ready` restituisce il crop migliore dei tracker la cui finestra è
+    scaduta (o con un crop eccellente). Le finestre con un migliore sotto
+    MIN_QUALITY vengono scartate senza embedding.
+    """
+
+    def __init__(self, window=QUALITY_WINDOW, min_quality=MIN_QUALITY,
+                 excellent=EXCELLENT_QUALITY):
+        self.window = window
+        self.min_quality = min_quality
+        self.excellent = excellent
+        self._open = {}          # id → [inizio finestra, miglior detection]
+        self.offered = 0
+        self.selected = 0
+        self.rejected = 0
+
+    def offer(self, tid, det, now):
+        self.offered += 1
+        entry = self._open.get(tid)
+        if entry is None:
+            self._open[tid] = [now, det]
+        elif det["quality"] > entry[1]["quality"]:
+            entry[1] = det
+
+    def pop_ready(self, now, limit=None):
+        """
+        [(id, detection)] pronti per l'embedding in questo frame, al più
+        `limit` (es. posti liberi nella coda di ResNet): le finestre oltre
+        il limite restano aperte per i frame successivi.
+        """
+        ready = []
+        for tid, (opened, det) in list(self._open.items()):
+            if limit is not None and len(ready) >= limit:
+                break
+            if det["quality"] < self.excellent and now - opened < self.window:
+                continue
+            del self._open[tid]
+            if det["quality"] < self.min_quality:
+                self.rejected += 1
+                continue
+            self.selected += 1
+            ready.append((tid, det))
+        return ready
+
+    def drop(self, tid):
+        self._open.pop(tid, None)
@@ -1,27 +1,64 @@
-import torch
+import threading
+
 import numpy as np
-from facenet_pytorch import MTCNN, InceptionResnetV1
 from PIL import Image
 
-mtcnn = MTCNN(image_size=160, margin=0)
-resnet = InceptionResnetV1(pretrained='vggface2').eval()
+from src.utils.face_models import pick_device, create_mtcnn, detect_faces, largest_detection, FaceEmbedder
+from src.utils.face_align import align_face
+
+# Stessa catena del riconoscimento live (detection MTCNN → allineamento sui
+# 5 landmark → FaceEmbedder): galleria e query condividono la geometria del
+# crop e la normalizzazione, quindi le distanze restano confrontabili.
+# Modelli creati alla prima richiesta.
+_models = None
+_models_lock = threading.Lock()
+_embed_lock = threading.Lock()    # FaceEmbedder riusa i propri buffer: una chiamata alla volta
+
+
+def _get_models():
+    global _models
+    with _models_lock:
+        if _models is None:
+            device = pick_device()
+            _models = (create_mtcnn(device), FaceEmbedder(device, max_batch=1))
+        return _models
+
 
 def get_face_embedding(img_path):
-    img = Image.open(img_path)
-    face = mtcnn(img)
-    if face is not None:
-        with torch.no_grad():
-            embedding = resnet(face.unsqueeze(0))
-        return embedding.squeeze().numpy()
-    return None
-
-def get_face_embedding_from_frame(frame, box):
+    """Embedding del volto più grande nell'immagine (None se non ne trova)."""
+    img = np.asarray(Image.open(img_path).convert("RGB"))
+    return get_face_embedding_from_image(img)
+
+
+def get_face_embedding_from_image(img_rgb):
+    mtcnn, _ = _get_models()
+    largest = largest_detection(detect_faces(mtcnn, np.ascontiguousarray(img_rgb)))
+    if largest is None:
+        return None
+    return get_face_embedding_from_aligned(largest["face"])
+
+
+def get_face_embedding_from_aligned(face):
+    """Embedding di un volto già allineato 160x160 uint8 RGB (es. da detect_faces)."""
+    _, embedder = _get_models()
+    with _embed_lock:
+        return embedder.embed([face])[0]
+
+
+def get_face_embedding_from_frame(frame, box, landmarks=None):
+    # Con i landmark della detection si allinea direttamente, senza un secondo passaggio MTCNN
+    if landmarks is not None:
+        face = align_face(frame, landmarks)
+        if face is not None:
+            return get_face_embedding_from_aligned(face)
+
     x1, y1, x2, y2 = [int(b) for b in box]
 
-    # Evita indici fuori range
+    # Evita indici fuori range; margine attorno al box perché MTCNN ritrovi i landmark
     h, w, _ = frame.shape
-    x1, y1 = max(0, x1), max(0, y1)
-    x2, y2 = min(w, x2), min(h, y2)
+    mx, my = (x2 - x1) // 4, (y2 - y1) // 4
+    x1, y1 = max(0, x1 - mx), max(0, y1 - my)
+    x2, y2 = min(w, x2 + mx), min(h, y2 + my)
 
     face_img = frame[y1:y2, x1:x2]
 
@@ -29,19 +66,12 @@ def get_face_embedding_from_frame(frame, box):
     if face_img.size == 0 or (x2 - x1) < 30 or (y2 - y1) < 30:
         return None
 
-    img = Image.fromarray(face_img)
-
     # 🔒 Proteggi da crash MTCNN
     try:
-        face = mtcnn(img)
-        if face is not None:
-            with torch.no_grad():
-                embedding = resnet(face.unsqueeze(0))
-            return embedding.squeeze().numpy()
+        return get_face_embedding_from_image(face_img)
     except Exception:
         return None
 
-    return None
 
 def compare_embeddings(emb1, emb2, threshold=1.0):
     distance = np.linalg.norm(emb1 - emb2)
@@ -0,0 +1,121 @@
+# src/utils/frame_ring.py
+# ==========================================
+# 🎞️ RING BUFFER DI FRAME CONDIVISI (ZERO COPY)
+# ==========================================
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+FRAME_SHAPE = (480, 640, 3)   # formato di lavoro del loop (dopo il resize)
+RING_SLOTS = 6                # main loop + coda detection + worker + margine
+
+
+class FrameSlot:
+    """
+    Uno slot preallocato: frame BGR (tracking/display) e RGB (detection).
+    Chi riceve uno slot lo legge senza copiarlo e chiama `release()` quando
+    ha finito; lo slot torna scrivibile solo con zero riferimenti.
+    """
+
+    def __init__(self, ring, index, shape, rgb=None):
+        self.ring = ring
+        self.index = index
+        self.seq = -1                 # numero del frame attualmente nello slot
+        self.refs = 0
+        self.bgr = np.empty(shape, dtype=np.uint8)
+        self.rgb = np.empty(shape, dtype=np.uint8) if rgb is None else rgb
+
+    def retain(self):
+        self.ring.retain(self)
+        return self
+
+    def release(self):
+        self.ring.release(self)
+
+
+class FrameRing:
+    """Anello di FrameSlot con numeri di sequenza e reference count."""
+
+    def __init__(self, slots=RING_SLOTS, shape=FRAME_SHAPE, rgb_frames=None):
+        self.shape = shape
+        self._lock = threading.Lock()
+        self._slots = [
+            FrameSlot(self, i, shape, None if rgb_frames is None else rgb_frames[i])
+            for i in range(slots)
+        ]
+        self._next = 0
+        self.dropped = 0              # frame scartati perché tutti gli slot erano occupati
+
+    def acquire_write(self, seq):
+        """
+        Slot libero per il frame `seq` (il chiamante ne detiene un riferimento).
+        Ritorna None se tutti gli slot sono ancora in uso.
+        """
+        with self._lock:
+            for step in range(len(self._slots)):
+                slot = self._slots[(self._next + step) % len(self._slots)]
+                if slot.refs == 0:
+                    slot.refs = 1
+                    slot.seq = seq
+                    self._next = (slot.index + 1) % len(self._slots)
+                    return slot
+            self.dropped += 1
+            return None
+
+    def retain(self, slot):
+        with self._lock:
+            slot.refs += 1
+
+    def release(self, slot):
+        with self._lock:
+            if slot.refs <= 0:
+                raise RuntimeError(f"release di uno slot non acquisito (slot {slot.index})")
+            slot.refs -= 1
+
+    def in_use(self):
+        with self._lock:
+            return sum(1 for s in self._slots if s.refs > 0)
+
+
+class SharedFrameRing(FrameRing):
+    """
+    FrameRing i cui frame RGB vivono in un unico blocco
+    multiprocessing.shared_memory: un altro processo li legge senza copie
+    con `attach_frames(name, slots, shape)` e l'indice dello slot.
+    """
+
+    def __init__(self, slots=RING_SLOTS, shape=FRAME_SHAPE):
+        size = slots * int(np.prod(shape))
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        frames = np.ndarray((slots,) + tuple(shape), dtype=np.uint8, buffer=self._shm.buf)
+        super().__init__(slots, shape, rgb_frames=frames)
+        self.name = self._shm.name
+        self.slots = slots
+
+    def close(self):
+        """Libera il blocco condiviso (da chiamare a worker fermi)."""
+        if self._shm is None:
+            return
+        for slot in self._slots:
+            slot.rgb = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass  # qualche vista è ancora viva: il segmento sparisce comunque con unlink
+        self._shm.unlink()
+        self._shm = None
+
+
+def attach_frames(name, slots, shape=FRAME_SHAPE):
+    """
+    Lato worker: (shm, frames) con frames di forma (slots, *shape) sul blocco
+    creato da SharedFrameRing. Chiamare `shm.close()` a fine lavoro.
+    """
+    try:
+        # il blocco appartiene al processo principale: non registrarlo qui
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        shm = shared_memory.SharedMemory(name=name)
+    frames = np.ndarray((slots,) + tuple(shape), dtype=np.uint8, buffer=shm.buf)
+    return shm, frames
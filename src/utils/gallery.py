@@ -0,0 +1,202 @@
+# src/utils/gallery.py
+# ==========================================
+# 🗂️ GALLERIA LIVE (HOT-RELOAD SENZA RIAVVIO)
+# ==========================================
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.utils.face_matcher import GalleryMatcher, MATCH_THRESHOLD, l2_normalize, distance_to_similarity
+from src.utils.ann_index import IVFIndex
+
+EXTERNAL_POLL_INTERVAL = 1.0   # secondi tra due controlli dell'header su disco
+ANN_MIN_ROWS = 20000           # sotto questa soglia la ricerca esatta è già abbastanza veloce
+
+# 🔧 Prototipi per identità
+MAX_PROTOTYPES = 5             # embedding massimi per persona
+PROTOTYPE_MIN_DIST = 0.35      # più vicino di così a un prototipo = duplicato
+LEARN_MAX_DIST = 0.6           # solo match molto sicuri diventano prototipi
+LEARN_MIN_MARGIN = 0.25        # ...e ben separati dalla seconda identità
+LEARN_INTERVAL = 60.0          # secondi minimi tra due apprendimenti per la stessa persona
+
+
+class LiveGallery:
+    """
+    Galleria in memoria condivisa tra main loop e thread di interazione.
+
+    Il matcher corrente è uno snapshot immutabile: chi fa matching legge
+    solo il riferimento `self._matcher` (assegnazione atomica in CPython),
+    senza lock. Gli arruolamenti e le modifiche esterne costruiscono uno
+    snapshot nuovo a partire da quello vecchio e lo pubblicano incrementando
+    `generation`.
+    """
+
+    def __init__(self, store, threshold=MATCH_THRESHOLD):
+        self.store = store
+        self.threshold = threshold
+        self._write_lock = threading.Lock()
+        self._last_poll = 0.0
+        self._last_learn = {}          # nome -> timestamp ultimo prototipo appreso
+        self._learn_executor = None
+
+        self._rows = len(store)
+        self._store_generation = store.generation
+        self._matcher = self._with_ann(
+            GalleryMatcher(store.names, store.matrix(), threshold=threshold, normalized=True,
+                           replaced=store.replaced_rows()),
+            reuse_saved=True,
+        )
+        self.generation = 0
+
+    # ------------------------------------------
+    # 🎯 LETTURA (LOCK-FREE)
+    # ------------------------------------------
+
+    @property
+    def matcher(self):
+        return self._matcher
+
+    def match_batch(self, queries, k=3):
+        return self._matcher.match_batch(queries, k=k)
+
+    def match(self, query, k=3):
+        return self._matcher.match(query, k=k)
+
+    def __len__(self):
+        return len(self._matcher)
+
+    # ------------------------------------------
+    # ✍️ AGGIORNAMENTI
+    # ------------------------------------------
+
+    def _publish(self):
+        """Costruisce lo snapshot nuovo dallo stato corrente dello store (con _write_lock)."""
+        store = self.store
+        if store.generation == self._store_generation:
+            return False
+        matcher = self._matcher
+        if len(store) > self._rows:
+            # galleria append-only: si estende lo snapshot precedente con le righe in coda
+            # (i prototipi sostituiti da quelle righe escono dalle loro identità)
+            matcher = matcher.extended(store.names[self._rows:], store.matrix(),
+                                       replaced=store.replaced_rows(self._rows))
+            if matcher.index is not None:
+                matcher.index.append_saved(store.path, self._rows)
+            else:
+                matcher = self._with_ann(matcher, reuse_saved=False)
+        else:
+            # modifica esterna non incrementale: ricostruzione completa
+            matcher = self._with_ann(
+                GalleryMatcher(store.names, store.matrix(), threshold=self.threshold, normalized=True,
+                               replaced=store.replaced_rows()),
+                reuse_saved=True,
+            )
+        self._rows = len(store)
+        self._store_generation = store.generation
+        self._matcher = matcher
+        self.generation += 1
+        return True
+
+    def _with_ann(self, matcher, reuse_saved):
+        """Aggancia l'indice IVF quando la galleria supera ANN_MIN_ROWS righe."""
+        matrix = matcher.matrix
+        if len(matrix) < ANN_MIN_ROWS:
+            return matcher
+        index = IVFIndex.load(self.store.path, matrix) if reuse_saved else None
+        if index is None:
+            t0 = time.time()
+            index = IVFIndex.train(matrix)
+            index.save(self.store.path)
+            print(f"🧭 Indice IVF addestrato: {index.nlist} liste su {len(matrix)} righe "
+                  f"({time.time() - t0:.1f}s)")
+        return matcher.with_index(index)
+
+    def enroll(self, name, embedding):
+        """Registra un volto (nuovo o già noto) come prototipo della sua identità."""
+        changed = self.add_template(name, embedding)
+        if changed:
+            print(f"🗂️ Galleria aggiornata (gen {self.generation}): '{name}' riconoscibile da subito")
+        return changed
+
+    def add_template(self, name, embedding):
+        """
+        Aggiunge `embedding` ai prototipi di `name`, che restano al massimo
+        MAX_PROTOTYPES. Un campione quasi identico a un prototipo esistente
+        viene scartato; a capienza piena sostituisce il prototipo più
+        ridondante, ma solo se aumenta la varietà dell'insieme.
+        Ritorna True se la galleria è cambiata.
+        """
+        vec = l2_normalize(embedding)[0]
+        with self._write_lock:
+            matcher = self._matcher
+            rows = matcher.rows_of(name)
+            if len(rows) == 0:
+                self.store.append(name, vec)
+                return self._publish()
+
+            protos = np.asarray(matcher.matrix[rows])
+            sims = protos @ vec
+            if sims.max() > distance_to_similarity(PROTOTYPE_MIN_DIST):
+                return False    # duplicato di un prototipo esistente
+
+            if len(rows) < MAX_PROTOTYPES:
+                self.store.append(name, vec)
+                return self._publish()
+
+            gram = protos @ protos.T
+            np.fill_diagonal(gram, -np.inf)
+            redundancy = gram.max(axis=1)
+            victim = int(np.argmax(redundancy))
+            if np.delete(sims, victim).max() >= redundancy[victim]:
+                return False    # il nuovo campione non renderebbe l'insieme più vario
+            self.store.replace(int(rows[victim]), vec)
+            return self._publish()
+
+    def learn(self, name, embedding, result, now=None):
+        """
+        Usa un match ad alta confidenza come nuovo prototipo (in background,
+        al massimo una volta ogni LEARN_INTERVAL secondi per persona).
+        """
+        if result.name != name or result.distance > LEARN_MAX_DIST or result.margin < LEARN_MIN_MARGIN:
+            return False
+        now = time.time() if now is None else now
+        if now - self._last_learn.get(name, 0.0) < LEARN_INTERVAL:
+            return False
+        self._last_learn[name] = now
+        if self._learn_executor is None:
+            self._learn_executor = ThreadPoolExecutor(max_workers=1)
+        self._learn_executor.submit(self._learn_safe, name, np.array(embedding, copy=True))
+        return True
+
+    def _learn_safe(self, name, embedding):
+        try:
+            if self.add_template(name, embedding):
+                print(f"🧩 Nuovo prototipo per {name} ({len(self._matcher.rows_of(name))}/{MAX_PROTOTYPES})")
+        except Exception as e:
+            print(f"[GALLERY] Errore aggiornamento prototipi: {e}")
+
+    def poll_external(self, now=None, force=False):
+        """
+        Controlla (al massimo ogni EXTERNAL_POLL_INTERVAL secondi) se un altro
+        processo ha scritto sulla galleria e integra le righe nuove. Non
+        attende mai: se un arruolamento sta scrivendo (fsync, lock su file)
+        il controllo salta e lo recupera il successivo.
+        """
+        now = time.time() if now is None else now
+        if not force and now - self._last_poll < EXTERNAL_POLL_INTERVAL:
+            return False
+        if not self._write_lock.acquire(blocking=False):
+            return False
+        self._last_poll = now
+        try:
+            if not self.store.refresh() and self.store.generation == self._store_generation:
+                return False
+            added = len(self.store) - self._rows
+            changed = self._publish()
+        finally:
+            self._write_lock.release()
+        if changed:
+            print(f"🔄 Galleria ricaricata da disco (+{added} embedding, gen {self.generation})")
+        return changed
@@ -0,0 +1,145 @@
+# src/utils/identity_cache.py
+# ==========================================
+# 🗳️ IDENTITÀ PER TRACKER (VOTI + CONFIDENZA)
+# ==========================================
+# Ogni tracker accumula i risultati del matching invece di dimenticarli:
+# voti per identità, distanza media e uno stato. L'embedding si ripete solo
+# finché l'identità è incerta o dopo un'occlusione; un'identità confermata
+# resta sul tracker fino alla sua rimozione, quindi a regime ResNet non
+# gira quasi più.
+from dataclasses import dataclass, field
+
+NEW, UNCERTAIN, CONFIRMED = "new", "uncertain", "confirmed"
+
+CONFIRM_VOTES = 3            # voti per confermare un'identità (nota o sconosciuta)
+CONFIRM_SHARE = 0.7          # quota minima dei voti per l'identità in testa
+STRONG_MATCH_DIST = 0.6      # match così vicino (e con margine) conferma subito
+STRONG_MATCH_MARGIN = 0.25
+UNCERTAIN_INTERVAL = 0.5     # secondi tra embedding finché l'identità è incerta
+UNKNOWN_RECHECK = 10.0       # secondi tra verifiche di un volto confermato sconosciuto
+PENDING_TIMEOUT = 2.0        # richiesta senza risposta oltre questo tempo → si può ripetere
+
+
+@dataclass
+class TrackIdentity:
+    """Stato dell'identità di un tracker. `name` None = sconosciuto."""
+    state: str = NEW
+    name: str | None = None
+    confidence: float = 0.0               # quota dei voti dell'identità in testa
+    votes: dict = field(default_factory=dict)      # nome (o None) → voti
+    dist_sum: dict = field(default_factory=dict)   # nome (o None) → somma delle distanze
+    observations: int = 0
+    occluded: bool = False                # da riverificare al prossimo volto utile
+    pending_since: float | None = None    # richiesta di embedding in volo
+    last_embed: float = 0.0
+    greeted: bool = False                 # interazione già avviata (o non necessaria) per questo tracker
+    embedding: object = None              # ultimo embedding osservato (registrazione degli sconosciuti)
+
+    def mean_distance(self, name=None):
+        name = self.name if name is None else name
+        votes = self.votes.get(name, 0)
+        return self.dist_sum.get(name, 0.0) / votes if votes else float("inf")
+
+
+class IdentityCache:
+    """Identità per id tracker, con la politica di ri-embedding."""
+
+    def __init__(self):
+        self._tracks = {}
+        self.requested = 0       # embedding richiesti
+        self.skipped = 0         # volti disponibili non embeddati perché l'identità era già nota
+        self._gallery_generation = None
+
+    def get(self, tid):
+        return self._tracks.setdefault(tid, TrackIdentity())
+
+    def drop(self, tid):
+        self._tracks.pop(tid, None)
+
+    def mark_occluded(self, tid):
+        """Tracker perso o non confermato per qualche frame: l'identità va riverificata."""
+        ident = self._tracks.get(tid)
+        if ident is not None and ident.state == CONFIRMED:
+            ident.occluded = True
+
+    def on_gallery_change(self, generation):
+        """Nuovi volti in galleria: gli sconosciuti confermati vanno ricontrollati."""
+        if generation == self._gallery_generation:
+            return
+        self._gallery_generation = generation
+        for ident in self._tracks.values():
+            if ident.state == CONFIRMED and ident.name is None:
+                ident.state = UNCERTAIN
+
+    def wants_embedding(self, tid, now):
+        """True se conviene inviare a ResNet il volto di questo tracker adesso."""
+        ident = self.get(tid)
+        if ident.pending_since is not None and now - ident.pending_since < PENDING_TIMEOUT:
+            return False
+        if ident.state == NEW or ident.occluded:
+            return True
+        if ident.state == UNCERTAIN:
+            return now - ident.last_embed >= UNCERTAIN_INTERVAL
+        if ident.name is None:
+            return now - ident.last_embed >= UNKNOWN_RECHECK
+        self.skipped += 1
+        return False
+
+    def embedding_requested(self, tid, now):
+        ident = self.get(tid)
+        ident.pending_since = now
+        ident.last_embed = now
+        self.requested += 1
+
+    def awaiting_greeting(self):
+        """[(id, TrackIdentity)] confermati ma non ancora salutati."""
+        return [(tid, ident) for tid, ident in self._tracks.items()
+                if ident.state == CONFIRMED and not ident.greeted]
+
+    def mark_greeted(self, tid):
+        ident = self._tracks.get(tid)
+        if ident is not None:
+            ident.greeted = True
+
+    def observe(self, tid, result, embedding=None):
+        """
+        Registra un MatchResult per il tracker e aggiorna stato e confidenza.
+        Ritorna la TrackIdentity (None se il tracker non esiste più).
+        """
+        ident = self._tracks.get(tid)
+        if ident is None:
+            return None
+        ident.pending_since = None
+
+        if ident.occluded:
+            ident.occluded = False
+            if ident.state == CONFIRMED and result.name != ident.name and self._strong(result):
+                # dopo l'occlusione c'è un'altra persona sotto lo stesso tracker
+                self._tracks[tid] = ident = TrackIdentity(last_embed=ident.last_embed)
+
+        if embedding is not None:
+            ident.embedding = embedding
+        label = result.name
+        ident.votes[label] = ident.votes.get(label, 0) + 1
+        ident.dist_sum[label] = ident.dist_sum.get(label, 0.0) + result.distance
+        ident.observations += 1
+
+        leader = max(ident.votes, key=ident.votes.get)
+        ident.confidence = ident.votes[leader] / ident.observations
+        if ident.state == CONFIRMED:
+            if ident.name is None and self._strong(result):
+                ident.name = label  # lo "sconosciuto" ricontrollato è ora in galleria
+            return ident  # l'identità confermata resta finché il tracker esiste
+
+        if self._strong(result):
+            ident.name, ident.state = label, CONFIRMED
+        elif ident.votes[leader] >= CONFIRM_VOTES and ident.confidence >= CONFIRM_SHARE:
+            ident.name, ident.state = leader, CONFIRMED
+        else:
+            ident.name, ident.state = leader, UNCERTAIN
+        return ident
+
+    @staticmethod
+    def _strong(result):
+        return (result.name is not None and result.distance <= STRONG_MATCH_DIST
+                and result.margin >= STRONG_MATCH_MARGIN)
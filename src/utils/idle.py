@@ -0,0 +1,61 @@
+# src/utils/idle.py
+# ==========================================
+# 💤 MODALITÀ IDLE (NESSUNO DAVANTI ALLA CAMERA)
+# ==========================================
+# Dopo IDLE_AFTER secondi senza volti il main loop smette di preparare i
+# frame e di inviarli a MTCNN: resta solo la differenza tra frame di
+# MotionMeter a IDLE_FPS. Al primo movimento si esce e la detection
+# completa riparte subito.
+import time
+
+IDLE_AFTER = 20.0        # secondi senza volti prima di entrare in idle
+IDLE_FPS = 4.0           # frame/s esaminati in idle
+IDLE_WAKE_MOTION = 0.02  # frazione di pixel in movimento che risveglia il loop
+
+
+class IdleMonitor:
+    """
+    Stato idle del loop. `saw_faces(now)` va chiamato quando la detection
+    trova volti; `should_enter(now, busy)` e `should_wake(now, motion)`
+    decidono le transizioni, che vengono stampate e contate.
+    """
+
+    def __init__(self, idle_after=IDLE_AFTER, idle_fps=IDLE_FPS, wake_motion=IDLE_WAKE_MOTION):
+        self.idle_after = idle_after
+        self.period = 1.0 / idle_fps
+        self.wake_motion = wake_motion
+        self.active = False
+        self.last_face = time.time()
+        self.entries = 0
+        self.idle_seconds = 0.0
+        self._since = None
+
+    def saw_faces(self, now):
+        self.last_face = now
+
+    def should_enter(self, now, busy=False):
+        """True (ed entra in idle) se da idle_after secondi non si vedono volti e niente è in corso."""
+        if self.active or busy or now - self.last_face < self.idle_after:
+            return False
+        self.active = True
+        self.entries += 1
+        self._since = now
+        print(f"💤 Nessun volto da {now - self.last_face:.0f}s: modalità idle ({1.0 / self.period:.0f} fps, solo movimento)")
+        return True
+
+    def should_wake(self, now, motion):
+        """True (ed esce da idle) se il movimento supera la soglia di risveglio."""
+        if not self.active or motion < self.wake_motion:
+            return False
+        self.active = False
+        self.last_face = now  # nuova finestra piena prima di poter tornare in idle
+        spent = now - self._since
+        self.idle_seconds += spent
+        print(f"👀 Movimento rilevato ({motion:.1%} pixel) dopo {spent:.0f}s di idle: detection ripresa")
+        return True
+
+    def stats(self, now=None):
+        idle_seconds = self.idle_seconds
+        if self.active:
+            idle_seconds += (time.time() if now is None else now) - self._since
+        return {"entries": self.entries, "idle_seconds": idle_seconds}
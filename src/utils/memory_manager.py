@@ -1,10 +1,13 @@
 import os
 import json
-import pickle
 import time
 import datetime
+import threading
 
+from src import config
 from src.config import CONVERSATIONS_DIR, PROFILES_DIR, EMBEDDINGS_FILE
+from src.utils.embedding_store import open_store
+from src.utils.gallery import LiveGallery
 
 '''
 EMB_FILE = "../data/embeddings.pkl"
@@ -15,18 +18,40 @@ os.makedirs(CONV_DIR, exist_ok=True)
 '''
 # ====== GESTIONE VOLTI ======
 
-def save_new_face(name, embedding):
-    """Salva un nuovo volto nel database embeddings.pkl."""
-    if os.path.exists(EMBEDDINGS_FILE):
-        with open(EMBEDDINGS_FILE, "rb") as f:
-            known = pickle.load(f)
-    else:
-        known = {}
+# galleria binaria: se config.py non la indica, accanto al vecchio embeddings.pkl
+GALLERY_FILE = getattr(config, "GALLERY_FILE",
+                       os.path.join(os.path.dirname(EMBEDDINGS_FILE), "gallery.bin"))
+
+_gallery_store = None
+
+def get_gallery_store():
+    """Galleria binaria condivisa (aperta una sola volta, migra embeddings.pkl se serve)."""
+    global _gallery_store
+    if _gallery_store is None:
+        _gallery_store = open_store(GALLERY_FILE, legacy_pickle=EMBEDDINGS_FILE)
+    return _gallery_store
+
+_live_gallery = None
+_live_gallery_lock = threading.Lock()
 
-    known[name] = embedding
-    with open(EMBEDDINGS_FILE, "wb") as f:
-        pickle.dump(known, f)
-    print(f"💾 Nuovo volto salvato come '{name}' in embeddings.pkl")
+def get_live_gallery():
+    """Galleria in memoria condivisa tra main loop e interazioni (hot-reload)."""
+    global _live_gallery
+    with _live_gallery_lock:
+        if _live_gallery is None:
+            _live_gallery = LiveGallery(get_gallery_store())
+    return _live_gallery
+
+def save_new_face(name, embedding):
+    """
+    Aggiunge un nuovo volto alla galleria (append O(1), visibile subito al
+    matching). Ritorna False se era un duplicato di un prototipo esistente.
+    """
+    if not get_live_gallery().enroll(name, embedding):
+        print(f"♻️ Volto di '{name}' già presente in galleria: nessun nuovo prototipo salvato")
+        return False
+    print(f"💾 Nuovo volto salvato come '{name}' in {os.path.basename(GALLERY_FILE)}")
+    return True
 
 
 # ====== GESTIONE CONVERSAZIONI ======
@@ -0,0 +1,241 @@
+# src/utils/mic_stream.py
+# ==========================================
+# 🎙️ MICROFONO SEMPRE APERTO + RING BUFFER
+# ==========================================
+# La ricerca del device (find_working_mic) apre e legge ogni ingresso a
+# ogni combinazione rate/canali: si fa una volta sola e il risultato resta
+# in cache, ripetendo la ricerca solo se il device smette di funzionare.
+# Un unico stream PyAudio resta aperto per tutta la sessione e un thread
+# ne copia i chunk in un ring buffer: ogni turno di ascolto legge da lì,
+# partendo MIC_PREROLL secondi prima della sua apertura, così la prima
+# sillaba non viene tagliata e non si paga l'apertura dello stream.
+import threading
+import time
+from collections import deque
+
+import pyaudio
+
+MIC_CHUNK = 1024              # frame per lettura (~64 ms a 16 kHz)
+MIC_BUFFER_SECONDS = 30.0     # audio conservato nel ring
+MIC_PREROLL = 0.4             # secondi prima dell'inizio del turno inclusi nella lettura
+MAX_READ_ERRORS = 5           # errori di lettura consecutivi prima di riaprire il device
+REPROBE_INTERVAL = 2.0        # attesa tra due ricerche quando non c'è nessun microfono
+
+_probe_cache = None
+_probe_lock = threading.Lock()
+_mic_stream = None
+_mic_lock = threading.Lock()
+
+
+def find_working_mic(trials_rates=(16000, 48000), trials_channels=(1, 2), timeout=1.0):
+    """
+    Prova a trovare automaticamente un device audio apribile.
+    Ritorna (device_index, rate, channels) o (None, None, None).
+    """
+    p = pyaudio.PyAudio()
+    for i in range(p.get_device_count()):
+        info = p.get_device_info_by_index(i)
+        if info["maxInputChannels"] <= 0:
+            continue
+        for rate in trials_rates:
+            for ch in trials_channels:
+                try:
+                    stream = p.open(format=pyaudio.paInt16,
+                                    channels=ch,
+                                    rate=rate,
+                                    input=True,
+                                    input_device_index=i,
+                                    frames_per_buffer=1024)
+                    # prova a leggere un piccolo chunk
+                    try:
+                        data = stream.read(1024, exception_on_overflow=False)
+                        if data and len(data) > 0:
+                            stream.stop_stream()
+                            stream.close()
+                            p.terminate()
+                            return i, rate, ch
+                    except Exception:
+                        # non valido per questa combinazione
+                        stream.stop_stream()
+                        stream.close()
+                except Exception:
+                    pass
+    p.terminate()
+    return None, None, None
+
+
+def cached_mic(refresh=False):
+    """(device_index, rate, channels) dell'ultima ricerca; `refresh` la ripete."""
+    global _probe_cache
+    with _probe_lock:
+        if _probe_cache is None or refresh:
+            t0 = time.perf_counter()
+            _probe_cache = find_working_mic()
+            idx, rate, ch = _probe_cache
+            if idx is not None:
+                print(f"🎙️ [MIC] Device index={idx} ({ch} ch @ {rate}Hz) "
+                      f"trovato in {(time.perf_counter() - t0) * 1000:.0f} ms")
+        return _probe_cache
+
+
+class MicStream:
+    """
+    Stream di ingresso a lunga durata. Il thread di cattura non si blocca
+    mai sui lettori: i chunk finiscono in un ring numerato e ogni lettore
+    tiene la propria posizione (`mark()` → `read(pos)`).
+    """
+
+    def __init__(self, chunk=MIC_CHUNK, buffer_seconds=MIC_BUFFER_SECONDS):
+        self.chunk = chunk
+        self.buffer_seconds = buffer_seconds
+        self.device = self.rate = self.channels = None
+        self._pa = None
+        self._stream = None
+        self._chunks = deque()
+        self._seq = 0                # numero del prossimo chunk catturato
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self.chunks_read = 0
+        self.reopens = 0
+
+    # --- apertura / chiusura del device ---
+    def _open(self, refresh=False):
+        idx, rate, ch = cached_mic(refresh)
+        if idx is None:
+            return False
+        pa = pyaudio.PyAudio()
+        try:
+            stream = pa.open(format=pyaudio.paInt16,
+                             channels=ch,
+                             rate=rate,
+                             input=True,
+                             input_device_index=idx,
+                             frames_per_buffer=self.chunk)
+        except Exception as e:
+            print(f"⚠️ [MIC] Impossibile aprire stream (index={idx}): {e}")
+            pa.terminate()
+            return False
+        with self._cond:
+            if (rate, ch) != (self.rate, self.channels):
+                self._chunks.clear()  # formato diverso: l'audio precedente non è più interpretabile
+            self._chunks = deque(self._chunks, maxlen=max(1, int(self.buffer_seconds * rate / self.chunk)))
+            self.device, self.rate, self.channels = idx, rate, ch
+        self._pa, self._stream = pa, stream
+        return True
+
+    def _close(self):
+        if self._stream is not None:
+            try:
+                self._stream.stop_stream()
+                self._stream.close()
+            except Exception:
+                pass
+            self._stream = None
+        if self._pa is not None:
+            self._pa.terminate()
+            self._pa = None
+
+    def _reopen(self):
+        """Riapre il device, ripetendo la ricerca se quello in cache non va più."""
+        self._close()
+        self.reopens += 1
+        while not self._stop.is_set():
+            if self._open() or self._open(refresh=True):
+                print(f"🎙️ [MIC] Stream riaperto (index={self.device})")
+                return True
+            self._stop.wait(REPROBE_INTERVAL)
+        return False
+
+    def start(self):
+        """Apre il device e avvia la cattura. False se nessun microfono è utilizzabile."""
+        if self._thread is not None:
+            return True
+        if not (self._open() or self._open(refresh=True)):
+            return False
+        self._thread = threading.Thread(target=self._run, name="mic", daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self):
+        errors = 0
+        while not self._stop.is_set():
+            try:
+                data = self._stream.read(self.chunk, exception_on_overflow=False)
+                errors = 0
+            except Exception as e:
+                errors += 1
+                if errors >= MAX_READ_ERRORS:
+                    print(f"\n⚠️ [MIC] Errore di lettura ripetuto ({e}): riapertura del device...")
+                    if not self._reopen():
+                        break
+                    errors = 0
+                else:
+                    time.sleep(0.01)
+                continue
+            if not data:
+                continue
+            with self._cond:
+                self._chunks.append(data)
+                self._seq += 1
+                self.chunks_read += 1
+                self._cond.notify_all()
+        self._close()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        else:
+            self._close()
+        with self._cond:
+            self._cond.notify_all()
+
+    # --- lettura ---
+    def mark(self, preroll=MIC_PREROLL):
+        """Posizione di partenza di un nuovo turno: `preroll` secondi prima di adesso."""
+        with self._cond:
+            back = int(round(preroll * self.rate / self.chunk)) if self.rate else 0
+            return self._seq - min(back, len(self._chunks))
+
+    def read(self, pos, timeout=1.0):
+        """
+        (posizione successiva, chunk) a partire da `pos`, attendendo al più
+        `timeout` secondi; (pos, None) se non arriva nulla. Un lettore
+        rimasto indietro oltre il ring riparte dal chunk più vecchio.
+        """
+        deadline = time.perf_counter() + timeout
+        with self._cond:
+            while True:
+                oldest = self._seq - len(self._chunks)
+                pos = max(pos, oldest)
+                if pos < self._seq:
+                    return pos + 1, self._chunks[pos - oldest]
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or self._stop.is_set():
+                    return pos, None
+                self._cond.wait(remaining)
+
+    def stats(self):
+        return {"device": self.device, "rate": self.rate, "channels": self.channels,
+                "chunks": self.chunks_read, "reopens": self.reopens}
+
+
+def get_mic_stream():
+    """Stream condiviso, aperto alla prima richiesta; None se non c'è un microfono."""
+    global _mic_stream
+    with _mic_lock:
+        if _mic_stream is None:
+            mic = MicStream()
+            if not mic.start():
+                return None
+            _mic_stream = mic
+        return _mic_stream
+
+
+def close_mic_stream():
+    global _mic_stream
+    with _mic_lock:
+        if _mic_stream is not None:
+            _mic_stream.stop()
+            _mic_stream = None
@@ -0,0 +1,57 @@
+# src/utils/motion.py
+# ==========================================
+# 🌊 MISURA DEL MOVIMENTO TRA FRAME
+# ==========================================
+# Differenza tra frame consecutivi su una miniatura in scala di grigi:
+# costa pochi decimi di millisecondo e serve a decidere quanto spesso
+# far girare la detection (e quando la scena è cambiata del tutto).
+import cv2
+import numpy as np
+
+MOTION_SIZE = (80, 60)         # miniatura (w, h) su cui si confrontano i frame
+MOTION_PIXEL_DELTA = 18        # differenza di grigio oltre cui un pixel "si muove"
+SCENE_CHANGE_FRACTION = 0.45   # frazione di pixel in movimento = cambio di scena
+
+
+class MotionMeter:
+    """
+    `update(frame_bgr)` ritorna la frazione di pixel in movimento (0..1)
+    rispetto al frame precedente; `scene_change` indica se l'ultimo
+    aggiornamento ha superato SCENE_CHANGE_FRACTION. I buffer sono
+    preallocati e riusati a ogni frame.
+    """
+
+    def __init__(self, size=MOTION_SIZE, pixel_delta=MOTION_PIXEL_DELTA,
+                 scene_change_fraction=SCENE_CHANGE_FRACTION):
+        self.size = size
+        self.pixel_delta = pixel_delta
+        self.scene_change_fraction = scene_change_fraction
+        w, h = size
+        self._small = np.empty((h, w, 3), dtype=np.uint8)
+        self._gray = np.empty((h, w), dtype=np.uint8)
+        self._prev = np.empty((h, w), dtype=np.uint8)
+        self._diff = np.empty((h, w), dtype=np.uint8)
+        self._has_prev = False
+        self.motion = 0.0
+        self.scene_change = False
+
+    def reset(self):
+        """Il prossimo frame diventa il nuovo riferimento (movimento 0)."""
+        self._has_prev = False
+
+    def update(self, frame_bgr):
+        cv2.resize(frame_bgr, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+
+        if not self._has_prev:
+            self.motion = 0.0
+            self._has_prev = True
+        else:
+            cv2.absdiff(self._gray, self._prev, dst=self._diff)
+            cv2.threshold(self._diff, self.pixel_delta, 255, cv2.THRESH_BINARY, dst=self._diff)
+            moving = cv2.countNonZero(self._diff)
+            self.motion = moving / self._diff.size
+
+        self._prev[...] = self._gray
+        self.scene_change = self.motion >= self.scene_change_fraction
+        return self.motion
@@ -0,0 +1,247 @@
+# src/utils/perception_procs.py
+# ==========================================
+# 🧵 PERCEZIONE MULTI-PROCESSO (DETECTION + EMBEDDING)
+# ==========================================
+# Modalità opzionale di async_core: MTCNN e ResNet girano in due processi
+# separati (niente GIL condiviso con tracking, Vosk e UI). I frame RGB
+# passano da uno SharedFrameRing (solo l'indice dello slot viaggia in coda),
+# i volti 160×160 e i risultati su multiprocessing.Queue. Thread "pompa" nel
+# processo principale collegano queste code a quelle di async_core, così il
+# main loop non cambia.
+#
+# Questo modulo non importa async_core: è quello che i processi figli
+# (avviati con "spawn") caricano.
+import multiprocessing as mp
+import os
+import queue
+import threading
+
+from src.utils.frame_ring import SharedFrameRing, attach_frames, RING_SLOTS, FRAME_SHAPE
+
+# Thread torch per processo: i due worker si dividono i core disponibili
+PROC_TORCH_THREADS = max(2, (os.cpu_count() or 4) // 2)
+PROC_JOIN_TIMEOUT = 5.0
+
+
+# ==========================================================
+# 👷 PROCESSI FIGLI
+# ==========================================================
+
+def _detection_process(shm_name, slots, shape, requests, results, ready, stop, torch_threads, mode):
+    import torch
+    from src.utils.face_models import pick_device, create_mtcnn, warm_up_mtcnn, run_detection
+
+    torch.set_num_threads(torch_threads)
+    device = pick_device()
+    print(f"📸 Detection process avviato (pid {os.getpid()}, {device})...")
+
+    shm, frames = attach_frames(shm_name, slots, shape)
+    mtcnn = create_mtcnn(device)
+    print("🔥 MTCNN warm-up (3 passaggi)...")
+    warm_up_mtcnn(mtcnn, shape)
+    print("✅ MTCNN warm-up completato (process ready).")
+    ready.set()
+
+    try:
+        while not stop.is_set():
+            try:
+                fid, index, rois = requests.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                # lettura diretta dalla memoria condivisa: lo slot resta
+                # riservato finché il processo principale non riceve il risultato
+                detections = run_detection(mtcnn, frames[index], mode, rois) or None
+            except Exception as e:
+                print(f"[DETECT] Errore su frame {fid}: {e}")
+                detections = None
+            results.put((fid, detections))
+    finally:
+        del frames
+        shm.close()
+
+
+def _embedding_process(requests, results, ready, stop, torch_threads, max_batch, max_wait):
+    import torch
+    from src.utils.face_models import pick_device, FaceEmbedder, collect_batch
+
+    torch.set_num_threads(torch_threads)
+    device = pick_device()
+    print(f"🧬 Embedding process avviato (pid {os.getpid()}, {device})...")
+
+    embedder = FaceEmbedder(device, max_batch)
+    print("🔥 Embedding process warm-up...")
+    embedder.warm_up()
+    print("✅ Embedding process pronto.")
+    ready.set()
+
+    while not stop.is_set():
+        try:
+            batch = collect_batch(requests, max_batch, max_wait)
+        except queue.Empty:
+            continue
+        face_ids = [face_id for face_id, _ in batch]
+        faces = [face for _, face in batch]
+        try:
+            embs = embedder.embed(faces)
+            # un messaggio per batch, con le statistiche aggiornate del worker
+            results.put((face_ids, embs, embedder.raw_stats()))
+        except Exception as e:
+            print(f"[EMBED] Errore: {e}")
+
+
+# ==========================================================
+# 🔌 LATO PROCESSO PRINCIPALE
+# ==========================================================
+
+class ProcessPerception:
+    """
+    Avvia i due processi e li collega alle code thread di async_core.
+    `frame_ring` è lo SharedFrameRing su cui il main loop deve scrivere.
+    """
+
+    def __init__(self, embed_max_batch, embed_max_wait, detection_mode="full",
+                 ring_slots=RING_SLOTS, frame_shape=FRAME_SHAPE):
+        ctx = mp.get_context("spawn")  # CUDA e torch non sopravvivono a fork
+        self.frame_ring = SharedFrameRing(ring_slots, frame_shape)
+        self._detect_in = ctx.Queue(maxsize=2)
+        self._detect_out = ctx.Queue(maxsize=4)
+        self._embed_in = ctx.Queue(maxsize=16)
+        self._embed_out = ctx.Queue(maxsize=32)
+        self._detect_ready = ctx.Event()
+        self._embed_ready = ctx.Event()
+        self._stop = ctx.Event()
+        self._in_flight = {}       # frame id → slot riservato al detection process
+        self._in_flight_lock = threading.Lock()
+        self._embed_stats = None   # ultime statistiche inviate dal processo embedding
+        self._stopped = False
+        self._stop_lock = threading.Lock()
+
+        self._procs = [
+            ctx.Process(
+                target=_detection_process, name="perception-detect", daemon=True,
+                args=(self.frame_ring.name, ring_slots, frame_shape,
+                      self._detect_in, self._detect_out, self._detect_ready,
+                      self._stop, PROC_TORCH_THREADS, detection_mode),
+            ),
+            ctx.Process(
+                target=_embedding_process, name="perception-embed", daemon=True,
+                args=(self._embed_in, self._embed_out, self._embed_ready,
+                      self._stop, PROC_TORCH_THREADS, embed_max_batch, embed_max_wait),
+            ),
+        ]
+
+    def start(self, detect_request_q, detect_result_q, embed_request_q, embed_result_q,
+              worker_ready_event, embedding_ready_event, exit_event):
+        """Avvia processi e thread pompa; gli eventi thread rispecchiano quelli dei processi."""
+        self._exit_event = exit_event
+        for proc in self._procs:
+            proc.start()
+
+        pumps = [
+            (self._forward_frames, (detect_request_q,)),
+            (self._collect_detections, (detect_result_q,)),
+            (self._forward_faces, (embed_request_q,)),
+            (self._collect_embeddings, (embed_result_q,)),
+            (self._supervise, (worker_ready_event, embedding_ready_event)),
+        ]
+        for target, args in pumps:
+            threading.Thread(target=target, args=args, daemon=True).start()
+
+    def embed_stats(self):
+        return self._embed_stats
+
+    # --- pompe ---
+
+    def _forward_frames(self, detect_request_q):
+        while not self._exit_event.is_set():
+            try:
+                fid, slot, rois = detect_request_q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if slot.ring is not self.frame_ring:
+                # un frame fuori dalla memoria condivisa non è leggibile dal processo
+                print("[DETECT] Frame ignorato: usare get_frame_ring() in modalità process")
+                slot.release()
+                detect_request_q.task_done()
+                continue
+            with self._in_flight_lock:
+                self._in_flight[fid] = slot
+            self._detect_in.put((fid, slot.index, rois))
+            detect_request_q.task_done()
+
+    def _collect_detections(self, detect_result_q):
+        while not self._exit_event.is_set():
+            try:
+                fid, detections = self._detect_out.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            with self._in_flight_lock:
+                slot = self._in_flight.pop(fid, None)
+            if slot is not None:
+                slot.release()
+            detect_result_q.put((fid, detections))
+
+    def _forward_faces(self, embed_request_q):
+        while not self._exit_event.is_set():
+            try:
+                request = embed_request_q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            self._embed_in.put(request)
+            embed_request_q.task_done()
+
+    def _collect_embeddings(self, embed_result_q):
+        while not self._exit_event.is_set():
+            try:
+                face_ids, embs, stats = self._embed_out.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            self._embed_stats = stats
+            # risultati instradati al tracker di origine, uno per richiesta
+            for i, face_id in enumerate(face_ids):
+                embed_result_q.put((face_id, embs[i:i + 1]))
+
+    def _supervise(self, worker_ready_event, embedding_ready_event):
+        """
+        Rispecchia il warm-up dei processi e, su uscita o crash, segnala lo
+        stop ai processi. La memoria condivisa la libera solo stop(),
+        chiamato da stop_workers() quando il main loop non usa più il ring.
+        """
+        pairs = [(self._detect_ready, worker_ready_event), (self._embed_ready, embedding_ready_event)]
+        while not self._exit_event.wait(0.2):
+            for proc_event, thread_event in pairs:
+                if proc_event.is_set() and not thread_event.is_set():
+                    thread_event.set()
+            dead = [p.name for p in self._procs if not p.is_alive()]
+            if dead:
+                print(f"❌ Processo di percezione terminato: {', '.join(dead)}")
+                # sblocca chi attende il warm-up, poi chiude l'applicazione
+                worker_ready_event.set()
+                embedding_ready_event.set()
+                self._exit_event.set()
+        self._stop.set()
+
+    def stop(self):
+        """Ferma i processi e libera la memoria condivisa (idempotente)."""
+        with self._stop_lock:
+            if self._stopped:
+                return
+            self._stopped = True
+        self._stop.set()
+        for proc in self._procs:
+            if proc.pid is None:
+                continue
+            proc.join(PROC_JOIN_TIMEOUT)
+            if proc.is_alive():
+                proc.terminate()
+                proc.join(PROC_JOIN_TIMEOUT)
+        with self._in_flight_lock:
+            for slot in self._in_flight.values():
+                slot.release()
+            self._in_flight.clear()
+        for q in (self._detect_in, self._detect_out, self._embed_in, self._embed_out):
+            q.cancel_join_thread()
+            q.close()
+        self.frame_ring.close()
+        print("🧵 Processi di percezione chiusi")
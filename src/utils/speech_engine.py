@@ -0,0 +1,138 @@
+# src/utils/speech_engine.py
+# ==========================================
+# 🧠 MOTORE VOSK CONDIVISO (CARICAMENTO LAZY + POOL DI RECOGNIZER)
+# ==========================================
+# Il modello italiano pesa centinaia di MB: non viene più caricato
+# all'import di speech_utils ma alla prima richiesta, oppure in un thread
+# in background (`preload()`) mentre i modelli di visione fanno warm-up.
+# I KaldiRecognizer vengono riusati tra un enunciato e l'altro (Reset)
+# invece di essere ricostruiti a ogni turno.
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from vosk import Model, KaldiRecognizer
+
+RECOGNIZER_POOL_SIZE = 2    # recognizer pronti tenuti per ogni sample rate
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def _rss_mb():
+    """Memoria residente del processo in MB (None se non misurabile)."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2**20
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return None
+
+
+class SpeechEngine:
+    """
+    Modello Vosk caricato una volta sola (thread-safe) e pool di
+    recognizer. `acquire(rate)` / `release(rec)` oppure il context manager
+    `recognizer(rate)`.
+    """
+
+    def __init__(self, model_path, pool_size=RECOGNIZER_POOL_SIZE):
+        self.model_path = str(model_path)
+        self.pool_size = pool_size
+        self._model = None
+        self._error = None
+        self._lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._loader = None
+        self._pool = {}              # rate → deque di recognizer liberi
+        self._pool_lock = threading.Lock()
+        self.load_seconds = None
+        self.load_mb = None
+        self.created = 0
+        self.reused = 0
+
+    def _load(self):
+        with self._lock:
+            if self._model is not None:
+                return
+            print(f"🧠 [STT] Caricamento modello Vosk da {self.model_path}...")
+            rss0 = _rss_mb()
+            t0 = time.perf_counter()
+            try:
+                self._model = Model(self.model_path)
+            except Exception as e:
+                self._error = e
+                print(f"⚠️ [STT] Errore caricamento modello Vosk: {e}")
+                return
+            finally:
+                self._loaded.set()
+            self.load_seconds = time.perf_counter() - t0
+            rss1 = _rss_mb()
+            self.load_mb = rss1 - rss0 if rss0 is not None and rss1 is not None else None
+            mem = f", +{self.load_mb:.0f} MB" if self.load_mb is not None else ""
+            print(f"✅ [STT] Modello Vosk pronto in {self.load_seconds:.1f}s{mem}")
+
+    def preload(self):
+        """Carica il modello in un thread in background (idempotente)."""
+        with self._pool_lock:
+            if self._loader is None and self._model is None:
+                self._loader = threading.Thread(target=self._load, name="vosk-load", daemon=True)
+                self._loader.start()
+        return self
+
+    @property
+    def model(self):
+        """Il modello, caricandolo ora (o attendendo il caricamento in corso)."""
+        if self._model is None:
+            if self._loader is not None:
+                self._loaded.wait()
+            else:
+                self._load()
+        if self._model is None:
+            raise RuntimeError(f"modello Vosk non disponibile: {self._error}")
+        return self._model
+
+    def acquire(self, rate=16000):
+        with self._pool_lock:
+            free = self._pool.get(rate)
+            if free:
+                self.reused += 1
+                return free.pop()
+        rec = KaldiRecognizer(self.model, rate)
+        with self._pool_lock:
+            self.created += 1
+        return rec
+
+    def release(self, rec, rate=16000):
+        """Rimette il recognizer nel pool, azzerato per il prossimo enunciato."""
+        try:
+            rec.Reset()
+        except Exception:
+            return  # stato incerto: meglio lasciarlo al garbage collector
+        with self._pool_lock:
+            free = self._pool.setdefault(rate, deque())
+            if len(free) < self.pool_size:
+                free.append(rec)
+
+    @contextmanager
+    def recognizer(self, rate=16000):
+        rec = self.acquire(rate)
+        try:
+            yield rec
+        finally:
+            self.release(rec, rate)
+
+    def stats(self):
+        return {
+            "loaded": self._model is not None,
+            "load_seconds": self.load_seconds,
+            "load_mb": self.load_mb,
+            "created": self.created,
+            "reused": self.reused,
+        }
@@ -0,0 +1,227 @@
+# src/utils/speech_service.py
+# ==========================================
+# 🎧 SERVIZIO VOCALE IN UN PROCESSO SEPARATO
+# ==========================================
+# Modalità opzionale: microfono, VAD e decodifica Vosk girano in un
+# processo figlio (avviato con "spawn") che non condivide il GIL con
+# MTCNN, ResNet e i tracker. Il processo principale comunica su due code:
+#   richieste  ("listen", id, kwargs) | ("cancel", id) | ("stop",)
+#   risposte   ("ready", stats) | ("partial", id, testo) | ("result", id, testo, stats)
+# `listen(...)` ha la stessa firma di transcribe_audio e sceglie da sé tra
+# servizio (se avviato e vivo) e ascolto nel processo corrente.
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+SERVICE_JOIN_TIMEOUT = 5.0
+
+_service = None
+
+
+# ==========================================================
+# 👷 PROCESSO FIGLIO
+# ==========================================================
+
+def _speech_process(requests, results, stop):
+    from src.utils.speech_utils import transcribe_audio, get_speech_engine
+    from src.utils.mic_stream import get_mic_stream, close_mic_stream
+
+    print(f"🎧 Speech process avviato (pid {os.getpid()})...")
+    engine = get_speech_engine()
+    try:
+        engine.model  # caricamento subito, non al primo turno
+    except RuntimeError as e:
+        print(f"⚠️ [STT] {e}")
+    if get_mic_stream() is None:
+        print("⚠️ [MIC] Nessun microfono disponibile nel processo vocale.")
+    results.put(("ready", engine.stats()))
+
+    # un thread legge le richieste, così un "cancel" arriva anche durante l'ascolto
+    pending = queue.Queue()
+    current = {"id": None, "cancel": threading.Event()}
+    current_lock = threading.Lock()
+
+    def _read_requests():
+        while not stop.is_set():
+            try:
+                msg = requests.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if msg[0] == "listen":
+                pending.put(msg)
+            elif msg[0] == "cancel":
+                with current_lock:
+                    if current["id"] == msg[1]:
+                        current["cancel"].set()
+            elif msg[0] == "stop":
+                break
+        stop.set()
+        with current_lock:
+            current["cancel"].set()
+
+    threading.Thread(target=_read_requests, daemon=True).start()
+
+    try:
+        while not stop.is_set():
+            try:
+                _, req_id, kwargs = pending.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            cancel = threading.Event()
+            with current_lock:
+                current["id"], current["cancel"] = req_id, cancel
+            try:
+                text = transcribe_audio(
+                    on_partial=lambda t: results.put(("partial", req_id, t)),
+                    cancel=cancel, **kwargs)
+            except Exception as e:
+                print(f"⚠️ [STT] Errore nel processo vocale: {e}")
+                text = ""
+            with current_lock:
+                current["id"] = None
+            results.put(("result", req_id, text, engine.stats()))
+    finally:
+        close_mic_stream()
+
+
+# ==========================================================
+# 🔌 LATO PROCESSO PRINCIPALE
+# ==========================================================
+
+class SpeechService:
+    """
+    Avvia il processo vocale e ne raccoglie le risposte in un thread.
+    `listen(**kwargs)` → Future col testo; `cancel(future)` interrompe
+    l'ascolto in corso (il Future si risolve con "").
+    """
+
+    def __init__(self):
+        ctx = mp.get_context("spawn")
+        self._requests = ctx.Queue()
+        self._results = ctx.Queue()
+        self._stop = ctx.Event()
+        self.ready = threading.Event()
+        self._ids = itertools.count(1)
+        self._futures = {}           # id → (Future, on_partial)
+        self._lock = threading.Lock()
+        self._engine_stats = None    # ultime statistiche del motore Vosk nel figlio
+        self._stopped = False
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._proc = ctx.Process(target=_speech_process, name="speech",
+                                 args=(self._requests, self._results, self._stop), daemon=True)
+
+    def start(self):
+        self._proc.start()
+        self._collector.start()
+        return self
+
+    def alive(self):
+        return not self._stopped and self._proc.is_alive()
+
+    def engine_stats(self):
+        return self._engine_stats
+
+    def listen(self, on_partial=None, **kwargs):
+        future = Future()
+        req_id = next(self._ids)
+        future.req_id = req_id
+        with self._lock:
+            self._futures[req_id] = (future, on_partial)
+        self._requests.put(("listen", req_id, kwargs))
+        return future
+
+    def cancel(self, future):
+        self._requests.put(("cancel", future.req_id))
+
+    def _resolve_all(self, text=""):
+        with self._lock:
+            futures, self._futures = self._futures, {}
+        for future, _ in futures.values():
+            if not future.done():
+                future.set_result(text)
+
+    def _collect(self):
+        while not self._stopped:
+            try:
+                msg = self._results.get(timeout=0.2)
+            except queue.Empty:
+                if not self._proc.is_alive():
+                    if not self._stop.is_set():
+                        print("❌ Processo vocale terminato: ascolto nel processo principale.")
+                    self.ready.set()
+                    self._resolve_all()
+                    return
+                continue
+            kind = msg[0]
+            if kind == "ready":
+                self._engine_stats = msg[1]
+                print("✅ Processo vocale pronto.")
+                self.ready.set()
+            elif kind == "partial":
+                with self._lock:
+                    entry = self._futures.get(msg[1])
+                if entry is not None and entry[1] is not None:
+                    entry[1](msg[2])
+            elif kind == "result":
+                _, req_id, text, self._engine_stats = msg
+                with self._lock:
+                    entry = self._futures.pop(req_id, None)
+                if entry is not None:
+                    entry[0].set_result(text)
+
+    def stop(self):
+        """Annulla l'ascolto in corso e chiude il processo (idempotente)."""
+        if self._stopped:
+            return
+        self._requests.put(("stop",))
+        self._stop.set()
+        if self._proc.pid is not None:
+            self._proc.join(SERVICE_JOIN_TIMEOUT)
+            if self._proc.is_alive():
+                self._proc.terminate()
+                self._proc.join(SERVICE_JOIN_TIMEOUT)
+        self._stopped = True
+        self._collector.join(timeout=1.0)
+        self._resolve_all()
+        for q in (self._requests, self._results):
+            q.cancel_join_thread()
+            q.close()
+        print("🎧 Processo vocale chiuso")
+
+
+def start_speech_service():
+    """Avvia il servizio vocale (una sola istanza)."""
+    global _service
+    if _service is None:
+        _service = SpeechService().start()
+    return _service
+
+
+def stop_speech_service():
+    global _service
+    if _service is not None:
+        _service.stop()
+        _service = None
+
+
+def listen(on_partial=None, **kwargs):
+    """
+    Un turno di ascolto, stessi argomenti di transcribe_audio: nel processo
+    vocale se è attivo, altrimenti nel processo corrente.
+    """
+    service = _service
+    if service is not None and service.alive():
+        return service.listen(on_partial=on_partial, **kwargs).result()
+    from src.utils.speech_utils import transcribe_audio
+    return transcribe_audio(on_partial=on_partial, **kwargs)
+
+
+def speech_stats():
+    """Statistiche del motore Vosk, dal processo vocale o da quello corrente."""
+    if _service is not None:
+        return _service.engine_stats()
+    from src.utils.speech_utils import get_speech_engine
+    return get_speech_engine().stats()
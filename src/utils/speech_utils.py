@@ -1,13 +1,30 @@
-import pyaudio
 import audioop
 import time
 import json
 import re
-from vosk import Model, KaldiRecognizer
+import threading
 import pyttsx3
 
+from src.utils.mic_stream import get_mic_stream, find_working_mic  # noqa: F401 (riesportato)
+from src.utils.vad import AdaptiveVAD
+from src.utils.speech_engine import SpeechEngine
 from src.config import VOSK_MODEL_PATH, VOICE_RATE, VOICE_VOLUME, DEFAULT_VOICE_INDEX
-model = Model(str(VOSK_MODEL_PATH))
+from src.config import SILENCE_LIMIT, SILENCE_HANGOVER
+
+STREAMING_STT = True  # 🔧 decodifica durante la cattura (False: tutto l'audio a fine ascolto)
+
+# modello Vosk caricato alla prima richiesta (o in background con preload)
+_speech_engine = None
+_speech_engine_lock = threading.Lock()
+
+
+def get_speech_engine():
+    """SpeechEngine condiviso (il modello non viene caricato finché non serve)."""
+    global _speech_engine
+    with _speech_engine_lock:
+        if _speech_engine is None:
+            _speech_engine = SpeechEngine(VOSK_MODEL_PATH)
+        return _speech_engine
 
 # ================== CONFIGURAZIONE MODELLO VOSK ==================
 # EXTERNAL_MODEL_DIR = r"C:\Users\brain\Documents\Universita\Erasmus\Proggetto\Dati\vosk-model-it-0.22"
@@ -25,52 +42,14 @@ def speak(text):
 # model = Model(EXTERNAL_MODEL_DIR)
 # ==========================================================
 
-def find_working_mic(trials_rates=(16000, 48000), trials_channels=(1, 2), timeout=1.0):
-    """
-    Prova a trovare automaticamente un device audio apribile.
-    Ritorna (device_index, rate, channels) o (None, None, None).
-    """
-    p = pyaudio.PyAudio()
-    candidate = None
-    for i in range(p.get_device_count()):
-        info = p.get_device_info_by_index(i)
-        if info["maxInputChannels"] <= 0:
-            continue
-        name = info["name"]
-        for rate in trials_rates:
-            for ch in trials_channels:
-                try:
-                    stream = p.open(format=pyaudio.paInt16,
-                                    channels=ch,
-                                    rate=rate,
-                                    input=True,
-                                    input_device_index=i,
-                                    frames_per_buffer=1024)
-                    # prova a leggere un piccolo chunk
-                    try:
-                        data = stream.read(1024, exception_on_overflow=False)
-                        if data and len(data) > 0:
-                            stream.stop_stream()
-                            stream.close()
-                            p.terminate()
-                            return i, rate, ch
-                    except Exception:
-                        # non valido per questa combinazione
-                        stream.stop_stream()
-                        stream.close()
-                except Exception:
-                    pass
-    p.terminate()
-    return None, None, None
-
-
-def _to_mono_and_resample(raw_bytes, width, in_channels, in_rate, out_rate=16000):
+def _to_mono_and_resample(raw_bytes, width, in_channels, in_rate, out_rate=16000, state=None):
     """
     Converte raw PCM bytes con 'width' byte/sample e in_channels in:
       - mono
       - sample rate = out_rate
-    Ritorna bytes int16 a out_rate, mono.
-    Usa audioop.tomono e audioop.ratecv (in-place streaming compatible).
+    Ritorna (bytes int16 a out_rate mono, stato di ratecv). Passando lo
+    stato della chiamata precedente si converte un flusso chunk per chunk
+    senza discontinuità ai bordi.
     """
     # se stereo -> tomono (usa metà mix)
     if in_channels == 2:
@@ -90,132 +69,152 @@ def _to_mono_and_resample(raw_bytes, width, in_channels, in_rate, out_rate=16000
     # se bisogno ricampionare
     if in_rate != out_rate:
         try:
-            state = None
-            converted, state = audioop.ratecv(mono, width, 1, in_rate, out_rate, None)
-            return converted
+            converted, state = audioop.ratecv(mono, width, 1, in_rate, out_rate, state)
+            return converted, state
         except Exception:
             # se ratecv fallisce, ritorna input grezzo (Vosk potrebbe comunque produrre qualcosa)
-            return mono
+            return mono, state
     else:
-        return mono
+        return mono, state
+
+
+class StreamingTranscriber:
+    """
+    Riconoscimento Vosk durante la cattura: ogni chunk del microfono viene
+    convertito (mono, 16 kHz, stato di ratecv conservato) e passato subito
+    al recognizer. `on_partial(testo)` riceve il testo provvisorio quando
+    cambia; `finish()` restituisce il testo finale, che a fine parlato
+    richiede solo di svuotare l'ultimo segmento.
+    """
 
-def transcribe_audio(duration=20, stop_on_silence=True, silence_limit=1.5, silence_hangover=2.2):
+    def __init__(self, in_rate, in_channels, on_partial=None, out_rate=16000):
+        self.in_rate = in_rate
+        self.in_channels = in_channels
+        self.out_rate = out_rate
+        self.on_partial = on_partial
+        self.engine = get_speech_engine()
+        self.rec = self.engine.acquire(out_rate)
+        self._state = None
+        self._segments = []
+        self._partial = ""
+        self.decode_seconds = 0.0   # tempo speso in Vosk durante l'ascolto
+
+    def feed(self, data):
+        t0 = time.perf_counter()
+        pcm, self._state = _to_mono_and_resample(data, 2, self.in_channels, self.in_rate,
+                                                 self.out_rate, self._state)
+        if self.rec.AcceptWaveform(pcm):
+            text = json.loads(self.rec.Result()).get("text", "")
+            if text:
+                self._segments.append(text)
+            self._notify("")
+        elif self.on_partial is not None:
+            self._notify(json.loads(self.rec.PartialResult()).get("partial", ""))
+        self.decode_seconds += time.perf_counter() - t0
+
+    def _notify(self, partial):
+        if self.on_partial is None or partial == self._partial:
+            return
+        self._partial = partial
+        self.on_partial(" ".join(self._segments + [partial]).strip())
+
+    def finish(self):
+        """Testo completo dell'enunciato (chiude l'ultimo segmento)."""
+        text = json.loads(self.rec.FinalResult()).get("text", "")
+        if text:
+            self._segments.append(text)
+        return " ".join(self._segments).strip()
+
+    def close(self):
+        """Restituisce il recognizer al pool del motore (idempotente)."""
+        if self.rec is not None:
+            self.engine.release(self.rec, self.out_rate)
+            self.rec = None
+
+def transcribe_audio(duration=20, stop_on_silence=True, silence_limit=SILENCE_LIMIT,
+                     silence_hangover=SILENCE_HANGOVER, on_partial=None, streaming=STREAMING_STT,
+                     cancel=None):
     """
     Registrazione robusta:
      - durata massima `duration` secondi
-     - se stop_on_silence=True aspetta silence_hangover secondi DI SILENZIO DOPO L'ULTIMO PARLATO rilevato
+     - se nessuno inizia a parlare entro `silence_limit` secondi il turno finisce vuoto
+     - se stop_on_silence=True l'enunciato si chiude dopo silence_hangover secondi di silenzio (VAD adattivo)
+     - streaming=True: decodifica mentre l'utente parla, `on_partial(testo)` riceve i risultati provvisori
+     - `cancel` (threading.Event) interrompe l'ascolto: il turno ritorna ""
      - ritorna stringa trascritta
     """
-    dev_idx, dev_rate, dev_ch = find_working_mic()
-    if dev_idx is None:
+    # stream condiviso e sempre aperto: niente ricerca del device né apertura a ogni turno
+    mic = get_mic_stream()
+    if mic is None:
         print("❌ [MIC] Nessun microfono accessibile trovato.")
         return ""
 
-    RATE = dev_rate
-    CHANNELS = dev_ch
-    MIC_INDEX = dev_idx
-    CHUNK = 2048
-    FORMAT = pyaudio.paInt16
+    RATE = mic.rate
+    CHANNELS = mic.channels
+    pos = mic.mark()  # include un breve pre-roll prima dell'inizio del turno
 
-    #print(f"🎙️ [MIC] Apertura microfono index={MIC_INDEX} ({CHANNELS} ch @ {RATE}Hz)")
-    p = pyaudio.PyAudio()
     try:
-        stream = p.open(format=FORMAT,
-                        channels=CHANNELS,
-                        rate=RATE,
-                        input=True,
-                        input_device_index=MIC_INDEX,
-                        frames_per_buffer=CHUNK)
+        transcriber = StreamingTranscriber(RATE, CHANNELS, on_partial)
     except Exception as e:
-        print(f"⚠️ [MIC] Impossibile aprire stream (index={MIC_INDEX}): {e}")
-        p.terminate()
+        print(f"⚠️ [STT] Errore Vosk: {e}")
         return ""
 
+    # il rumore di fondo viene stimato da capo sul pre-roll di ogni turno
+    vad = AdaptiveVAD(RATE, CHANNELS, end_pad=silence_hangover)
     frames = []
-    silent_chunks = 0
-    last_voice_time = None
-    speech_detected = False
     start_time = time.time()
     #print("🎙️ In ascolto... (parla ora)")
 
+    # il recognizer torna al pool su ogni uscita, anche se Vosk fallisce a metà frase
     try:
         while True:
-            try:
-                data = stream.read(CHUNK, exception_on_overflow=False)
-            except Exception as e:
-                # Read error: riprova brevemente
-                time.sleep(0.01)
+            if cancel is not None and cancel.is_set():
+                print("\n🛑 [MIC] Ascolto annullato.")
+                return ""
+
+            pos, data = mic.read(pos, timeout=0.5)
+            if data is None:
+                # nessun chunk (device in riapertura): rispetta comunque la durata massima
+                if time.time() - start_time > duration:
+                    print("\n⏱️ [MIC] Tempo massimo raggiunto, fine ascolto.")
+                    break
                 continue
 
-            if not data:
-                break
-
-            frames.append(data)
-            try:
-                rms = audioop.rms(data, 2)
-            except Exception:
-                rms = 0
+            # solo l'audio dell'enunciato (con il padding del VAD) arriva al riconoscimento
+            for chunk in vad.process(data):
+                if streaming:
+                    transcriber.feed(chunk)
+                else:
+                    frames.append(chunk)
 
             # debug minimale
-            print(f"[MIC] RMS={rms}", end="\r")
-
-            # rilevazione parlato minima
-            if rms > 80:   # valore empirico: abbassalo o alzalo se necessario
-                speech_detected = True
-                last_voice_time = time.time()
-                silent_chunks = 0
-            else:
-                # se abbiamo già avuto parlato, contiamo il silenzio come hangover
-                if speech_detected:
-                    # se sono passati silence_hangover secondi dall'ultimo parlato -> stop
-                    if last_voice_time and (time.time() - last_voice_time) > silence_hangover:
-                        print("\n🔇 [MIC] Silence hangover rilevato, chiusura microfono.")
-                        break
-                else:
-                    # se non abbiamo ancora sentito nulla e siamo oltre il limite, stop per timeout
-                    if time.time() - start_time > duration:
-                        print("\n⏱️ [MIC] Tempo massimo raggiunto, chiusura microfono.")
-                        break
+            print(f"[MIC] RMS={vad.last_rms:.0f} (rumore {vad.noise_floor:.0f})", end="\r")
 
-            # stop globale max duration
-            if time.time() - start_time > duration:
-                print("\n⏱️ [MIC] Tempo massimo raggiunto, chiusura microfono.")
+            if vad.event == "end" and stop_on_silence:
+                print("\n🔇 [MIC] Fine del parlato rilevata, fine ascolto.")
                 break
 
-    finally:
-        try:
-            stream.stop_stream()
-            stream.close()
-        except Exception:
-            pass
-        p.terminate()
-
-    #print("\n✅ [MIC] Microfono chiuso. Elaborazione...")
+            if not vad.triggered and time.time() - start_time > silence_limit:
+                print(f"\n🤫 [MIC] Nessun parlato entro {silence_limit:.1f}s, fine ascolto.")
+                break
 
-    raw = b"".join(frames)
-    try:
-        mono16 = _to_mono_and_resample(raw, 2, CHANNELS, RATE, out_rate=16000)
-    except Exception as e:
-        print(f"⚠️ [MIC] Errore conversione audio: {e}")
-        mono16 = raw
+            # stop globale max duration
+            if time.time() - start_time > duration:
+                print("\n⏱️ [MIC] Tempo massimo raggiunto, fine ascolto.")
+                break
 
-    # trascrizione (streaming)
-    try:
-        rec = KaldiRecognizer(model, 16000)
-        offset = 0
-        step = 4000
-        text = ""
-        while offset < len(mono16):
-            chunk = mono16[offset:offset + step]
-            if rec.AcceptWaveform(chunk):
-                res = json.loads(rec.Result())
-                text += " " + res.get("text", "")
-            offset += step
-        text += " " + json.loads(rec.FinalResult()).get("text", "")
-        text = text.strip()
+        # trascrizione: in streaming resta solo da chiudere l'ultimo segmento
+        t_end = time.perf_counter()
+        for data in frames:
+            transcriber.feed(data)
+        text = transcriber.finish()
     except Exception as e:
-        print(f"⚠️ [STT] Errore Vosk: {e}")
-        text = ""
+        print(f"\n⚠️ [STT] Errore Vosk: {e}")
+        return ""
+    finally:
+        transcriber.close()
+    print(f"⚡ [STT] Testo pronto {(time.perf_counter() - t_end) * 1000:.0f} ms dopo la fine dell'ascolto "
+          f"({transcriber.decode_seconds:.2f}s di decodifica totale)")
 
     #print(f'🗣️ [STT] Hai detto: "{text}"')
     return text
@@ -0,0 +1,217 @@
+# src/utils/trackers.py
+# ==========================================
+# 🎯 TRACKER DEI VOLTI CON BACKEND INTERCAMBIABILI
+# ==========================================
+# Tutti i backend espongono la stessa interfaccia a box (x, y, w, h):
+#   init(frame, box)  → (ri)aggancia il tracker a una detection
+#   update(frame)     → (ok, box) per il frame corrente
+# TrackerSet li gestisce insieme, con un solo update per tracker per frame
+# e il costo medio di ogni update.
+import time
+
+import cv2
+import numpy as np
+
+TRACKER_BACKENDS = ("csrt", "kcf", "mosse", "kalman")
+KALMAN_MAX_COAST = 10    # frame di sola predizione prima che un tracker Kalman si dichiari perso
+
+
+class OpenCVTrack:
+    """Tracker visuale OpenCV (CSRT, KCF, MOSSE), moduli legacy o nuovi."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self._create = _opencv_factory(kind)
+        self._tracker = None
+
+    def init(self, frame, box):
+        # i tracker OpenCV non si ri-inizializzano in place: se ne crea uno nuovo
+        self._tracker = self._create()
+        self._tracker.init(frame, tuple(int(v) for v in box))
+
+    def update(self, frame):
+        ok, box = self._tracker.update(frame)
+        if not ok or box is None:
+            return False, None
+        return True, tuple(int(v) for v in box)
+
+
+class KalmanTrack:
+    """
+    Tracker "solo detection": nessuna analisi dell'immagine, la box è
+    predetta da un filtro di Kalman a velocità costante su (cx, cy, w, h) e
+    corretta a ogni detection associata. Quasi gratuito per frame; affidabile
+    finché la detection gira abbastanza spesso.
+    """
+
+    # matrici condivise: stato [cx, cy, w, h, vcx, vcy, vw, vh], misura [cx, cy, w, h]
+    F = np.eye(8)
+    F[:4, 4:] = np.eye(4)
+    H = np.eye(4, 8)
+    Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.5, 0.5, 0.25, 0.25])
+    R = np.diag([4.0, 4.0, 9.0, 9.0])
+
+    def __init__(self, max_coast=KALMAN_MAX_COAST):
+        self.max_coast = max_coast
+        self.x = None
+        self.P = None
+        self.coasting = 0          # frame trascorsi dall'ultima correzione
+
+    def init(self, frame, box):
+        z = _box_to_center(box)
+        if self.x is None:
+            self.x = np.concatenate([z, np.zeros(4)])
+            self.P = np.diag([10.0, 10.0, 10.0, 10.0, 100.0, 100.0, 100.0, 100.0])
+        else:
+            # correzione con la detection associata
+            y = z - self.H @ self.x
+            S = self.H @ self.P @ self.H.T + self.R
+            K = self.P @ self.H.T @ np.linalg.inv(S)
+            self.x = self.x + K @ y
+            self.P = (np.eye(8) - K @ self.H) @ self.P
+        self.coasting = 0
+
+    def update(self, frame):
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + self.Q
+        self.coasting += 1
+        cx, cy, w, h = self.x[:4]
+        if self.coasting > self.max_coast or w <= 0 or h <= 0:
+            return False, None
+        return True, (int(cx - w / 2), int(cy - h / 2), int(w), int(h))
+
+
+def create_track(backend):
+    """Nuovo tracker (non ancora inizializzato) per uno dei TRACKER_BACKENDS."""
+    if backend == "kalman":
+        return KalmanTrack()
+    if backend in TRACKER_BACKENDS:
+        return OpenCVTrack(backend.upper())
+    raise ValueError(f"Tracker sconosciuto: {backend!r} (attesi: {TRACKER_BACKENDS})")
+
+
+class TrackerSet:
+    """
+    Tracker attivi per id ("t0", "t1", ...), con box e contatori di frame
+    persi. `update(frame_id, frame)` aggiorna ogni tracker esattamente una
+    volta per frame: chiamate ripetute sullo stesso frame non fanno nulla.
+    """
+
+    def __init__(self, backend="csrt", max_lost=15, max_missed=2):
+        create_track(backend)  # valida subito il backend
+        self.backend = backend
+        self.max_lost = max_lost
+        self.max_missed = max_missed
+        self.tracks = {}        # id → tracker
+        self.boxes = {}         # id → (x, y, w, h) ultima box nota
+        self.lost = {}          # id → frame consecutivi senza box valida
+        self.missed = {}        # id → detection consecutive che non hanno confermato il tracker
+        self._next_id = 0
+        self._last_frame = None
+        self.updates = 0        # update eseguiti
+        self.update_ms = 0.0    # tempo totale degli update
+        self.frames = 0         # frame in cui almeno un tracker è stato aggiornato
+        self.max_frame_ms = 0.0
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def __contains__(self, tid):
+        return tid in self.tracks
+
+    def add(self, frame, box):
+        """Nuovo tracker agganciato a `box`; ritorna il suo id."""
+        tid = f"t{self._next_id}"
+        self._next_id += 1
+        track = create_track(self.backend)
+        track.init(frame, box)
+        self.tracks[tid] = track
+        self.boxes[tid] = tuple(box)
+        self.lost[tid] = 0
+        self.missed[tid] = 0
+        return tid
+
+    def correct(self, tid, frame, box):
+        """Riaggancia un tracker esistente alla detection associata."""
+        self.tracks[tid].init(frame, box)
+        self.boxes[tid] = tuple(box)
+        self.lost[tid] = 0
+        self.missed[tid] = 0
+
+    def miss(self, tid):
+        """
+        Il tracker non è stato confermato da una detection che lo copriva.
+        Ritorna True (e lo rimuove) dopo più di max_missed mancate conferme
+        consecutive: un volto di profilo per un passaggio non cambia id.
+        """
+        self.missed[tid] += 1
+        if self.missed[tid] > self.max_missed:
+            self.remove(tid)
+            return True
+        return False
+
+    def remove(self, tid):
+        self.tracks.pop(tid, None)
+        self.boxes.pop(tid, None)
+        self.lost.pop(tid, None)
+        self.missed.pop(tid, None)
+
+    def update(self, frame_id, frame):
+        """
+        Un update per tracker sul frame `frame_id`. Aggiorna box e contatori
+        e rimuove i tracker persi da più di max_lost frame; ritorna gli id rimossi.
+        """
+        if frame_id == self._last_frame:
+            return []
+        self._last_frame = frame_id
+
+        removed = []
+        t_frame = time.perf_counter()
+        for tid, track in list(self.tracks.items()):
+            t0 = time.perf_counter()
+            ok, box = track.update(frame)
+            self.update_ms += (time.perf_counter() - t0) * 1000.0
+            self.updates += 1
+
+            if ok and box[2] > 0 and box[3] > 0:
+                self.boxes[tid] = box
+                self.lost[tid] = 0
+                continue
+
+            self.lost[tid] += 1
+            if self.lost[tid] > self.max_lost:
+                self.remove(tid)
+                removed.append(tid)
+
+        if self.tracks or removed:
+            frame_ms = (time.perf_counter() - t_frame) * 1000.0
+            self.frames += 1
+            self.max_frame_ms = max(self.max_frame_ms, frame_ms)
+        return removed
+
+    def visible(self):
+        """Id e box dei tracker con una box valida in questo frame."""
+        return [(tid, self.boxes[tid]) for tid in self.tracks if self.lost[tid] == 0]
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "updates": self.updates,
+            "avg_ms_per_update": self.update_ms / max(self.updates, 1),
+            "avg_ms_per_frame": self.update_ms / max(self.frames, 1),
+            "max_ms_per_frame": self.max_frame_ms,
+        }
+
+
+def _box_to_center(box):
+    x, y, w, h = box
+    return np.array([x + w / 2.0, y + h / 2.0, w, h], dtype=np.float64)
+
+
+def _opencv_factory(kind):
+    """Costruttore Tracker<kind>_create dal modulo legacy (se presente) o da cv2."""
+    for module in (getattr(cv2, "legacy", None), cv2):
+        create = getattr(module, f"Tracker{kind}_create", None) if module is not None else None
+        if create is not None:
+            return create
+    raise ValueError(f"Tracker OpenCV {kind} non disponibile in questa build di cv2")
@@ -0,0 +1,158 @@
+# src/utils/vad.py
+# ==========================================
+# 🗣️ VOICE ACTIVITY DETECTION ADATTIVA
+# ==========================================
+# Al posto della soglia fissa RMS > 80: il rumore di fondo viene stimato
+# di continuo (discesa rapida, salita lenta) e il parlato è definito
+# rispetto a quello, con isteresi (soglia di ingresso più alta di quella
+# di uscita) e padding configurabile:
+#   - start_pad: audio prima dell'attacco consegnato insieme al parlato
+#   - end_pad:   silenzio continuo che chiude l'enunciato
+# In una stanza rumorosa la soglia sale con il rumore, quindi la fine del
+# parlato viene comunque rilevata. All'inizio di ogni turno il rumore è
+# stimato da capo sul pre-roll (i primi `seed` secondi), e durante il
+# parlato un'energia piatta per `flat_window` secondi (ventola, rumore
+# stazionario comparso a metà frase) viene inseguita in fretta: la soglia
+# di uscita la supera e l'enunciato si chiude.
+from collections import deque
+
+import numpy as np
+
+VAD_START_RATIO = 3.0      # energia/rumore per considerare iniziato il parlato (~+10 dB)
+VAD_STOP_RATIO = 1.8       # energia/rumore sotto cui il parlato è "in pausa" (isteresi)
+VAD_MIN_RMS = 60.0         # soglia assoluta minima (microfoni molto silenziosi)
+VAD_ATTACK = 0.12          # secondi consecutivi sopra soglia per far partire il parlato
+VAD_START_PAD = 0.3        # secondi di audio prima dell'attacco inclusi nell'enunciato
+VAD_END_PAD = 0.8          # secondi di silenzio che chiudono l'enunciato
+NOISE_ADAPT_DOWN = 0.3     # inseguimento del rumore quando cala (per chunk)
+NOISE_ADAPT_UP = 0.03      # ... quando sale, fuori dal parlato
+NOISE_ADAPT_SPEECH = 0.002 # ... durante il parlato (rumore che cresce a metà frase)
+NOISE_ADAPT_FLAT = 0.2     # ... durante il parlato, se l'energia è piatta (non è voce)
+VAD_SEED = 0.3             # secondi iniziali (pre-roll) su cui si stima il rumore del turno
+VAD_FLAT_WINDOW = 1.0      # secondi di energia piatta dopo cui il parlato è considerato rumore
+VAD_FLAT_RATIO = 1.5       # max/min RMS sotto cui l'energia della finestra è "piatta"
+
+
+def chunk_rms(data, channels=1):
+    """RMS di un chunk PCM int16 (mixato a mono)."""
+    samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+    if channels > 1:
+        samples = samples[: len(samples) // channels * channels].reshape(-1, channels).mean(axis=1)
+    if samples.size == 0:
+        return 0.0
+    return float(np.sqrt(np.mean(samples * samples)))
+
+
+class AdaptiveVAD:
+    """
+    `process(chunk)` ritorna i chunk che appartengono a un enunciato (lista
+    vuota nel silenzio; all'attacco anche il padding iniziale) e imposta
+    `event` a "start", "end" o None. `noise_floor` è solo il valore di
+    partenza: nei primi `seed` secondi viene sostituito dal minimo RMS
+    osservato.
+    """
+
+    def __init__(self, rate, channels=1, noise_floor=None,
+                 start_ratio=VAD_START_RATIO, stop_ratio=VAD_STOP_RATIO, min_rms=VAD_MIN_RMS,
+                 attack=VAD_ATTACK, start_pad=VAD_START_PAD, end_pad=VAD_END_PAD,
+                 seed=VAD_SEED, flat_window=VAD_FLAT_WINDOW, flat_ratio=VAD_FLAT_RATIO):
+        self.rate = rate
+        self.channels = channels
+        self.noise_floor = noise_floor
+        self.start_ratio = start_ratio
+        self.stop_ratio = stop_ratio
+        self.min_rms = min_rms
+        self.attack = attack
+        self.start_pad = start_pad
+        self.end_pad = end_pad
+        self.flat_window = flat_window
+        self.flat_ratio = flat_ratio
+        self.in_speech = False
+        self.triggered = False      # almeno un enunciato iniziato
+        self.event = None
+        self.last_rms = 0.0
+        self.speech_seconds = 0.0
+        self._pre = deque()         # (durata, chunk) prima dell'attacco
+        self._pre_seconds = 0.0
+        self._loud = 0.0
+        self._quiet = 0.0
+        self._seed_left = seed
+        self._seed_min = None
+        self._recent = deque()      # (durata, rms) del parlato, per riconoscere l'energia piatta
+        self._recent_seconds = 0.0
+
+    def thresholds(self):
+        """(soglia di ingresso, soglia di uscita) correnti."""
+        floor = self.noise_floor or 0.0
+        start = max(floor * self.start_ratio, self.min_rms)
+        stop = max(floor * self.stop_ratio, self.min_rms * self.stop_ratio / self.start_ratio)
+        return start, stop
+
+    def _adapt(self, rms, up_rate):
+        rate = NOISE_ADAPT_DOWN if rms < self.noise_floor else up_rate
+        self.noise_floor += rate * (rms - self.noise_floor)
+
+    def _flat(self, duration, rms):
+        """True se nell'ultima `flat_window` di parlato l'energia non è mai variata."""
+        self._recent.append((duration, rms))
+        self._recent_seconds += duration
+        while len(self._recent) > 1 and self._recent_seconds - self._recent[0][0] >= self.flat_window:
+            self._recent_seconds -= self._recent.popleft()[0]
+        if self._recent_seconds < self.flat_window:
+            return False
+        levels = [r for _, r in self._recent]
+        return max(levels) <= self.flat_ratio * max(min(levels), 1.0)
+
+    def process(self, data):
+        duration = len(data) / (2 * self.channels * self.rate)
+        rms = chunk_rms(data, self.channels)
+        self.last_rms = rms
+        seeding = self._seed_left > 0
+        if seeding:
+            # stima del turno sul pre-roll: il minimo, così una sillaba già iniziata non la gonfia
+            self._seed_left -= duration
+            self._seed_min = rms if self._seed_min is None else min(self._seed_min, rms)
+            self.noise_floor = self._seed_min
+        elif self.noise_floor is None:
+            self.noise_floor = rms
+        start_thr, stop_thr = self.thresholds()
+        self.event = None
+
+        if not self.in_speech:
+            self._pre.append((duration, data))
+            self._pre_seconds += duration
+            while len(self._pre) > 1 and self._pre_seconds - self._pre[0][0] >= self.start_pad + self.attack:
+                self._pre_seconds -= self._pre.popleft()[0]
+
+            if rms > start_thr:
+                self._loud += duration
+            else:
+                self._loud = 0.0
+                if not seeding:
+                    self._adapt(rms, NOISE_ADAPT_UP)
+            if self._loud < self.attack:
+                return []
+
+            self.in_speech = self.triggered = True
+            self.event = "start"
+            self._quiet = 0.0
+            self._recent.clear()
+            self._recent_seconds = 0.0
+            self.speech_seconds += self._loud
+            voiced = [chunk for _, chunk in self._pre]
+            self._pre.clear()
+            self._pre_seconds = 0.0
+            return voiced
+
+        self.speech_seconds += duration
+        if rms < stop_thr:
+            self._quiet += duration
+            self._adapt(rms, NOISE_ADAPT_UP)
+            if self._quiet >= self.end_pad:
+                self.in_speech = False
+                self.event = "end"
+                self._loud = 0.0
+        else:
+            self._quiet = 0.0
+            self._adapt(rms, NOISE_ADAPT_FLAT if self._flat(duration, rms) else NOISE_ADAPT_SPEECH)
+        return [data]
@@ -0,0 +1,47 @@
+# Formato su disco della galleria: più istanze (processi) sullo stesso file.
+import numpy as np
+
+from src.utils.embedding_store import open_store, EmbeddingStore
+
+
+def _vec(seed, dim=8):
+    return np.random.default_rng(seed).normal(size=dim).astype(np.float32)
+
+
+def test_two_writers_append_to_same_gallery(tmp_path):
+    path = str(tmp_path / "gallery.bin")
+    a = open_store(path)
+    b = open_store(path)
+
+    a.append("Anna", _vec(0))
+    b.append("Bruno", _vec(1))     # b non ha ancora visto la riga di a
+    a.append("Carla", _vec(2))     # né a quella di b
+
+    for store in (a, b, EmbeddingStore(path)):
+        store.refresh()
+        assert store.names == ["Anna", "Bruno", "Carla"]
+        assert store.ids == [0, 1, 2]
+        assert len(store) == 3
+
+    fresh = EmbeddingStore(path)
+    expected = np.stack([_vec(i) for i in range(3)])
+    expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+    np.testing.assert_allclose(np.asarray(fresh.matrix()), expected, rtol=1e-6)
+
+
+def test_replace_after_external_append(tmp_path):
+    path = str(tmp_path / "gallery.bin")
+    a = open_store(path)
+    b = open_store(path)
+    a.append("Anna", _vec(0))
+    b.append_many([("Bruno", _vec(1)), ("Bruno", _vec(2))])
+    before = np.asarray(a.matrix()[0]).copy()
+
+    assert a.replace(0, _vec(3)) == 3
+
+    assert a.names == ["Anna", "Bruno", "Bruno", "Anna"]
+    fresh = EmbeddingStore(path)
+    assert fresh.replaced_rows() == [0]
+    # la riga sostituita non cambia su disco: gli snapshot pubblicati la leggono ancora
+    np.testing.assert_array_equal(np.asarray(fresh.matrix()[0]), before)
+    np.testing.assert_allclose(np.asarray(fresh.matrix()[3]), _vec(3) / np.linalg.norm(_vec(3)), rtol=1e-6)
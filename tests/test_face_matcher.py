@@ -0,0 +1,36 @@
+# Snapshot del matcher: quelli già pubblicati non devono cambiare.
+import numpy as np
+
+from src.utils.face_matcher import GalleryMatcher, l2_normalize
+
+
+def _rows(n, seed):
+    return l2_normalize(np.random.default_rng(seed).normal(size=(n, 16)))
+
+
+def test_new_snapshots_do_not_touch_published_centroids():
+    names = ["a", "a", "b", "c", "c"]
+    matrix = _rows(5, 0)
+    old = GalleryMatcher(names, matrix, normalized=True)
+    before = old.centroids.copy()
+
+    grown = np.vstack([matrix, _rows(2, 1)])
+    new = old.extended(["b", "d"], grown)
+    # il prototipo 0 di "a" viene sostituito da una riga accodata
+    replacing = np.vstack([grown, _rows(1, 2)])
+    newer = new.extended(["a"], replacing, replaced=[0])
+
+    np.testing.assert_array_equal(old.centroids, before)
+    rebuilt = GalleryMatcher(names + ["b", "d"], grown, normalized=True)
+    np.testing.assert_allclose(new.centroids, rebuilt.centroids, atol=1e-6)
+    rebuilt = GalleryMatcher(names + ["b", "d", "a"], replacing, normalized=True, replaced=[0])
+    np.testing.assert_allclose(newer.centroids, rebuilt.centroids, atol=1e-6)
+    assert list(newer.rows_of("a")) == [1, 7]
+
+
+def test_replaced_rows_are_never_matched():
+    matrix = _rows(3, 3)
+    matcher = GalleryMatcher(["a", "b", "a"], matrix, normalized=True, replaced=[0])
+    result = matcher.match(matrix[0])
+    assert all(dist > 1e-3 for name, dist in result.candidates if name == "a")
+    assert sorted(matcher.identities) == ["a", "b"]
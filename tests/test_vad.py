@@ -0,0 +1,36 @@
+# VAD adattivo: rumore stazionario comparso a metà frase non tiene aperto il turno.
+import numpy as np
+
+from src.utils.vad import AdaptiveVAD
+
+RATE = 16000
+CHUNK = 1024
+
+
+def _events(levels, seed=0):
+    rng = np.random.default_rng(seed)
+    vad = AdaptiveVAD(RATE)
+    events = []
+    for i, level in enumerate(levels):
+        vad.process((rng.standard_normal(CHUNK) * level).astype(np.int16).tobytes())
+        if vad.event:
+            events.append((vad.event, i * CHUNK / RATE))
+    return events
+
+
+def _seconds(s):
+    return int(s * RATE / CHUNK)
+
+
+def test_flat_noise_after_quiet_preroll_ends_the_turn():
+    events = _events([30] * _seconds(1) + [200] * _seconds(6))
+    assert [e for e, _ in events] == ["start", "end"]
+    assert events[1][1] - events[0][1] < 3.0
+
+
+def test_speech_is_not_cut_short():
+    t = np.arange(_seconds(3)) * CHUNK / RATE
+    speech = list(300 + 1200 * np.abs(np.sin(np.pi * 4 * t)))
+    events = _events([30] * _seconds(1) + speech + [30] * _seconds(2))
+    assert [e for e, _ in events] == ["start", "end"]
+    assert events[1][1] >= 1.0 + 3.0